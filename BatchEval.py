@@ -0,0 +1,134 @@
+# Description: Vectorized NumPy evaluation of many Checkers positions at once.
+#              Positions are exported as an N x 32 int8 array with one column per square index (BitBoard.py):
+#              0 for an empty square, 1, 2 and 3 for a Black man, king and triple king, -1, -2 and -3 for White.
+#              squares_to_grid turns it into the N x 8 x 8 board of print_board.
+#              Features (material, kings, triple kings, mobility and advancement, all Black minus White) and the
+#              linear evaluator are computed with array operations on the whole batch. Requires NumPy.
+
+import numpy as np
+
+from BitBoard import RAYS, SQUARE_COUNT, SQUARE_LOCATIONS
+
+FEATURE_NAMES = ("material", "kings", "triple_kings", "mobility", "advancement")
+DEFAULT_WEIGHTS = (100.0, 250.0, 350.0, 2.0, 1.0)
+
+# Rows and columns of the square indexes
+SQUARE_ROWS = np.array([location[0] for location in SQUARE_LOCATIONS], dtype=np.int64)
+SQUARE_COLS = np.array([location[1] for location in SQUARE_LOCATIONS], dtype=np.int64)
+BIT_SHIFTS = np.arange(SQUARE_COUNT, dtype=np.uint32)
+
+# RAY_TABLE[square, direction] lists the squares of the diagonal, padded with SQUARE_COUNT (never empty)
+RAY_TABLE = np.full((SQUARE_COUNT, 4, 7), SQUARE_COUNT, dtype=np.int64)
+for _square in range(SQUARE_COUNT):
+    for _direction in range(4):
+        _ray = RAYS[_square][_direction]
+        RAY_TABLE[_square, _direction, :len(_ray)] = _ray
+
+# Forward directions of the men, see BitBoard.DIRECTIONS
+BLACK_FORWARD = [0, 1]
+WHITE_FORWARD = [2, 3]
+
+# Rows of positions handled at once when computing mobility, to bound the temporary arrays
+MOBILITY_CHUNK = 16384
+
+
+def export_bitboards(games):
+    """Returns the N x 4 uint32 array of the black, white, king and triple king bitboards of the games"""
+    return np.array([game.get_bit_board().get_bitboards() for game in games], dtype=np.uint32).reshape(-1, 4)
+
+
+def export_side_to_move(games):
+    """Returns the N int8 array of the color to move in the games, 1 for Black and -1 for White"""
+    return np.array([1 if game.get_player(game.get_current_turn()).get_piece_color() == "Black" else -1
+                     for game in games], dtype=np.int8)
+
+
+def bitboards_to_squares(bitboards):
+    """Returns the N x 32 int8 square array of an N x 4 bitboard array"""
+    bits = ((bitboards[:, :, None] >> BIT_SHIFTS) & 1).astype(np.int8)
+    rank = 1 + bits[:, 2] + 2 * bits[:, 3]
+    return ((bits[:, 0] - bits[:, 1]) * rank).astype(np.int8)
+
+
+def export_squares(games):
+    """Returns the N x 32 int8 square array of the games"""
+    return bitboards_to_squares(export_bitboards(games))
+
+
+def squares_to_grid(squares):
+    """Returns the N x 8 x 8 int8 board array of an N x 32 square array"""
+    grid = np.zeros((len(squares), 8, 8), dtype=np.int8)
+    grid[:, SQUARE_ROWS, SQUARE_COLS] = squares
+    return grid
+
+
+def grid_to_squares(grid):
+    """Returns the N x 32 int8 square array of an N x 8 x 8 board array"""
+    return grid[:, SQUARE_ROWS, SQUARE_COLS]
+
+
+def count_mobility(squares):
+    """
+    Returns the N array of non-capturing moves of Black minus White: a man steps to an empty forward square,
+    a king or triple king to any empty square before the first piece of each diagonal
+    """
+    mobility = np.empty(len(squares), dtype=np.int64)
+    for start in range(0, len(squares), MOBILITY_CHUNK):
+        chunk = squares[start:start + MOBILITY_CHUNK]
+        empty = np.zeros((len(chunk), SQUARE_COUNT + 1), dtype=bool)
+        empty[:, :SQUARE_COUNT] = chunk == 0
+        ray_empty = empty[:, RAY_TABLE]
+        # empty squares reachable in every direction of every square
+        reachable = np.logical_and.accumulate(ray_empty, axis=3).sum(axis=3)
+        steps = ray_empty[:, :, :, 0]
+
+        men = np.abs(chunk) == 1
+        kings = np.abs(chunk) > 1
+        black = chunk > 0
+        white = chunk < 0
+        king_moves = reachable.sum(axis=2)
+        black_moves = (steps[:, :, BLACK_FORWARD].sum(axis=2) * (black & men)
+                       + king_moves * (black & kings)).sum(axis=1)
+        white_moves = (steps[:, :, WHITE_FORWARD].sum(axis=2) * (white & men)
+                       + king_moves * (white & kings)).sum(axis=1)
+        mobility[start:start + len(chunk)] = black_moves - white_moves
+    return mobility
+
+
+def compute_features(squares):
+    """Returns the N x 5 float array of the features in FEATURE_NAMES, all Black minus White"""
+    squares = np.asarray(squares, dtype=np.int8)
+    features = np.empty((len(squares), len(FEATURE_NAMES)), dtype=np.float64)
+    for column, code in enumerate((1, 2, 3)):
+        features[:, column] = (squares == code).sum(axis=1) - (squares == -code).sum(axis=1)
+    features[:, 3] = count_mobility(squares)
+    # rows moved forward by the men: Black starts from row 7 and White from row 0
+    features[:, 4] = ((squares == 1) * (7 - SQUARE_ROWS)).sum(axis=1) - ((squares == -1) * SQUARE_ROWS).sum(axis=1)
+    return features
+
+
+class LinearEvaluator:
+    """Represents a linear evaluation of position features computed on a batch of positions"""
+
+    def __init__(self, weights=DEFAULT_WEIGHTS):
+        self._weights = np.asarray(weights, dtype=np.float64)
+        if self._weights.shape != (len(FEATURE_NAMES),):
+            raise ValueError("Expected one weight per feature: " + ", ".join(FEATURE_NAMES))
+
+    def get_weights(self):
+        """Returns the weights of the features"""
+        return self._weights
+
+    def evaluate_squares(self, squares, side_to_move=None):
+        """
+        Returns the N array of scores of an N x 32 square array for Black, or for the color to move
+        when side_to_move (1 for Black, -1 for White) is given
+        """
+        scores = compute_features(squares) @ self._weights
+        if side_to_move is not None:
+            scores *= side_to_move
+        return scores
+
+    def evaluate_games(self, games):
+        """Returns the N array of scores of the games for their color to move"""
+        return self.evaluate_squares(export_squares(games), export_side_to_move(games))
@@ -0,0 +1,212 @@
+# Description: Benchmark suite of the Checkers game, to compare runs and find performance regressions.
+#              Measures on every board engine the construction of a game with both players, the play_game
+#              throughput on a capture-heavy and a king-heavy move sequence, the rendering with print_board and
+#              get_checker_details, and the random game playouts per second on the bitboard engine.
+#              Every result is a rate (higher is better) and is the best of a few repeats. The results are saved
+#              as JSON, and compared with a baseline file to report the regressions.
+#              Usage: python Benchmark.py [--output results.json] [--baseline baseline.json] [--scale 1.0]
+
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+from contextlib import redirect_stdout
+
+from BitBoard import ROW_0, ROW_7, SQUARE_BITS
+from CheckersGame import OBJECT_ENGINE, BITBOARD_ENGINE, COMPACT_ENGINE
+from MemoryBenchmark import new_games
+from Simulation import capture_policy, get_play_game_moves, new_simulated_game, play_simulated_game, random_policy
+from Simulation import simulate_games
+
+RESULTS_VERSION = 1
+ENGINES = (OBJECT_ENGINE, COMPACT_ENGINE, BITBOARD_ENGINE)
+REPEATS = 5
+DEFAULT_THRESHOLD = 0.1
+SEQUENCE_SEED = 7
+
+# Number of operations of every benchmark at scale 1.0
+CONSTRUCTION_GAMES = 2000
+SEQUENCE_REPLAYS = 50
+RENDER_CALLS = 500
+PLAYOUT_GAMES = 50
+
+
+def king_policy(game, player_name, moves, rng):
+    """Policy that plays a random move among the moves of a king or triple king and the moves that promote a man"""
+    black, white, kings, triple_kings = game.get_bit_board().get_bitboards()
+    all_kings = kings | triple_kings
+    king_moves = [move for move in moves
+                  if SQUARE_BITS[move & 31] & all_kings or SQUARE_BITS[(move >> 5) & 31] & (ROW_0 | ROW_7)]
+    return rng.choice(king_moves or moves)
+
+
+def get_sequence(policy, seed=SEQUENCE_SEED, max_moves=400):
+    """Returns the (player_name, start, destination) moves of a game played by the policy, for play_game"""
+    return get_play_game_moves(play_simulated_game(0, seed, policy, max_moves)["moves"])
+
+
+def best_rate(function, operations, repeats=REPEATS):
+    """Returns the best number of operations per second of repeats calls of the function doing the operations"""
+    best_seconds = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - started
+        if best_seconds is None or seconds < best_seconds:
+            best_seconds = seconds
+    return operations / best_seconds if best_seconds > 0 else float("inf")
+
+
+def benchmark_construction_rate(engine, game_count):
+    """Returns the games built per second with both players created"""
+    return best_rate(lambda: new_games(engine, game_count), game_count)
+
+
+def benchmark_sequence(engine, moves, replays):
+    """Returns the moves played per second with play_game, replaying the moves from the start position"""
+    def replay():
+        for _ in range(replays):
+            game = new_simulated_game(engine)
+            play_game = game.play_game
+            for player_name, start, destination in moves:
+                play_game(player_name, start, destination)
+    return best_rate(replay, replays * len(moves))
+
+
+def benchmark_print_board(game, calls):
+    """Returns the print_board calls per second, printed to a string"""
+    def render():
+        with redirect_stdout(io.StringIO()):
+            for _ in range(calls):
+                game.print_board()
+    return best_rate(render, calls)
+
+
+def benchmark_checker_details(game, calls):
+    """Returns the boards per second rendered square by square with get_checker_details"""
+    locations = [(row, col) for row in range(8) for col in range(8)]
+
+    def render():
+        get_checker_details = game.get_checker_details
+        for _ in range(calls):
+            for location in locations:
+                get_checker_details(location)
+    return best_rate(render, calls)
+
+
+def benchmark_playouts(game_count):
+    """Returns the random games played per second to the end or 400 moves on the bitboard engine"""
+    return best_rate(lambda: list(simulate_games(game_count, random_policy, workers=0, seed=SEQUENCE_SEED)),
+                     game_count)
+
+
+def run_benchmarks(scale=1.0):
+    """Returns {benchmark name: rate} of every benchmark, scale multiplies the number of operations"""
+    def count(operations):
+        return max(1, int(operations * scale))
+
+    sequences = {"capture": get_sequence(capture_policy), "king": get_sequence(king_policy)}
+    results = {}
+    for engine in ENGINES:
+        results["construction/" + engine] = benchmark_construction_rate(engine, count(CONSTRUCTION_GAMES))
+        for sequence_name, moves in sequences.items():
+            results["play_game/" + sequence_name + "/" + engine] = benchmark_sequence(engine, moves,
+                                                                                      count(SEQUENCE_REPLAYS))
+        # render the middle of the capture sequence, with kings and empty squares
+        game = new_simulated_game(engine)
+        moves = sequences["capture"]
+        for player_name, start, destination in moves[:len(moves) // 2]:
+            game.play_game(player_name, start, destination)
+        results["print_board/" + engine] = benchmark_print_board(game, count(RENDER_CALLS))
+        results["get_checker_details/" + engine] = benchmark_checker_details(game, count(RENDER_CALLS))
+    results["playouts/" + BITBOARD_ENGINE] = benchmark_playouts(count(PLAYOUT_GAMES))
+    return results
+
+
+def save_results(results, path):
+    """Writes the results to a JSON file with the Python version and platform"""
+    with open(path, "w") as results_file:
+        json.dump({"version": RESULTS_VERSION, "python": platform.python_version(), "platform": platform.platform(),
+                   "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, results_file, indent=2,
+                  sort_keys=True)
+
+
+def load_results(path):
+    """Returns the {benchmark name: rate} of a JSON results file"""
+    with open(path) as results_file:
+        data = json.load(results_file)
+    if data.get("version") != RESULTS_VERSION:
+        raise ValueError("Unknown benchmark results version: " + str(data.get("version")))
+    return data["results"]
+
+
+def compare_results(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Returns the (benchmark name, baseline rate, rate, change, status) of every benchmark. change is the relative
+    change of the rate, the status is "regression" or "improvement" if it's larger than the threshold, "ok"
+    otherwise, "new" or "missing" for a benchmark that is only in the results or only in the baseline.
+    """
+    rows = []
+    for name in sorted(set(results) | set(baseline)):
+        if name not in baseline:
+            rows.append((name, None, results[name], None, "new"))
+            continue
+        if name not in results:
+            rows.append((name, baseline[name], None, None, "missing"))
+            continue
+        change = results[name] / baseline[name] - 1
+        if change < -threshold:
+            status = "regression"
+        elif change > threshold:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append((name, baseline[name], results[name], change, status))
+    return rows
+
+
+def format_rate(rate):
+    """Returns the rate with its magnitude, or "-" for None"""
+    if rate is None:
+        return "-"
+    return "%.1f" % rate if rate < 1000 else "%.0f" % rate
+
+
+def print_report(rows, output_file=None):
+    """Prints the rows of compare_results to the file, stdout by default, returns the number of regressions"""
+    if output_file is None:
+        output_file = sys.stdout
+    output_file.write("%-36s %12s %12s %8s  %s\n" % ("benchmark (per second)", "baseline", "current", "change",
+                                                      "status"))
+    for name, baseline_rate, rate, change, status in rows:
+        output_file.write("%-36s %12s %12s %8s  %s\n" % (name, format_rate(baseline_rate), format_rate(rate),
+                                                          "-" if change is None else "%+.1f%%" % (change * 100),
+                                                          status))
+    regressions = sum(1 for row in rows if row[4] == "regression")
+    output_file.write("%d regression(s)\n" % regressions)
+    return regressions
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmark suite of the Checkers game")
+    parser.add_argument("--output", help="JSON file to save the results")
+    parser.add_argument("--baseline", help="JSON results file to compare with")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative change reported as a regression or improvement")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplies the number of operations")
+    options = parser.parse_args(arguments)
+
+    results = run_benchmarks(options.scale)
+    if options.output:
+        save_results(results, options.output)
+    if options.baseline:
+        return 1 if print_report(compare_results(results, load_results(options.baseline), options.threshold)) else 0
+    for name, rate in sorted(results.items()):
+        print("%-36s %12s /s" % (name, format_rate(rate)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,407 @@
+# Description: Bitboard engine for the Checkers game.
+#              Only the 32 black squares of the 8x8 board can hold a piece. They are numbered 0 to 31 row by row,
+#              so the square (row, col) has the index row * 4 + col // 2.
+#              The BitBoard class stores the whole board as four integers with one bit per playable square:
+#              black pieces, white pieces, kings and triple kings.
+#              Moves are generated from tables precomputed for every square and diagonal direction, and a move is
+#              encoded as one integer: starting square, destination square and the bitboard of captured pieces.
+#              Move rules: a piece moves one square diagonally forward, or jumps forward over an adjacent opponent's
+#              piece. A king moves any number of empty squares along a diagonal, and may pass one opponent's piece on
+#              the way to capture it. A triple king may capture up to two opponent's pieces in the same way.
+#              After a capture only the capturing piece may continue, and only with another capture.
+#              The BitBoard keeps the Zobrist key of its pieces up to date on every change.
+
+from Zobrist import PIECE_KEYS, get_board_key
+
+SQUARE_COUNT = 32
+
+# (row, col) location of every square index
+SQUARE_LOCATIONS = tuple((square // 4, 2 * (square % 4) + 1 - (square // 4) % 2) for square in range(SQUARE_COUNT))
+
+# square index of every playable (row, col) location
+LOCATION_SQUARES = {location: square for square, location in enumerate(SQUARE_LOCATIONS)}
+
+SQUARE_BITS = tuple(1 << square for square in range(SQUARE_COUNT))
+ALL_SQUARES = (1 << SQUARE_COUNT) - 1
+
+ROW_0 = 0b1111
+ROW_7 = 0b1111 << 28
+
+# Diagonal directions as (row step, col step), Black moves forward to row 0 and White moves forward to row 7
+DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+FORWARD_DIRECTIONS = {"Black": (0, 1), "White": (2, 3)}
+
+
+def _build_ray(square, direction):
+    """Returns the tuple of square indexes from the square to the edge of the board in the direction"""
+    row, col = SQUARE_LOCATIONS[square]
+    row_step, col_step = DIRECTIONS[direction]
+    ray = []
+    row += row_step
+    col += col_step
+    while 0 <= row < 8 and 0 <= col < 8:
+        ray.append(LOCATION_SQUARES[(row, col)])
+        row += row_step
+        col += col_step
+    return tuple(ray)
+
+
+# RAYS[square][direction] is the diagonal from the square to the edge of the board
+RAYS = tuple(tuple(_build_ray(square, direction) for direction in range(4)) for square in range(SQUARE_COUNT))
+
+# DIAGONAL_PATHS[start][destination] are the squares between the start and the destination,
+# None if the destination is not on a diagonal of the start
+DIAGONAL_PATHS = tuple(tuple(next((ray[:ray.index(destination)] for ray in RAYS[start] if destination in ray), None)
+                             for destination in range(SQUARE_COUNT))
+                       for start in range(SQUARE_COUNT))
+
+# DIAGONAL_MOVES[start location][destination location] is (start, destination, start bit, destination bit,
+# bitboard of the squares between) for every start and destination on a diagonal
+DIAGONAL_MOVES = {SQUARE_LOCATIONS[start]: {SQUARE_LOCATIONS[destination]:
+                                            (start, destination, SQUARE_BITS[start], SQUARE_BITS[destination],
+                                             sum(SQUARE_BITS[square] for square in DIAGONAL_PATHS[start][destination]))
+                                            for destination in range(SQUARE_COUNT)
+                                            if DIAGONAL_PATHS[start][destination] is not None}
+                  for start in range(SQUARE_COUNT)}
+
+# Largest number of squares between two squares of a diagonal
+MAX_PATH_LENGTH = 6
+
+# KING_RAYS[square] only keeps the directions that are not empty
+KING_RAYS = tuple(tuple(ray for ray in RAYS[square] if ray) for square in range(SQUARE_COUNT))
+
+# STEPS[color][square] are the (destination square, destination bit) of the forward moves of a man
+STEPS = {color: tuple(tuple((RAYS[square][direction][0], SQUARE_BITS[RAYS[square][direction][0]])
+                            for direction in FORWARD_DIRECTIONS[color] if RAYS[square][direction])
+                      for square in range(SQUARE_COUNT))
+         for color in FORWARD_DIRECTIONS}
+
+# JUMPS[color][square] are the (jumped bit, landing square, landing bit) of the forward captures of a man
+JUMPS = {color: tuple(tuple((SQUARE_BITS[RAYS[square][direction][0]], RAYS[square][direction][1],
+                             SQUARE_BITS[RAYS[square][direction][1]])
+                            for direction in FORWARD_DIRECTIONS[color] if len(RAYS[square][direction]) > 1)
+                      for square in range(SQUARE_COUNT))
+         for color in FORWARD_DIRECTIONS}
+
+# Pieces of the starting position, White takes rows 0 to 2 and Black takes rows 5 to 7
+WHITE_START = (1 << 12) - 1
+BLACK_START = ((1 << 12) - 1) << 20
+
+WHITE_START_KEY = get_board_key(0, WHITE_START, 0, 0)
+BLACK_START_KEY = get_board_key(BLACK_START, 0, 0, 0)
+
+PIECE_DETAILS = {
+    ("White", False, False): "White",
+    ("White", True, False): "White_king",
+    ("White", False, True): "White_Triple_King",
+    ("Black", False, False): "Black",
+    ("Black", True, False): "Black_king",
+    ("Black", False, True): "Black_Triple_King",
+}
+
+
+def get_square_index(square_location):
+    """Returns the square index of the location, returns None if no piece can stand on it"""
+    return LOCATION_SQUARES.get(tuple(square_location))
+
+
+def get_square_location(square_index):
+    """Returns the (row, col) location of the square index"""
+    return SQUARE_LOCATIONS[square_index]
+
+
+def encode_move(start_square, destination_square, captured=0):
+    """Returns the move as an integer, captured is the bitboard of the opponent's pieces the move captures"""
+    return start_square | (destination_square << 5) | (captured << 10)
+
+
+def get_move_start(move):
+    """Returns the starting square index of the move"""
+    return move & 31
+
+
+def get_move_destination(move):
+    """Returns the destination square index of the move"""
+    return (move >> 5) & 31
+
+
+def get_move_captured(move):
+    """Returns the bitboard of the pieces captured by the move"""
+    return move >> 10
+
+
+def get_move_locations(move):
+    """Returns the starting and destination (row, col) locations of the move, as play_game takes them"""
+    return SQUARE_LOCATIONS[move & 31], SQUARE_LOCATIONS[(move >> 5) & 31]
+
+
+def opponent_color(color):
+    """Returns the other piece color"""
+    if color == "Black":
+        return "White"
+    return "Black"
+
+
+class BitBoard:
+    """Represents a checker board as bitboards of the 32 playable squares"""
+
+    __slots__ = ("_black", "_white", "_kings", "_triple_kings", "_hash")
+
+    def __init__(self):
+        self._black = 0
+        self._white = 0
+        self._kings = 0
+        self._triple_kings = 0
+        self._hash = 0  # Zobrist key of the pieces
+
+    def get_hash(self):
+        """Returns the Zobrist key of the pieces on the board"""
+        return self._hash
+
+    def _get_square_key(self, square):
+        """Helper method that returns the Zobrist key of the piece on the square index, 0 if it's empty"""
+        bit = SQUARE_BITS[square]
+        if self._black & bit:
+            key_index = 0
+        elif self._white & bit:
+            key_index = 3
+        else:
+            return 0
+        if self._triple_kings & bit:
+            key_index += 2
+        elif self._kings & bit:
+            key_index += 1
+        return PIECE_KEYS[key_index][square]
+
+    def get_bitboards(self):
+        """Returns the black, white, king and triple king bitboards"""
+        return self._black, self._white, self._kings, self._triple_kings
+
+    def set_bitboards(self, black, white, kings, triple_kings):
+        """Replaces the black, white, king and triple king bitboards"""
+        self._black = black
+        self._white = white
+        self._kings = kings
+        self._triple_kings = triple_kings
+        self._hash = get_board_key(black, white, kings, triple_kings)
+
+    def get_color_bitboard(self, color):
+        """Returns the bitboard of the pieces of the color"""
+        if color == "Black":
+            return self._black
+        return self._white
+
+    def add_starting_pieces(self, color):
+        """Adds the 12 pieces of the color to their starting squares"""
+        if color == "White":
+            self._white |= WHITE_START
+            self._hash ^= WHITE_START_KEY
+        elif color == "Black":
+            self._black |= BLACK_START
+            self._hash ^= BLACK_START_KEY
+
+    def add_piece_to_board(self, location, color):
+        """Adds a piece of the color to the board"""
+        square = LOCATION_SQUARES[location]
+        bit = SQUARE_BITS[square]
+        if color == "Black":
+            self._black |= bit
+            self._hash ^= PIECE_KEYS[0][square]
+        else:
+            self._white |= bit
+            self._hash ^= PIECE_KEYS[3][square]
+
+    def remove_piece_from_board(self, location):
+        """Removes the piece from the board"""
+        square = LOCATION_SQUARES[location]
+        self._hash ^= self._get_square_key(square)
+        mask = ~SQUARE_BITS[square]
+        self._black &= mask
+        self._white &= mask
+        self._kings &= mask
+        self._triple_kings &= mask
+
+    def move_piece(self, starting_square_location, destination_square_location):
+        """Moves the piece and its king flags from the starting square to the destination square"""
+        start = LOCATION_SQUARES[starting_square_location]
+        destination = LOCATION_SQUARES[destination_square_location]
+        start_bit = SQUARE_BITS[start]
+        both_bits = start_bit | SQUARE_BITS[destination]
+        self._hash ^= self._get_square_key(start)
+        if self._black & start_bit:
+            self._black ^= both_bits
+        else:
+            self._white ^= both_bits
+        if self._kings & start_bit:
+            self._kings ^= both_bits
+        elif self._triple_kings & start_bit:
+            self._triple_kings ^= both_bits
+        self._hash ^= self._get_square_key(destination)
+
+    def make_king(self, location):
+        """Promotes the piece to king"""
+        square = LOCATION_SQUARES[location]
+        self._hash ^= self._get_square_key(square)
+        self._kings |= SQUARE_BITS[square]
+        self._hash ^= self._get_square_key(square)
+
+    def make_triple_king(self, location):
+        """Promotes the piece to triple king"""
+        square = LOCATION_SQUARES[location]
+        bit = SQUARE_BITS[square]
+        self._hash ^= self._get_square_key(square)
+        self._kings &= ~bit
+        self._triple_kings |= bit
+        self._hash ^= self._get_square_key(square)
+
+    def get_color(self, location):
+        """Returns the color of the piece on the location, returns None if there's no piece"""
+        square = LOCATION_SQUARES.get(location)
+        if square is None:
+            return None
+        bit = SQUARE_BITS[square]
+        if self._black & bit:
+            return "Black"
+        if self._white & bit:
+            return "White"
+        return None
+
+    def is_king(self, location):
+        """Returns True if the piece on the location is king, False otherwise"""
+        return bool(self._kings & SQUARE_BITS[LOCATION_SQUARES[location]])
+
+    def is_triple_king(self, location):
+        """Returns True if the piece on the location is triple king, False otherwise"""
+        return bool(self._triple_kings & SQUARE_BITS[LOCATION_SQUARES[location]])
+
+    def get_details(self, location):
+        """Returns the same string as Piece.get_details for the piece on the location, or None if it's empty"""
+        color = self.get_color(location)
+        if color is None:
+            return None
+        bit = SQUARE_BITS[LOCATION_SQUARES[location]]
+        return PIECE_DETAILS[(color, bool(self._kings & bit), bool(self._triple_kings & bit))]
+
+    def get_details_board(self):
+        """Returns the board as an 8x8 list of piece details, empty squares are None"""
+        board = []
+        for row in range(8):
+            piece_row = []
+            for col in range(8):
+                piece_row.append(self.get_details((row, col)))
+            board.append(piece_row)
+        return board
+
+    def generate_moves(self, color, pending=None):
+        """
+        Returns the list of legal moves of the color.
+        pending is the square index of a piece that has just captured, only its captures are returned then.
+        """
+        if color == "Black":
+            own = self._black
+            opponent = self._white
+        else:
+            own = self._white
+            opponent = self._black
+        empty = ALL_SQUARES & ~(own | opponent)
+        all_kings = self._kings | self._triple_kings
+        triple_kings = self._triple_kings
+        steps = STEPS[color]
+        jumps = JUMPS[color]
+        captures_only = pending is not None
+        pieces = SQUARE_BITS[pending] if captures_only else own
+
+        moves = []
+        while pieces:
+            bit = pieces & -pieces
+            pieces ^= bit
+            square = bit.bit_length() - 1
+            if bit & all_kings:
+                max_captures = 2 if bit & triple_kings else 1
+                for ray in KING_RAYS[square]:
+                    captured = 0
+                    captured_count = 0
+                    for target in ray:
+                        target_bit = SQUARE_BITS[target]
+                        if target_bit & empty:
+                            if captured_count:
+                                moves.append(square | (target << 5) | (captured << 10))
+                            elif not captures_only:
+                                moves.append(square | (target << 5))
+                        elif target_bit & opponent and captured_count < max_captures:
+                            captured |= target_bit
+                            captured_count += 1
+                        else:
+                            break
+            else:
+                for jumped_bit, target, target_bit in jumps[square]:
+                    if jumped_bit & opponent and target_bit & empty:
+                        moves.append(square | (target << 5) | (jumped_bit << 10))
+                if not captures_only:
+                    for target, target_bit in steps[square]:
+                        if target_bit & empty:
+                            moves.append(square | (target << 5))
+        return moves
+
+    def make_move(self, move):
+        """
+        Moves the piece, removes the captured pieces and promotes the piece with the rules of play_game.
+        The move is not validated. Returns the previous bitboards and key, unmake_move takes them to undo the move.
+        """
+        saved = (self._black, self._white, self._kings, self._triple_kings, self._hash)
+        start = move & 31
+        destination = (move >> 5) & 31
+        start_bit = SQUARE_BITS[start]
+        destination_bit = SQUARE_BITS[destination]
+        both_bits = start_bit | destination_bit
+        captured = move >> 10
+        kept = ~captured
+
+        key = self._hash ^ self._get_square_key(start)
+        while captured:
+            bit = captured & -captured
+            captured ^= bit
+            key ^= self._get_square_key(bit.bit_length() - 1)
+
+        if self._black & start_bit:
+            self._black ^= both_bits
+            self._white &= kept
+            king_row = ROW_0
+            triple_king_row = ROW_7
+        else:
+            self._white ^= both_bits
+            self._black &= kept
+            king_row = ROW_7
+            triple_king_row = ROW_0
+        kings = self._kings & kept
+        triple_kings = self._triple_kings & kept
+        if kings & start_bit:
+            kings ^= both_bits
+        elif triple_kings & start_bit:
+            triple_kings ^= both_bits
+        if destination_bit & king_row:
+            if not triple_kings & destination_bit:
+                kings |= destination_bit
+        elif destination_bit & triple_king_row:
+            kings &= ~destination_bit
+            triple_kings |= destination_bit
+        self._kings = kings
+        self._triple_kings = triple_kings
+        self._hash = key ^ self._get_square_key(destination)
+        return saved
+
+    def unmake_move(self, saved):
+        """Restores the bitboards and key returned by make_move"""
+        self._black, self._white, self._kings, self._triple_kings, self._hash = saved
+
+    def get_piece_count(self, color):
+        """Returns the number of pieces of the color on the board"""
+        return self.get_color_bitboard(color).bit_count()
+
+    def get_king_count(self, color):
+        """Returns the number of king pieces of the color on the board"""
+        return (self.get_color_bitboard(color) & self._kings).bit_count()
+
+    def get_triple_king_count(self, color):
+        """Returns the number of triple king pieces of the color on the board"""
+        return (self.get_color_bitboard(color) & self._triple_kings).bit_count()
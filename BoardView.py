@@ -0,0 +1,148 @@
+# Description: Cached view of the board of a Checkers game, for printing and sending the board after every move.
+#              BoardView keeps the piece details of the 32 playable squares and the text of every row, as print_board
+#              prints it.
+#              update() asks the game for the squares changed since the version it last rendered and reads only those
+#              squares again, a board that has not changed is not read at all.
+#              The board is serialized as one code per square (0 empty, 1 to 3 Black man, king and triple king,
+#              4 to 6 White man, king and triple king), as JSON or bytes. With a version, only the squares changed
+#              since that version are sent: {"version": 12, "since": 10, "changes": {"14": 0, "19": 1}}.
+#              The bytes are a header (version, since version, number of squares) and one byte per square:
+#              bits 0-4 square index, bits 5-7 code. The since version of a whole board is FULL_BOARD.
+
+import json
+import struct
+
+from BitBoard import SQUARE_COUNT, SQUARE_LOCATIONS
+
+DETAIL_CODES = {None: 0, "Black": 1, "Black_king": 2, "Black_Triple_King": 3,
+                "White": 4, "White_king": 5, "White_Triple_King": 6}
+CODE_DETAILS = {code: details for details, code in DETAIL_CODES.items()}
+ALL_SQUARES = (1 << SQUARE_COUNT) - 1
+BYTES_HEADER = struct.Struct("<IIB")
+FULL_BOARD = 0xFFFFFFFF
+
+
+class BoardView:
+    """Represents the rendered board of a Checkers game, updated with the squares changed by the moves"""
+
+    __slots__ = ("_game", "_version", "_details", "_board", "_row_texts", "_text")
+
+    def __init__(self, game):
+        self._game = game
+        self._version = None  # version of the game rendered, None before the first update
+        self._details = [None] * SQUARE_COUNT  # piece details of every square index
+        self._board = [[None] * 8 for _ in range(8)]
+        self._row_texts = [str(row) for row in self._board]
+        self._text = None  # text of print_board, None if a row has changed
+
+    def update(self):
+        """Renders the squares changed since the last update, returns the bitboard of the squares rendered"""
+        game = self._game
+        changed_squares = game.get_changed_squares(self._version)
+        if changed_squares is None:
+            changed_squares = ALL_SQUARES
+        self._version = game.get_version()
+        if not changed_squares:
+            return 0
+
+        details = self._details
+        board = self._board
+        changed_rows = 0
+        squares = changed_squares
+        while squares:
+            bit = squares & -squares
+            squares ^= bit
+            square = bit.bit_length() - 1
+            row, col = SQUARE_LOCATIONS[square]
+            square_details = game.get_checker_details((row, col))
+            details[square] = square_details
+            board[row][col] = square_details
+            changed_rows |= 1 << row
+        for row in range(8):
+            if changed_rows & (1 << row):
+                self._row_texts[row] = str(board[row])
+        self._text = None
+        return changed_squares
+
+    def get_version(self):
+        """Returns the version of the game rendered after an update"""
+        self.update()
+        return self._version
+
+    def get_board(self):
+        """Returns the board as an 8x8 list of piece details, empty squares are None. The lists must not be changed."""
+        self.update()
+        return self._board
+
+    def get_text(self):
+        """Returns the text of the board, as print_board prints it"""
+        self.update()
+        if self._text is None:
+            self._text = "[" + ", ".join(self._row_texts) + "]"
+        return self._text
+
+    def get_changes(self, since_version=None):
+        """
+        Returns {square index: piece details} of the squares changed since the version,
+        every square if since_version is None or too old for the change log of the game
+        """
+        self.update()
+        changed_squares = self._game.get_changed_squares(since_version)
+        if changed_squares is None:
+            changed_squares = ALL_SQUARES
+        details = self._details
+        changes = {}
+        while changed_squares:
+            bit = changed_squares & -changed_squares
+            changed_squares ^= bit
+            square = bit.bit_length() - 1
+            changes[square] = details[square]
+        return changes
+
+    def _is_full_board(self, since_version):
+        """Helper method that returns True if the changes since the version are the whole board"""
+        return self._game.get_changed_squares(since_version) is None
+
+    def to_json(self, since_version=None):
+        """
+        Returns the board as compact JSON: {"version": v, "board": "<32 codes>"}, or with since_version
+        {"version": v, "since": since_version, "changes": {"<square index>": code}}
+        """
+        changes = self.get_changes(since_version)
+        if self._is_full_board(since_version):
+            return json.dumps({"version": self._version,
+                               "board": "".join(str(DETAIL_CODES[changes[square]]) for square in range(SQUARE_COUNT))},
+                              separators=(",", ":"))
+        return json.dumps({"version": self._version, "since": since_version,
+                           "changes": {str(square): DETAIL_CODES[details] for square, details in changes.items()}},
+                          separators=(",", ":"))
+
+    def to_bytes(self, since_version=None):
+        """Returns the board, or the squares changed since the version, in the bytes format"""
+        changes = self.get_changes(since_version)
+        since = FULL_BOARD if self._is_full_board(since_version) else since_version
+        return (BYTES_HEADER.pack(self._version, since, len(changes))
+                + bytes(square | (DETAIL_CODES[details] << 5) for square, details in changes.items()))
+
+
+def decode_json(text):
+    """Returns the version, since version (None for a whole board) and {square index: piece details} of to_json"""
+    data = json.loads(text)
+    if "board" in data:
+        return data["version"], None, {square: CODE_DETAILS[int(code)] for square, code in enumerate(data["board"])}
+    return data["version"], data["since"], {int(square): CODE_DETAILS[code] for square, code in data["changes"].items()}
+
+
+def decode_bytes(data):
+    """Returns the version, since version (None for a whole board) and {square index: piece details} of to_bytes"""
+    version, since, count = BYTES_HEADER.unpack_from(data)
+    changes = {}
+    for square_code in data[BYTES_HEADER.size:BYTES_HEADER.size + count]:
+        changes[square_code & 31] = CODE_DETAILS[square_code >> 5]
+    return version, None if since == FULL_BOARD else since, changes
+
+
+def apply_changes(details, changes):
+    """Writes {square index: piece details} into the list of the piece details of the 32 squares of a client"""
+    for square, square_details in changes.items():
+        details[square] = square_details
@@ -0,0 +1,279 @@
+# Description: Computer opponent for the Checkers game.
+#              The ComputerPlayer class searches the moves of a player with iterative deepening alpha-beta on a
+#              copy of the game's BitBoard, within a time budget in milliseconds. Captures are searched first, then
+#              killer moves and moves with a good history score. Searched positions are kept in a transposition
+#              table keyed by their Zobrist key.
+#              A capture keeps the turn: the capturing piece may capture again, or stop and let the opponent move,
+#              the same as play_game allows. With a Tablebase, positions with few pieces are scored by the tablebase.
+#              With an EvaluationCache (EvaluationCache.py), the scores of the leaf positions are cached.
+
+import time
+
+from BitBoard import BitBoard, get_move_locations, opponent_color
+from Tablebase import LOSS, WIN
+from Zobrist import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable, get_position_key
+
+WIN_SCORE = 100000
+MAN_VALUE = 100
+KING_VALUE = 250
+TRIPLE_KING_VALUE = 350
+ADVANCE_VALUE = 4
+
+# Men in the half of the board nearer to their king row
+BLACK_ADVANCED = (1 << 16) - 1
+WHITE_ADVANCED = ((1 << 16) - 1) << 16
+
+# Check the clock every this many nodes
+TIME_CHECK_NODES = 1024
+
+# Move that ends a capture chain and lets the opponent move
+END_CHAIN = -1
+
+
+class _SearchTimeout(Exception):
+    """Exception raise when the time budget of the search runs out"""
+    pass
+
+
+def evaluate(bit_board, color):
+    """Returns the score of the board for the color, material and advancement of men"""
+    black, white, kings, triple_kings = bit_board.get_bitboards()
+    all_kings = kings | triple_kings
+    black_men = black & ~all_kings
+    white_men = white & ~all_kings
+    score = (MAN_VALUE * (black_men.bit_count() - white_men.bit_count())
+             + KING_VALUE * ((black & kings).bit_count() - (white & kings).bit_count())
+             + TRIPLE_KING_VALUE * ((black & triple_kings).bit_count() - (white & triple_kings).bit_count())
+             + ADVANCE_VALUE * ((black_men & BLACK_ADVANCED).bit_count() - (white_men & WHITE_ADVANCED).bit_count()))
+    if color == "Black":
+        return score
+    return -score
+
+
+def score_to_table(score, ply):
+    """Returns the score to store in the transposition table, win and loss scores are counted from the node"""
+    if score > WIN_SCORE - 1000:
+        return score + ply
+    if score < -WIN_SCORE + 1000:
+        return score - ply
+    return score
+
+
+def score_from_table(score, ply):
+    """Returns the score of a transposition table entry at the ply"""
+    if score > WIN_SCORE - 1000:
+        return score - ply
+    if score < -WIN_SCORE + 1000:
+        return score + ply
+    return score
+
+
+def get_tablebase_score(result, distance, ply):
+    """Returns the search score at the ply of a tablebase result in distance moves"""
+    if result == WIN:
+        return WIN_SCORE - ply - distance
+    if result == LOSS:
+        return -WIN_SCORE + ply + distance
+    return 0
+
+
+class ComputerPlayer:
+    """Represents a computer opponent that chooses the moves of a player in a Checkers game"""
+
+    def __init__(self, game, max_depth=64, transposition_table=None, tablebase=None, evaluation_cache=None):
+        self._game = game
+        self._tablebase = tablebase
+        self._evaluation_cache = evaluation_cache
+        if transposition_table is None:
+            transposition_table = TranspositionTable()
+        self._transposition_table = transposition_table
+        self._max_depth = max_depth
+        self._board = BitBoard()
+        self._nodes = 0
+        self._deadline = None
+        self._killers = [[None, None] for _ in range(max_depth + 1)]
+        self._history = [0] * 1024  # indexed by start and destination square of a move
+        self._search_info = {"depth": 0, "nodes": 0, "time_ms": 0.0, "nodes_per_second": 0.0, "score": 0}
+
+    def get_transposition_table(self):
+        """Returns the transposition table of the searches"""
+        return self._transposition_table
+
+    def get_search_info(self):
+        """Returns the depth reached, nodes searched, time, nodes per second and score of the last search"""
+        return self._search_info
+
+    def best_move(self, player_name, time_budget_ms=1000):
+        """
+        Returns the best move found for the player within time_budget_ms milliseconds, as an integer move
+        of legal_moves. Returns None if the player has no legal move.
+        :exception: InvalidPlayer
+        """
+        started = time.perf_counter()
+        moves = self._game.legal_moves(player_name)
+        if not moves:
+            return None
+
+        color = self._game.get_player(player_name).get_piece_color()
+        self._board.set_bitboards(*self._game.get_bit_board().get_bitboards())
+        self._nodes = 0
+        self._deadline = started + time_budget_ms / 1000
+        self._killers = [[None, None] for _ in range(self._max_depth + 1)]
+        self._history = [0] * 1024
+
+        best_move = moves[0]
+        best_score = 0
+        depth_reached = 0
+        moves = self._order_moves(moves, 0, None)
+        for depth in range(1, self._max_depth + 1):
+            try:
+                score, move = self._search_root(moves, depth, color)
+            except _SearchTimeout:
+                break
+            best_move = move
+            best_score = score
+            depth_reached = depth
+            # search the best move first in the next iteration
+            moves.remove(move)
+            moves.insert(0, move)
+            if abs(score) >= WIN_SCORE - self._max_depth:
+                break
+
+        elapsed = time.perf_counter() - started
+        self._search_info = {"depth": depth_reached, "nodes": self._nodes, "time_ms": elapsed * 1000,
+                             "nodes_per_second": self._nodes / elapsed if elapsed > 0 else 0.0,
+                             "score": best_score,
+                             "transposition_hit_rate": self._transposition_table.get_stats()["hit_rate"]}
+        return best_move
+
+    def play_turn(self, player_name, time_budget_ms=1000):
+        """
+        Plays the best move of the player with play_game, returns the number of captured pieces,
+        returns None if the player has no legal move
+        """
+        move = self.best_move(player_name, time_budget_ms)
+        if move is None:
+            return None
+        start, destination = get_move_locations(move)
+        return self._game.play_game(player_name, start, destination)
+
+    def _search_root(self, moves, depth, color):
+        """Helper method that searches every root move to the depth, returns the best score and move"""
+        board = self._board
+        alpha = -WIN_SCORE - 1
+        beta = WIN_SCORE + 1
+        best_move = moves[0]
+        for move in moves:
+            saved = board.make_move(move)
+            if move >> 10:
+                score = self._search(depth - 1, alpha, beta, color, (move >> 5) & 31, 1)
+            else:
+                score = -self._search(depth - 1, -beta, -alpha, opponent_color(color), None, 1)
+            board.unmake_move(saved)
+            if score > alpha:
+                alpha = score
+                best_move = move
+        return alpha, best_move
+
+    def _search(self, depth, alpha, beta, color, pending, ply):
+        """
+        Helper method, negamax alpha-beta search of the board for the color to move.
+        pending is the square index of the piece that has just captured, it may capture again or end the chain.
+        """
+        self._nodes += 1
+        if self._nodes % TIME_CHECK_NODES == 0 and time.perf_counter() > self._deadline:
+            raise _SearchTimeout
+
+        board = self._board
+        if pending is not None:
+            moves = board.generate_moves(color, pending)
+            if not moves:
+                return -self._search(depth, -beta, -alpha, opponent_color(color), None, ply)
+        else:
+            moves = board.generate_moves(color)
+            if not moves:
+                return -WIN_SCORE + ply
+        if self._tablebase is not None:
+            found = self._tablebase.probe_board(board, color, pending)
+            if found is not None:
+                return get_tablebase_score(found[0], found[1], ply)
+        if depth <= 0 or ply >= self._max_depth:
+            if self._evaluation_cache is not None:
+                return self._evaluation_cache.evaluate(board, color)
+            return evaluate(board, color)
+
+        key = get_position_key(board.get_hash(), color, pending)
+        entry = self._transposition_table.probe(key)
+        table_move = None
+        if entry is not None:
+            table_move = entry[4]
+            if entry[1] >= depth:
+                score = score_from_table(entry[2], ply)
+                if entry[3] == EXACT:
+                    return score
+                if entry[3] == LOWER_BOUND and score >= beta:
+                    return beta
+                if entry[3] == UPPER_BOUND and score <= alpha:
+                    return alpha
+
+        original_alpha = alpha
+        best_move = None
+        moves = self._order_moves(moves, ply, pending, table_move)
+        for move in moves:
+            if move == END_CHAIN:
+                score = -self._search(depth - 1, -beta, -alpha, opponent_color(color), None, ply + 1)
+            else:
+                saved = board.make_move(move)
+                if move >> 10:
+                    score = self._search(depth - 1, alpha, beta, color, (move >> 5) & 31, ply + 1)
+                else:
+                    score = -self._search(depth - 1, -beta, -alpha, opponent_color(color), None, ply + 1)
+                board.unmake_move(saved)
+            if score >= beta:
+                if move != END_CHAIN and not move >> 10:
+                    self._store_killer(move, ply)
+                    self._history[move & 1023] += depth * depth
+                self._transposition_table.store(key, depth, score_to_table(beta, ply), LOWER_BOUND, move)
+                return beta
+            if score > alpha:
+                alpha = score
+                best_move = move
+
+        if alpha > original_alpha:
+            self._transposition_table.store(key, depth, score_to_table(alpha, ply), EXACT, best_move)
+        else:
+            self._transposition_table.store(key, depth, score_to_table(alpha, ply), UPPER_BOUND, None)
+        return alpha
+
+    def _order_moves(self, moves, ply, pending, table_move=None):
+        """
+        Helper method that sorts the move from the transposition table first, then captures,
+        then killer moves, then by history score
+        """
+        killers = self._killers[ply]
+        history = self._history
+
+        def order_key(move):
+            if move == table_move:
+                return 3000000
+            captured = move >> 10
+            if captured:
+                return 2000000 + captured.bit_count()
+            if move == killers[0] or move == killers[1]:
+                return 1000000
+            return history[move & 1023]
+
+        moves = sorted(moves, key=order_key, reverse=True)
+        if pending is not None:
+            if table_move == END_CHAIN:
+                moves.insert(0, END_CHAIN)
+            else:
+                moves.append(END_CHAIN)
+        return moves
+
+    def _store_killer(self, move, ply):
+        """Helper method that remembers a quiet move that caused a cutoff at the ply"""
+        killers = self._killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
@@ -11,6 +11,49 @@
 #              methods, including get_king_count, get_triple_king_count, and get_captured_pieces_count.
 #              There's also Board class, Square Class and Piece Class. Represents the Checker boards, the square on
 #              the checker board, and the piece information.
+#              A Checkers game can also be played on the bitboard engine from BitBoard.py, which keeps the board
+#              as integer bitboards instead of Square and Piece objects, or on the compact engine, which keeps the
+#              Piece objects in one flat list of 64 squares and sets up the pieces from a precomputed template.
+#              snapshot() returns the position of a game as an immutable GameSnapshot, and Checkers.from_snapshot()
+#              builds a new game from it on any engine.
+#              Every move that changes the board gets a new version. Once the game has a BoardView from BoardView.py,
+#              the squares of every move are also kept in a change log, so the view renders only the squares changed
+#              since the version it last rendered.
+#              play_moves() plays a whole sequence of moves, validated with play_game or trusted to be legal.
+
+from collections import namedtuple
+
+from BitBoard import (BitBoard, BLACK_START, BLACK_START_KEY, WHITE_START, WHITE_START_KEY, DIAGONAL_MOVES,
+                      DIAGONAL_PATHS, MAX_PATH_LENGTH, PIECE_DETAILS, ROW_0, ROW_7, SQUARE_BITS, SQUARE_LOCATIONS,
+                      get_square_index, get_square_location)
+from BoardView import BoardView
+from Profiling import Profiler
+from Zobrist import get_board_key, get_piece_key, get_position_key
+
+OBJECT_ENGINE = "object"
+BITBOARD_ENGINE = "bitboard"
+COMPACT_ENGINE = "compact"
+
+# Winner of a game that has not ended, as game_winner returns it
+GAME_NOT_ENDED = "Game has not ended"
+
+# Starting locations of the 12 pieces of each color, in the order initiate_pieces adds them
+STARTING_LOCATIONS = {
+    "White": tuple((row, col) for row in range(3) for col in range(8) if (row + col) % 2 == 1),
+    "Black": tuple((row, col) for row in range(5, 8) for col in range(8) if (row + col) % 2 == 1),
+}
+STARTING_KEYS = {"White": WHITE_START_KEY, "Black": BLACK_START_KEY}
+STARTING_SQUARES = {"White": WHITE_START, "Black": BLACK_START}
+
+# Number of moves at least kept in the change log, a view older than that may render the whole board again
+CHANGE_LOG_SIZE = 64
+
+# Position of a game returned by Checkers.snapshot: the bitboards of the pieces, the (player name, piece color,
+# captured pieces count) of every player in the order they were created, the name of the player to move and the
+# square index of the piece that has just captured and may capture again, or None
+GameSnapshot = namedtuple("GameSnapshot", ("black", "white", "kings", "triple_kings", "players", "current_turn",
+                                           "pending_square"))
+
 
 class OutofTurn(Exception):
     """Exception raise if a player attempts to move a piece out of turn"""
@@ -27,31 +70,151 @@ class InvalidPlayer(Exception):
     """Exception raise if the player name is not valid"""
     pass
 
+class CounterMismatch(Exception):
+    """Exception raise if the piece counters of a player do not match the player's pieces"""
+    pass
+
+class IllegalPly(Exception):
+    """Exception raise by play_moves for the first illegal move of a sequence, with its index and the exception"""
+
+    def __init__(self, ply, error):
+        super().__init__("Illegal move at ply " + str(ply) + ": " + type(error).__name__)
+        self.ply = ply
+        self.error = error
+
 class Checkers:
     """Represents the checker game as played"""
 
-    def __init__(self):
-        self._game_board = Board()
+    def __init__(self, engine=OBJECT_ENGINE):
+        """
+        Takes as parameter the board engine, OBJECT_ENGINE for the Board of Square and Piece objects,
+        BITBOARD_ENGINE for the BitBoard or COMPACT_ENGINE for the CompactBoard of Piece objects
+        """
+        if engine == OBJECT_ENGINE:
+            self._game_board = Board()
+        elif engine == BITBOARD_ENGINE:
+            self._game_board = BitBoard()
+        elif engine == COMPACT_ENGINE:
+            self._game_board = CompactBoard()
+        else:
+            raise ValueError("Unknown board engine: " + str(engine))
+        self._engine = engine
         self._players = {}
         self._current_turn = None
-        self._last_move = None  # Piece object
+        self._last_move = None  # Piece object, or square index of the piece on the bitboard engine
+        self._undo_stack = []  # undo records of make_move
+        self._board_hash = 0  # Zobrist key of the pieces on the object engine
+        self._profiler = None
+        self._captured_squares = [0] * MAX_PATH_LENGTH  # square indexes found by resolve_captures
+        self._version = 0  # number of changes of the board
+        self._change_log = None  # (version, bitboard of the squares changed) of the last moves, kept once viewed
+        self._board_view = None
+
+    def get_engine(self):
+        """Returns the board engine of the game"""
+        return self._engine
+
+    def get_game_board(self):
+        """Returns the board of the game: Board, BitBoard or CompactBoard depending on the engine"""
+        return self._game_board
+
+    def enable_profiling(self, profiler=None):
+        """
+        Starts counting the calls and timing the phases of the game and its board with the Profiler,
+        a new one if profiler is None. Returns the Profiler.
+        """
+        if self._profiler is not None:
+            return self._profiler
+        if profiler is None:
+            profiler = Profiler()
+        profiler.attach(self)
+        self._profiler = profiler
+        return profiler
+
+    def disable_profiling(self):
+        """Stops profiling the game, the game runs its phases without timers again"""
+        if self._profiler is not None:
+            self._profiler.detach(self)
+            self._profiler = None
+
+    def get_profiler(self):
+        """Returns the Profiler of the game, None if profiling is disabled"""
+        return self._profiler
+
+    def get_version(self):
+        """Returns the version of the board, it goes up by one every time a move or a new player changes the board"""
+        return self._version
+
+    def get_changed_squares(self, since_version):
+        """
+        Returns the bitboard of the squares changed since the version, 0 if the board has not changed.
+        Returns None if the version is older than the change log or not a version of the game. The change log
+        is only kept from the first get_board_view call, every older version returns None.
+        """
+        if since_version is None or since_version > self._version:
+            return None
+        if since_version == self._version:
+            return 0
+        change_log = self._change_log
+        if not change_log or change_log[0][0] > since_version + 1:
+            return None
+        changed_squares = 0
+        for version, squares in reversed(change_log):
+            if version <= since_version:
+                break
+            changed_squares |= squares
+        return changed_squares
+
+    def record_change(self, changed_squares):
+        """Helper method that adds the bitboard of the squares changed to the change log with a new version"""
+        self._version += 1
+        change_log = self._change_log
+        if change_log is None:
+            return
+        change_log.append((self._version, changed_squares))
+        if len(change_log) > 2 * CHANGE_LOG_SIZE:
+            del change_log[:CHANGE_LOG_SIZE]
+
+    def get_board_view(self):
+        """
+        Returns the BoardView of the game, the cached board and its serialized form. The view follows the moves of
+        the game, not the changes made directly to the board of get_game_board.
+        """
+        if self._board_view is None:
+            # a game without a view only counts its versions, it doesn't keep a change log
+            self._change_log = []
+            self._board_view = BoardView(self)
+        return self._board_view
 
     def create_player(self, player_name, piece_color):
         """
         Create a player object given player's name and piece color
         """
-        new_player = Player(player_name, piece_color)
+        if self._engine == BITBOARD_ENGINE:
+            new_player = BitBoardPlayer(player_name, piece_color, self._game_board)
+        else:
+            new_player = Player(player_name, piece_color)
         # Adds the new Player object to dictionary, name is the key
         self._players[player_name] = new_player
         if piece_color == "Black":
             self._current_turn = player_name
         self.initiate_pieces(player_name, piece_color)
+        self.record_change(STARTING_SQUARES.get(piece_color, 0))
 
         return new_player
 
 
     def initiate_pieces(self, player, piece_color):
         """Helper method to initiate 12 pieces, add it to the board and player's piece list"""
+        if self._engine == BITBOARD_ENGINE:
+            self._game_board.add_starting_pieces(piece_color)
+            return
+        if self._engine == COMPACT_ENGINE:
+            new_pieces = [Piece(player, piece_color, location) for location in STARTING_LOCATIONS[piece_color]]
+            self._game_board.add_starting_pieces(new_pieces)
+            self._players[player].add_pieces(new_pieces)
+            self._board_hash ^= STARTING_KEYS[piece_color]
+            return
         if piece_color == "White":
             for row in range(3):
                 for col in range(8):
@@ -60,11 +223,13 @@ class Checkers:
                         new_piece = Piece(player, piece_color, new_location)
                         self._game_board.add_piece_to_board(new_location, new_piece)
                         self._players[player].add_piece(new_piece)
+                        self._board_hash ^= self.get_piece_hash(new_piece)
                     elif row % 2 == 1 and col % 2 == 0:
                         new_location = (row, col)
                         new_piece = Piece(player, piece_color, new_location)
                         self._game_board.add_piece_to_board(new_location, new_piece)
                         self._players[player].add_piece(new_piece)
+                        self._board_hash ^= self.get_piece_hash(new_piece)
         elif piece_color == "Black":
             for row in range(5, 8):
                 for col in range(8):
@@ -73,11 +238,13 @@ class Checkers:
                         new_piece = Piece(player, piece_color, new_location)
                         self._game_board.add_piece_to_board(new_location, new_piece)
                         self._players[player].add_piece(new_piece)
+                        self._board_hash ^= self.get_piece_hash(new_piece)
                     elif row % 2 == 1 and col % 2 == 0:
                         new_location = (row, col)
                         new_piece = Piece(player, piece_color, new_location)
                         self._game_board.add_piece_to_board(new_location, new_piece)
                         self._players[player].add_piece(new_piece)
+                        self._board_hash ^= self.get_piece_hash(new_piece)
 
     def play_game(self, player_name, starting_square_location, destination_square_location):
         """
@@ -99,7 +266,14 @@ class Checkers:
                 and not self.is_black_square(destination_square_location)):
             raise InvalidSquare
 
-        picked_square = self.get_picked_checker(starting_square_location)
+        if self._engine == BITBOARD_ENGINE:
+            return self._play_game_bitboard(player_name, starting_square_location, destination_square_location)
+
+        starting_square = get_square_index(starting_square_location)
+        destination_square = get_square_index(destination_square_location)
+        picked_square = None
+        if starting_square is not None:
+            picked_square = self.get_picked_checker(starting_square_location)
 
         if self._last_move is not None:
             last_move_owner = self._last_move.get_owner()
@@ -118,25 +292,21 @@ class Checkers:
             raise OutofTurn
 
         # starting_square_location's piece not player's -> InvalidSquare
-        if picked_square.get_owner() != player_name:
+        if picked_square is None or picked_square.get_owner() != player_name:
             raise InvalidSquare
-        # destination_square_location has piece -> InvalidSquare
-        if self.get_picked_checker(destination_square_location) is not None:
+        # destination_square_location has piece or is not a playable square -> InvalidSquare
+        if destination_square is None or self.get_picked_checker(destination_square_location) is not None:
             raise InvalidSquare
 
-        current_piece_captured = 0
-        # Check the distance between starting and destination
-        distance = abs(destination_square_location[0] - starting_square_location[0])
-        row_distance = destination_square_location[0] - starting_square_location[0]
-        col_distance = destination_square_location[1] - starting_square_location[1]
-
         """
-        Calculate how many opponent piece player captured, update current_piece_captured
-        Update piece's location
+        Find the opponent's pieces between starting and destination, the move is validated before any piece
+        is removed: a destination that is not on a diagonal of the starting square raises InvalidSquare
         Remove captured opponent's Piece from the board
         """
-        current_piece_captured = self.check_captured_pieces(player_name, starting_square_location, distance - 1,
-                                                            row_distance, col_distance)
+        current_piece_captured = self.resolve_captures(player_name, starting_square, destination_square)
+        changed_squares = SQUARE_BITS[starting_square] | SQUARE_BITS[destination_square]
+        if current_piece_captured:
+            changed_squares |= self.remove_captured_pieces(current_piece_captured)
 
         # Add current_piece_captured to player's _captured_pieces_count by add_captured_pieces method
         self._players[player_name].add_captured_pieces(current_piece_captured)
@@ -150,61 +320,452 @@ class Checkers:
 
         self._last_move = picked_piece
 
+        self.promote_piece(picked_piece, destination_square_location)
+        self.record_change(changed_squares)
+
+        return current_piece_captured
+
+    def play_moves(self, moves, validate=True):
+        """
+        Plays a sequence of (player_name, starting_square_location, destination_square_location) moves with the
+        rules of play_game, returns the total number of captured pieces.
+        With validate, every move is played with play_game, and the first illegal move raises IllegalPly with its
+        index after the moves before it are played.
+        Without validate, the moves are trusted to be legal, as in a recorded game: the players, turns and pieces
+        are not checked. The moves are played on integer bitboards, then the board, the pieces and the players
+        are updated once. A move that is not on a diagonal of playable squares, or of an unknown player,
+        raises IllegalPly before the game is changed. The undo records of make_move are dropped.
+        """
+        if validate:
+            captured_count = 0
+            for ply, (player_name, starting_square_location, destination_square_location) in enumerate(moves):
+                try:
+                    captured_count += self.play_game(player_name, starting_square_location,
+                                                     destination_square_location)
+                except (OutofTurn, InvalidSquare, InvalidPlayer) as error:
+                    raise IllegalPly(ply, error) from error
+            return captured_count
+        return self._play_trusted_moves(moves)
+
+    def _play_trusted_moves(self, moves):
+        """Helper method of play_moves that plays the moves without validating them"""
+        board = self._game_board
+        if self._engine == BITBOARD_ENGINE:
+            pieces = None
+            black, white, kings, triple_kings = board.get_bitboards()
+        else:
+            # the pieces by square index, moved along with the bitboards
+            pieces = [board.get_piece(location) for location in SQUARE_LOCATIONS]
+            start_pieces = pieces[:]
+            black = white = kings = triple_kings = 0
+            for square, piece in enumerate(pieces):
+                if piece is not None:
+                    bit = SQUARE_BITS[square]
+                    if piece.get_color() == "Black":
+                        black |= bit
+                    else:
+                        white |= bit
+                    if piece.is_triple_king():
+                        triple_kings |= bit
+                    elif piece.is_king():
+                        kings |= bit
+        start_bitboards = (black, white, kings, triple_kings)
+
+        # player name -> (True for Black, name of the next player as next_turn would switch to)
+        player_sides = {}
+        for player_name, player in self._players.items():
+            next_player = None
+            for other_player in self._players:
+                if other_player != player_name:
+                    next_player = other_player
+            player_sides[player_name] = (player.get_piece_color() == "Black", next_player)
+        captured_counts = dict.fromkeys(player_sides, 0)
+        captured_pieces = []
+        current_turn = self._current_turn
+        last_square = None
+
+        for ply, (player_name, starting_square_location, destination_square_location) in enumerate(moves):
+            try:
+                move = DIAGONAL_MOVES[starting_square_location][destination_square_location]
+            except (KeyError, TypeError):
+                move = DIAGONAL_MOVES.get(tuple(starting_square_location), {}).get(tuple(destination_square_location))
+            side = player_sides.get(player_name)
+            if move is None or side is None:
+                error = InvalidSquare() if side is not None else InvalidPlayer()
+                raise IllegalPly(ply, error) from error
+            start, destination, start_bit, destination_bit, path = move
+            moved_bits = start_bit | destination_bit
+            if side[0]:
+                captured = path & white
+                black ^= moved_bits
+                white ^= captured
+                king_row = ROW_0
+                triple_king_row = ROW_7
+            else:
+                captured = path & black
+                white ^= moved_bits
+                black ^= captured
+                king_row = ROW_7
+                triple_king_row = ROW_0
+
+            if captured:
+                kings &= ~captured
+                triple_kings &= ~captured
+                captured_counts[player_name] += captured.bit_count()
+                current_turn = player_name
+            else:
+                current_turn = side[1]
+            if kings & start_bit:
+                kings ^= moved_bits
+            elif triple_kings & start_bit:
+                triple_kings ^= moved_bits
+            if destination_bit & king_row:
+                if not triple_kings & destination_bit:
+                    kings |= destination_bit
+            elif destination_bit & triple_king_row:
+                kings &= ~destination_bit
+                triple_kings |= destination_bit
+            last_square = destination
+
+            if pieces is not None:
+                while captured:
+                    bit = captured & -captured
+                    captured ^= bit
+                    square = bit.bit_length() - 1
+                    captured_pieces.append(pieces[square])
+                    pieces[square] = None
+                pieces[destination] = pieces[start]
+                pieces[start] = None
+
+        if last_square is None:
+            return 0
+        changed_squares = 0
+        for start_bitboard, bitboard in zip(start_bitboards, (black, white, kings, triple_kings)):
+            changed_squares |= start_bitboard ^ bitboard
+        if pieces is None:
+            board.set_bitboards(black, white, kings, triple_kings)
+            self._last_move = last_square
+        else:
+            changed_squares = self._place_pieces(start_pieces, pieces, captured_pieces, changed_squares, kings,
+                                                 triple_kings)
+            self._board_hash = get_board_key(black, white, kings, triple_kings)
+            self._last_move = pieces[last_square]
+
+        self._current_turn = current_turn
+        for player_name, captured_count in captured_counts.items():
+            self._players[player_name].add_captured_pieces(captured_count)
+        self._undo_stack.clear()
+        self.record_change(changed_squares)
+        return sum(captured_counts.values())
+
+    def _place_pieces(self, start_pieces, pieces, captured_pieces, changed_squares, kings, triple_kings):
+        """
+        Helper method of play_moves that moves the pieces of the board from the start_pieces to the pieces by square
+        index, removes the captured pieces and promotes the pieces to their ranks in the kings and triple kings
+        bitboards. changed_squares are the squares whose bitboards changed, returns them with the squares where
+        another piece has moved in.
+        """
+        board = self._game_board
+        for square, piece in enumerate(pieces):
+            if piece is not start_pieces[square]:
+                changed_squares |= SQUARE_BITS[square]
+
+        squares = changed_squares
+        while squares:
+            bit = squares & -squares
+            squares ^= bit
+            location = SQUARE_LOCATIONS[bit.bit_length() - 1]
+            if board.get_piece(location) is not None:
+                board.remove_piece_from_board(location, location)
+        for captured_piece in captured_pieces:
+            remove_captured_piece(captured_piece)
+
+        squares = changed_squares
+        while squares:
+            bit = squares & -squares
+            squares ^= bit
+            square = bit.bit_length() - 1
+            piece = pieces[square]
+            if piece is None:
+                continue
+            location = SQUARE_LOCATIONS[square]
+            piece.set_location(location)
+            board.add_piece_to_board(location, piece)
+            was_king = piece.is_king()
+            was_triple_king = piece.is_triple_king()
+            piece.set_king_status(bool(kings & bit), bool(triple_kings & bit))
+            if piece.get_player() is not None:
+                piece.get_player().count_promotion(piece, was_king, was_triple_king)
+        return changed_squares
+
+    def _play_game_bitboard(self, player_name, starting_square_location, destination_square_location):
+        """
+        Helper method of play_game for the bitboard engine, applies the same turn and square rules
+        on the bitboards. A destination that is not on a diagonal of the starting square raises InvalidSquare.
+        """
+        board = self._game_board
+        starting_square_location = tuple(starting_square_location)
+        destination_square_location = tuple(destination_square_location)
+        start_index = get_square_index(starting_square_location)
+        picked_color = board.get_color(starting_square_location)
+
+        if self._last_move is not None:
+            last_move_owner = self.get_player_by_color(board.get_color(get_square_location(self._last_move)))
+            if last_move_owner == self._current_turn:
+                # check if current turn need to be switched after a capture move
+                if last_move_owner != player_name:
+                    self._current_turn = player_name
+
+                # The same owner as the previous turn, but the piece picked is not the same as the previous piece
+                if last_move_owner == player_name and start_index != self._last_move:
+                    raise OutofTurn
+
+        # current turn not player -> OutofTurn
+        if self._current_turn != player_name:
+            raise OutofTurn
+
+        # starting_square_location's piece not player's -> InvalidSquare
+        player_color = self._players[player_name].get_piece_color()
+        if picked_color != player_color:
+            raise InvalidSquare
+        # destination_square_location has piece or is not a playable square -> InvalidSquare
+        destination_index = get_square_index(destination_square_location)
+        if destination_index is None or board.get_color(destination_square_location) is not None:
+            raise InvalidSquare
+
+        path = DIAGONAL_PATHS[start_index][destination_index]
+        if path is None:
+            raise InvalidSquare
+
+        # Remove every opponent's piece between starting and destination
+        opponent_bitboard = board.get_color_bitboard("White" if player_color == "Black" else "Black")
+        current_piece_captured = 0
+        changed_squares = SQUARE_BITS[start_index] | SQUARE_BITS[destination_index]
+        for square in path:
+            if SQUARE_BITS[square] & opponent_bitboard:
+                board.remove_piece_from_board(SQUARE_LOCATIONS[square])
+                current_piece_captured += 1
+                changed_squares |= SQUARE_BITS[square]
+
+        self._players[player_name].add_captured_pieces(current_piece_captured)
+
+        board.move_piece(starting_square_location, destination_square_location)
+        if current_piece_captured == 0:
+            self.next_turn()
+
+        self._last_move = destination_index
+
+        if player_color == "Black":
+            if destination_square_location[0] == 0 and not board.is_triple_king(destination_square_location):
+                board.make_king(destination_square_location)
+            elif destination_square_location[0] == 7:
+                board.make_triple_king(destination_square_location)
+
+        if player_color == "White":
+            if destination_square_location[0] == 7 and not board.is_triple_king(destination_square_location):
+                board.make_king(destination_square_location)
+            elif destination_square_location[0] == 0:
+                board.make_triple_king(destination_square_location)
+
+        self.record_change(changed_squares)
+        return current_piece_captured
+
+    def make_move(self, move):
+        """
+        Takes as parameter a move from legal_moves and plays it with the same turn, capture and promotion
+        rules as play_game, without validating it. Pushes an undo record so that unmake_move can take it back.
+        Returns the number of captured pieces.
+        """
+        if self._engine == BITBOARD_ENGINE:
+            return self._make_move_bitboard(move)
+
+        board = self._game_board
+        starting_square_location = SQUARE_LOCATIONS[move & 31]
+        destination_square_location = SQUARE_LOCATIONS[(move >> 5) & 31]
+        picked_piece = board.get_piece(starting_square_location)
+        player_name = picked_piece.get_owner()
+
+        # the undo record keeps the hash from before the captures, the list of captured pieces is filled below
+        captured_pieces = []
+        self._undo_stack.append((move, picked_piece, captured_pieces, picked_piece.is_king(),
+                                 picked_piece.is_triple_king(), self._current_turn, self._last_move,
+                                 self._board_hash))
+
+        captured = move >> 10
+        while captured:
+            bit = captured & -captured
+            captured ^= bit
+            location = SQUARE_LOCATIONS[bit.bit_length() - 1]
+            captured_piece = board.get_piece(location)
+            captured_pieces.append(captured_piece)
+            self._board_hash ^= self.get_piece_hash(captured_piece)
+            board.remove_piece_from_board(location)
+
+        self._players[player_name].add_captured_pieces(len(captured_pieces))
+        self.move_destination(starting_square_location, destination_square_location)
+        self._current_turn = player_name
+        if not captured_pieces:
+            self.next_turn()
+        self._last_move = picked_piece
+        self.promote_piece(picked_piece, destination_square_location)
+        self.record_change(SQUARE_BITS[move & 31] | SQUARE_BITS[(move >> 5) & 31] | (move >> 10))
+
+        return len(captured_pieces)
+
+    def promote_piece(self, picked_piece, destination_square_location):
+        """Helper method that promotes the piece that has moved to destination_square_location"""
+        piece_key = self.get_piece_hash(picked_piece)
+        was_king = picked_piece.is_king()
+        was_triple_king = picked_piece.is_triple_king()
+
         # If the destination piece reaches the end of opponent's side, promoted it as a king on the board.
         # i.e. for Black -> reach row 0; for White -> reach row 7
         # and piece is not triple king
 
         # If the piece crosses back to its original side -> set is_triple_king be True, and set is_king be False.
 
-        if self._players[player_name].get_piece_color() == "Black":
+        if picked_piece.get_color() == "Black":
             if destination_square_location[0] == 0 and not picked_piece.is_triple_king():
                 picked_piece.make_king()
             elif destination_square_location[0] == 7:
                 picked_piece.make_triple_king()
 
-        if self._players[player_name].get_piece_color() == "White":
+        if picked_piece.get_color() == "White":
             if destination_square_location[0] == 7 and not picked_piece.is_triple_king():
                 picked_piece.make_king()
             elif destination_square_location[0] == 0:
                 picked_piece.make_triple_king()
 
-        return current_piece_captured
-
-    def check_captured_pieces(self, player, location, distance, row_dist, col_dist):
-        """Helper method that calculate the pieces captured in a turn"""
-        if distance == 0:
-            return 0
-
-        if row_dist < 0 and col_dist < 0:
-            new_location = (location[0] - 1, location[1] - 1)
-        elif row_dist < 0 and col_dist > 0:
-            new_location = (location[0] - 1, location[1] + 1)
-        elif row_dist > 0 and col_dist < 0:
-            new_location = (location[0] + 1, location[1] - 1)
-        elif row_dist > 0 and col_dist > 0:
-            new_location = (location[0] + 1, location[1] + 1)
-
-        piece_on_board = self.get_picked_checker(new_location)
-        if distance == 1:
-            if piece_on_board is None or piece_on_board.get_owner() is player:
-                return 0
-            elif piece_on_board.get_owner() is not player:
-                self._game_board.remove_piece_from_board(new_location)
-                return 1
-
-        if ((piece_on_board is None)
-                or (piece_on_board.get_owner() is player)):
-            return 0 + self.check_captured_pieces(player, new_location, distance - 1, row_dist, col_dist)
-        elif piece_on_board.get_owner() is not player:
-            self._game_board.remove_piece_from_board(new_location)
-            return 1 + self.check_captured_pieces(player, new_location, distance - 1, row_dist, col_dist)
+        self._board_hash ^= piece_key ^ self.get_piece_hash(picked_piece)
+        if picked_piece.get_player() is not None:
+            picked_piece.get_player().count_promotion(picked_piece, was_king, was_triple_king)
+
+    def _make_move_bitboard(self, move):
+        """Helper method of make_move for the bitboard engine"""
+        start = move & 31
+        player_name = self.get_player_by_color(self._game_board.get_color(SQUARE_LOCATIONS[start]))
+        captured_count = (move >> 10).bit_count()
+        self._undo_stack.append((self._game_board.make_move(move), move, player_name, captured_count,
+                                 self._current_turn, self._last_move))
+
+        self._players[player_name].add_captured_pieces(captured_count)
+        self._current_turn = player_name
+        if captured_count == 0:
+            self.next_turn()
+        self._last_move = (move >> 5) & 31
+        self.record_change(SQUARE_BITS[start] | SQUARE_BITS[(move >> 5) & 31] | (move >> 10))
+        return captured_count
+
+    def unmake_move(self):
+        """Takes back the last move played by make_move"""
+        if self._engine == BITBOARD_ENGINE:
+            saved, move, player_name, captured_count, self._current_turn, self._last_move = self._undo_stack.pop()
+            self._game_board.unmake_move(saved)
+            self._players[player_name].add_captured_pieces(-captured_count)
+            self.record_change(SQUARE_BITS[move & 31] | SQUARE_BITS[(move >> 5) & 31] | (move >> 10))
+            return
+
+        board = self._game_board
+        (move, picked_piece, captured_pieces, was_king, was_triple_king,
+         self._current_turn, self._last_move, self._board_hash) = self._undo_stack.pop()
+        starting_square_location = SQUARE_LOCATIONS[move & 31]
+        destination_square_location = SQUARE_LOCATIONS[(move >> 5) & 31]
+
+        promoted_king = picked_piece.is_king()
+        promoted_triple_king = picked_piece.is_triple_king()
+        picked_piece.set_king_status(was_king, was_triple_king)
+        if picked_piece.get_player() is not None:
+            picked_piece.get_player().count_promotion(picked_piece, promoted_king, promoted_triple_king)
+        picked_piece.set_location(starting_square_location)
+        board.add_piece_to_board(starting_square_location, picked_piece)
+        board.remove_piece_from_board(destination_square_location, starting_square_location)
+
+        # captured pieces were removed in the order of the captured bitboard
+        captured = move >> 10
+        for captured_piece in captured_pieces:
+            bit = captured & -captured
+            captured ^= bit
+            location = SQUARE_LOCATIONS[bit.bit_length() - 1]
+            captured_piece.set_location(location)
+            board.add_piece_to_board(location, captured_piece)
+            if captured_piece.get_player() is not None:
+                captured_piece.get_player().count_piece(captured_piece, 1)
+        self._players[picked_piece.get_owner()].add_captured_pieces(-len(captured_pieces))
+        self.record_change(SQUARE_BITS[move & 31] | SQUARE_BITS[(move >> 5) & 31] | (move >> 10))
+
+    def resolve_captures(self, player_name, starting_square, destination_square):
+        """
+        Helper method that finds the opponent's pieces on the diagonal between the starting and destination square
+        indexes, without changing the board. Their square indexes are written at the start of the captured squares
+        buffer, returns their number.
+        :exception: InvalidSquare if the destination is not on a diagonal of the starting square
+        """
+        path = DIAGONAL_PATHS[starting_square][destination_square]
+        if path is None:
+            raise InvalidSquare
+        board = self._game_board
+        captured_squares = self._captured_squares
+        captured_count = 0
+        get_piece = board.get_piece
+        for square in path:
+            piece_on_board = get_piece(SQUARE_LOCATIONS[square])
+            if piece_on_board is not None and piece_on_board.get_owner() != player_name:
+                captured_squares[captured_count] = square
+                captured_count += 1
+        return captured_count
+
+    def remove_captured_pieces(self, captured_count):
+        """
+        Helper method that removes the first captured_count pieces found by resolve_captures from the board,
+        returns the bitboard of their squares
+        """
+        board = self._game_board
+        captured_squares = self._captured_squares
+        captured = 0
+        for index in range(captured_count):
+            square = captured_squares[index]
+            location = SQUARE_LOCATIONS[square]
+            self._board_hash ^= self.get_piece_hash(board.get_piece(location))
+            board.remove_piece_from_board(location)
+            captured |= SQUARE_BITS[square]
+        return captured
 
     def move_destination(self, starting_square_location, destination_square_location):
         """Helper method that move the piece from starting square to destination"""
         picked_piece = self.get_picked_checker(starting_square_location)
+        self._board_hash ^= self.get_piece_hash(picked_piece)
         picked_piece.set_location(destination_square_location)
         self._game_board.add_piece_to_board(destination_square_location, picked_piece)
         self._game_board.remove_piece_from_board(starting_square_location, destination_square_location)
+        self._board_hash ^= self.get_piece_hash(picked_piece)
+
+    def get_piece_hash(self, piece):
+        """Returns the Zobrist key of the piece on its location, 0 if the location is not a playable square"""
+        square = get_square_index(piece.get_location())
+        if square is None:
+            return 0
+        return get_piece_key(piece.get_color(), piece.is_king(), piece.is_triple_king(), square)
+
+    def get_board_hash(self):
+        """Returns the Zobrist key of the pieces on the board, equal to BitBoard.get_hash of the same board"""
+        if self._engine == BITBOARD_ENGINE:
+            return self._game_board.get_hash()
+        return self._board_hash
+
+    def get_hash(self):
+        """
+        Returns the Zobrist key of the position: the pieces, the color to move
+        and the piece that has just captured and may capture again
+        """
+        board_hash = self.get_board_hash()
+        color_to_move = None
+        if self._current_turn is not None:
+            color_to_move = self._players[self._current_turn].get_piece_color()
+        pending_location = self.get_pending_location()
+        pending_square = None
+        if pending_location is not None:
+            pending_square = get_square_index(pending_location)
+        return get_position_key(board_hash, color_to_move, pending_square)
 
     def get_checker_details(self, square_location):
         """
@@ -214,6 +775,8 @@ class Checkers:
         # if location not exist -> InvalidSquare
         if not self.is_valid_square(square_location):
             raise InvalidSquare
+        if self._engine == BITBOARD_ENGINE:
+            return self._game_board.get_details(tuple(square_location))
         # returns the piece object
         if self.get_picked_checker(square_location) is None:
             return None
@@ -227,14 +790,19 @@ class Checkers:
 
     def print_board(self):
         """Prints the current board in the form of an array"""
+        if self._engine == BITBOARD_ENGINE:
+            print(self._game_board.get_details_board())
+            return
+        game_board = self._game_board
         board = []
-        for row in self._game_board.get_board():
+        for row in range(8):
             piece_row = []
-            for square in row:
-                if square.get_piece() is None:
+            for col in range(8):
+                piece = game_board.get_piece((row, col))
+                if piece is None:
                     piece_row.append(None)
                 else:
-                    piece_row.append(square.get_piece().get_details())
+                    piece_row.append(piece.get_details())
             board.append(piece_row)
         print(board)
 
@@ -245,7 +813,176 @@ class Checkers:
         for player in self._players:
             if self._players[player].get_captured_pieces_count() == 12:
                 return player
-        return "Game has not ended"
+        return GAME_NOT_ENDED
+
+    def legal_moves(self, player_name):
+        """
+        Returns the list of legal moves of the player, each move is an integer from BitBoard.encode_move.
+        BitBoard.get_move_locations returns the starting and destination locations of a move for play_game.
+        After a capture, the capturing player can only capture again with the same piece, while the opponent
+        can take the turn with any move. Returns an empty list if it's not the player's turn.
+        :exception: InvalidPlayer
+        """
+        if player_name not in self._players:
+            raise InvalidPlayer
+        piece_color = self._players[player_name].get_piece_color()
+        bit_board = self.get_bit_board()
+
+        pending_location = self.get_pending_location()
+        if pending_location is not None:
+            if player_name == self._current_turn:
+                return bit_board.generate_moves(piece_color, get_square_index(pending_location))
+            return bit_board.generate_moves(piece_color)
+
+        if player_name != self._current_turn:
+            return []
+        return bit_board.generate_moves(piece_color)
+
+    def get_turn_moves(self):
+        """
+        Returns the name of the player to move and the player's legal moves. After a capture the capturing
+        player moves again if the piece can capture again, otherwise the opponent takes the turn.
+        Returns the name of the player to move and an empty list if no move is left.
+        """
+        player_name = self._current_turn
+        moves = self.legal_moves(player_name)
+        if not moves and self.get_pending_location() is not None:
+            for other_player in self._players:
+                if other_player != self._current_turn:
+                    player_name = other_player
+            moves = self.legal_moves(player_name)
+        return player_name, moves
+
+    def get_bit_board(self):
+        """
+        Returns the BitBoard of the game. On the object engine a new BitBoard is built from the players' pieces,
+        otherwise the game's own BitBoard is returned.
+        """
+        if self._engine == BITBOARD_ENGINE:
+            return self._game_board
+        bit_board = BitBoard()
+        for player in self._players.values():
+            for piece in player.get_pieces():
+                location = piece.get_location()
+                if location is not None:
+                    bit_board.add_piece_to_board(location, piece.get_color())
+                    if piece.is_triple_king():
+                        bit_board.make_triple_king(location)
+                    elif piece.is_king():
+                        bit_board.make_king(location)
+        return bit_board
+
+    def snapshot(self):
+        """
+        Returns the GameSnapshot of the position. It's a tuple of integers and strings: it can't be changed,
+        it can be a dict key, and it's equal for the same position on every engine.
+        """
+        if self._engine == BITBOARD_ENGINE:
+            black, white, kings, triple_kings = self._game_board.get_bitboards()
+        else:
+            black = white = kings = triple_kings = 0
+            for player in self._players.values():
+                pieces = 0
+                for piece in player.get_pieces():
+                    location = piece.get_location()
+                    if location is not None:
+                        bit = SQUARE_BITS[get_square_index(location)]
+                        pieces |= bit
+                        if piece.is_triple_king():
+                            triple_kings |= bit
+                        elif piece.is_king():
+                            kings |= bit
+                if player.get_piece_color() == "Black":
+                    black |= pieces
+                else:
+                    white |= pieces
+
+        pending_location = self.get_pending_location()
+        pending_square = None
+        if pending_location is not None:
+            pending_square = get_square_index(pending_location)
+        players = tuple((player_name, player.get_piece_color(), player.get_captured_pieces_count())
+                        for player_name, player in self._players.items())
+        return GameSnapshot(black, white, kings, triple_kings, players, self._current_turn, pending_square)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, engine=OBJECT_ENGINE):
+        """
+        Returns a new game on the board engine in the position of the GameSnapshot. The new game has its own
+        pieces and players, and make_move can't take back the moves played before the snapshot.
+        """
+        game = cls(engine)
+        board = game._game_board
+        game._current_turn = snapshot.current_turn
+        if engine == BITBOARD_ENGINE:
+            board.set_bitboards(snapshot.black, snapshot.white, snapshot.kings, snapshot.triple_kings)
+            for player_name, piece_color, captured_pieces_count in snapshot.players:
+                player = game._players[player_name] = BitBoardPlayer(player_name, piece_color, board)
+                player.add_captured_pieces(captured_pieces_count)
+            game._last_move = snapshot.pending_square
+            return game
+
+        for player_name, piece_color, captured_pieces_count in snapshot.players:
+            player = game._players[player_name] = Player(player_name, piece_color)
+            player.add_captured_pieces(captured_pieces_count)
+            pieces = snapshot.black if piece_color == "Black" else snapshot.white
+            while pieces:
+                bit = pieces & -pieces
+                pieces ^= bit
+                square = bit.bit_length() - 1
+                location = SQUARE_LOCATIONS[square]
+                new_piece = Piece(player_name, piece_color, location)
+                if bit & snapshot.triple_kings:
+                    new_piece.make_triple_king()
+                elif bit & snapshot.kings:
+                    new_piece.make_king()
+                board.add_piece_to_board(location, new_piece)
+                player.add_piece(new_piece)
+                if square == snapshot.pending_square:
+                    game._last_move = new_piece
+        game._board_hash = get_board_key(snapshot.black, snapshot.white, snapshot.kings, snapshot.triple_kings)
+        return game
+
+    def fork(self):
+        """Returns a new game on the same engine in the position of the game, the two games don't share any piece"""
+        return Checkers.from_snapshot(self.snapshot(), self._engine)
+
+    def get_pending_location(self):
+        """
+        Returns the location of the piece that has just captured and can capture again,
+        returns None if the last move was not a capture
+        """
+        if self._last_move is None:
+            return None
+        if self._engine == BITBOARD_ENGINE:
+            location = get_square_location(self._last_move)
+            owner = self.get_player_by_color(self._game_board.get_color(location))
+        else:
+            location = self._last_move.get_location()
+            owner = self._last_move.get_owner()
+        if owner != self._current_turn:
+            return None
+        return location
+
+    def get_player(self, player_name):
+        """
+        Returns the Player object of the player name
+        :exception: InvalidPlayer
+        """
+        if player_name not in self._players:
+            raise InvalidPlayer
+        return self._players[player_name]
+
+    def get_current_turn(self):
+        """Returns the name of the player whose turn it is"""
+        return self._current_turn
+
+    def get_player_by_color(self, piece_color):
+        """Returns the name of the player who plays the piece color, or None if there's no such player"""
+        for player in self._players:
+            if self._players[player].get_piece_color() == piece_color:
+                return player
+        return None
 
     def next_turn(self):
         """Switches the game to next turn, by changing the name in _current_turn'"""
@@ -270,50 +1007,129 @@ class Checkers:
 
 
 class Player:
-    """Represents a player in the game"""
+    """
+    Represents a player in the game.
+    The numbers of pieces, kings and triple kings on the board are counters updated when a piece is added,
+    promoted or removed from the board, set Player.self_check to True to compare them with the pieces list
+    every time they are read.
+    """
+
+    __slots__ = ("_player_name", "_piece_color", "_pieces_list", "_captured_pieces_count",
+                 "_piece_count", "_king_count", "_triple_king_count")
+
+    # Checks the counters against the pieces list when they are read, for tests
+    self_check = False
 
     def __init__(self, player_name, piece_color):
         self._player_name = player_name
         self._piece_color = piece_color
         self._pieces_list = []  # Piece object: color, location, is_king/is_triple_king
         self._captured_pieces_count = 0
+        self._piece_count = 0
+        self._king_count = 0
+        self._triple_king_count = 0
 
     def get_piece_color(self):
         """Returns the pieces color of the player"""
         return self._piece_color
 
+    def get_piece_count(self):
+        """Returns the number of pieces that the player has on the board"""
+        if Player.self_check:
+            self.check_counters()
+        return self._piece_count
+
     def get_king_count(self):
         """Returns the number of king pieces that the player has"""
-        king_count = 0
-        for piece in self._pieces_list:
-            if piece.is_king() and piece.get_location() is not None:
-                king_count += 1
-        return king_count
+        if Player.self_check:
+            self.check_counters()
+        return self._king_count
 
     def get_triple_king_count(self):
         """Returns the number of triple king pieces that the player has"""
-        triple_king_count = 0
+        if Player.self_check:
+            self.check_counters()
+        return self._triple_king_count
+
+    def check_counters(self):
+        """Counts the pieces on the board in the pieces list, raises CounterMismatch if a counter is different"""
+        piece_count = king_count = triple_king_count = 0
         for piece in self._pieces_list:
-            if piece.is_triple_king() and piece.get_location() is not None:
-                triple_king_count += 1
-        return triple_king_count
+            if piece.get_location() is not None:
+                piece_count += 1
+                king_count += piece.is_king()
+                triple_king_count += piece.is_triple_king()
+        counted = (piece_count, king_count, triple_king_count)
+        counters = (self._piece_count, self._king_count, self._triple_king_count)
+        if counted != counters:
+            raise CounterMismatch("Counters " + str(counters) + " of " + self._player_name
+                                  + " do not match the pieces " + str(counted))
 
     def get_captured_pieces_count(self):
         """Returns the number of opponent pieces that the player has captured"""
         return self._captured_pieces_count
 
+    def get_pieces(self):
+        """Returns the list of the player's pieces, captured pieces have no location"""
+        return self._pieces_list
+
     def add_piece(self, new_piece_object):
         """Adds a piece to player's piece list"""
         self._pieces_list.append(new_piece_object)
+        new_piece_object.set_player(self)
+        if new_piece_object.get_location() is not None:
+            self.count_piece(new_piece_object, 1)
+
+    def add_pieces(self, new_piece_objects):
+        """Adds pieces to player's piece list"""
+        for new_piece_object in new_piece_objects:
+            self.add_piece(new_piece_object)
+
+    def count_piece(self, piece, count):
+        """Adds count (1 when the piece is put back on the board, -1 when it's removed) to the counters"""
+        self._piece_count += count
+        if piece.is_king():
+            self._king_count += count
+        if piece.is_triple_king():
+            self._triple_king_count += count
+
+    def count_promotion(self, piece, was_king, was_triple_king):
+        """Updates the king counters after the rank of a piece on the board changed from was_king, was_triple_king"""
+        self._king_count += piece.is_king() - was_king
+        self._triple_king_count += piece.is_triple_king() - was_triple_king
 
     def add_captured_pieces(self, piece_num):
         """Adds captured pieces count"""
         self._captured_pieces_count += piece_num
 
 
+class BitBoardPlayer(Player):
+    """Represents a player in a game on the bitboard engine, the player's pieces are counted on the bitboards"""
+
+    __slots__ = ("_bit_board",)
+
+    def __init__(self, player_name, piece_color, bit_board):
+        super().__init__(player_name, piece_color)
+        self._bit_board = bit_board
+
+    def get_piece_count(self):
+        """Returns the number of pieces that the player has on the board"""
+        return self._bit_board.get_piece_count(self._piece_color)
+
+    def get_king_count(self):
+        """Returns the number of king pieces that the player has"""
+        return self._bit_board.get_king_count(self._piece_color)
+
+    def get_triple_king_count(self):
+        """Returns the number of triple king pieces that the player has"""
+        return self._bit_board.get_triple_king_count(self._piece_color)
+
+
 class Board:
     """Represents a checker board with 8 rows and 8 columns."""
 
+    __slots__ = ("_board",)
+
     def __init__(self):
         self._board = []
         for row in range(8):
@@ -333,7 +1149,7 @@ class Board:
     def remove_piece_from_board(self, location, next_destination=None):
         """Removes piece from board"""
         if next_destination is None:
-            self._board[location[0]][location[1]].get_piece().set_location_to_none()
+            remove_captured_piece(self._board[location[0]][location[1]].get_piece())
         self._board[location[0]][location[1]].remove_piece()
 
     def get_piece(self, location):
@@ -341,9 +1157,26 @@ class Board:
         return self._board[location[0]][location[1]].get_piece()
 
 
+def get_game_position(game):
+    """Returns the bitboards, the color to move and the square index of the pending piece of a Checkers game"""
+    color = game.get_player(game.get_current_turn()).get_piece_color()
+    pending_location = game.get_pending_location()
+    pending = None if pending_location is None else get_square_index(pending_location)
+    return game.get_bit_board().get_bitboards(), color, pending
+
+
+def remove_captured_piece(piece):
+    """Helper function of the boards that takes a captured piece off the board and off its player's counters"""
+    if piece.get_player() is not None:
+        piece.get_player().count_piece(piece, -1)
+    piece.set_location_to_none()
+
+
 class Square:
     """Represents a square of the checkerboard"""
 
+    __slots__ = ("_piece",)
+
     def __init__(self, piece=None):
         self._piece = piece
 
@@ -360,15 +1193,82 @@ class Square:
         self._piece = None
 
 
+class CompactSquare:
+    """Represents a square of a CompactBoard, a view of one entry of its flat list of pieces"""
+
+    __slots__ = ("_pieces", "_index")
+
+    def __init__(self, pieces, index):
+        self._pieces = pieces
+        self._index = index
+
+    def add_piece(self, new_piece):
+        """Adds a piece to this square"""
+        self._pieces[self._index] = new_piece
+
+    def get_piece(self):
+        """Returns piece in the square"""
+        return self._pieces[self._index]
+
+    def remove_piece(self):
+        """Removes the piece from square"""
+        self._pieces[self._index] = None
+
+
+class CompactBoard:
+    """
+    Represents a checker board with 8 rows and 8 columns as one flat list of 64 pieces.
+    It doesn't keep Square objects: get_board builds 64 CompactSquare views of the list on its first call
+    and returns the same views, which follow the pieces, on every later call.
+    """
+
+    __slots__ = ("_pieces", "_squares")
+
+    def __init__(self):
+        self._pieces = [None] * 64
+        self._squares = None  # rows of CompactSquare views, built by the first get_board
+
+    def get_board(self):
+        """Returns board as 8 rows of squares"""
+        if self._squares is None:
+            pieces = self._pieces
+            self._squares = [[CompactSquare(pieces, row * 8 + col) for col in range(8)] for row in range(8)]
+        return self._squares
+
+    def add_starting_pieces(self, new_pieces):
+        """Adds pieces to the board on their locations"""
+        for new_piece in new_pieces:
+            location = new_piece.get_location()
+            self._pieces[location[0] * 8 + location[1]] = new_piece
+
+    def add_piece_to_board(self, location, new_piece):
+        """Adds piece to board"""
+        self._pieces[location[0] * 8 + location[1]] = new_piece
+
+    def remove_piece_from_board(self, location, next_destination=None):
+        """Removes piece from board"""
+        index = location[0] * 8 + location[1]
+        if next_destination is None:
+            remove_captured_piece(self._pieces[index])
+        self._pieces[index] = None
+
+    def get_piece(self, location):
+        """Returns piece in the board"""
+        return self._pieces[location[0] * 8 + location[1]]
+
+
 class Piece:
     """Represents a checker piece"""
 
+    __slots__ = ("_owner", "_color", "_location", "_is_king", "_is_triple_king", "_player")
+
     def __init__(self, player_name, color, location):
         self._owner = player_name
         self._color = color
         self._location = location
         self._is_king = False
         self._is_triple_king = False
+        self._player = None  # Player object counting the piece, set by Player.add_piece
 
     def set_location_to_none(self):
         """Sets the piece location to none"""
@@ -380,21 +1280,9 @@ class Piece:
 
     def get_details(self):
         """The substitute string prints when printing the Piece object."""
-        if self._color == "White":
-            if self.is_triple_king():
-                return "White_Triple_King"
-            elif self.is_king():
-                return "White_king"
-            else:
-                return "White"
-
-        elif self._color == "Black":
-            if self.is_triple_king():
-                return "Black_Triple_King"
-            elif self.is_king():
-                return "Black_king"
-            else:
-                return "Black"
+        if self._is_triple_king:
+            return PIECE_DETAILS.get((self._color, False, True))
+        return PIECE_DETAILS.get((self._color, self._is_king, False))
 
     def get_color(self):
         """Returns the color of the piece."""
@@ -408,6 +1296,14 @@ class Piece:
         """Returns the owner name of the piece"""
         return self._owner
 
+    def get_player(self):
+        """Returns the Player object that the piece was added to, None if it was not added to a player"""
+        return self._player
+
+    def set_player(self, player):
+        """Sets the Player object that the piece was added to"""
+        self._player = player
+
     def make_king(self):
         """Promotes the piece to king."""
         self._is_king = True
@@ -417,6 +1313,11 @@ class Piece:
         self._is_king = False
         self._is_triple_king = True
 
+    def set_king_status(self, is_king, is_triple_king):
+        """Sets whether the piece is king and triple king, used to take back a promotion."""
+        self._is_king = is_king
+        self._is_triple_king = is_triple_king
+
     def is_king(self):
         """Returns True if the piece is king, False otherwise."""
         return self._is_king
@@ -1,8 +1,85 @@
 # Author: Chungman Chan
 # Description: unittests for CheckersGame
 
+import asyncio
+import io
+import json
+import os
+import random
+import struct
+import tempfile
 import unittest
-from CheckersGame import Checkers, InvalidPlayer, InvalidSquare, OutofTurn, Player, Board, Square, Piece
+from contextlib import redirect_stderr, redirect_stdout
+from multiprocessing import shared_memory
+
+from Benchmark import compare_results, load_results, main as benchmark_main, run_benchmarks, save_results
+from BitBoard import (DIAGONAL_PATHS, SQUARE_BITS, SQUARE_LOCATIONS, BitBoard, encode_move, get_move_captured,
+                      get_move_locations, get_square_index)
+from BoardView import FULL_BOARD, apply_changes, decode_bytes, decode_json
+from CheckersAI import END_CHAIN, ComputerPlayer, evaluate
+from CheckersGame import (Checkers, InvalidPlayer, InvalidSquare, OutofTurn, IllegalPly, CounterMismatch, Player,
+                          Board, Square, Piece, CompactBoard, GameSnapshot, CHANGE_LOG_SIZE, OBJECT_ENGINE,
+                          BITBOARD_ENGINE, COMPACT_ENGINE)
+from EvaluationCache import EvaluationCache, EvaluationCacheError, SharedEvaluationCache
+from GameArchive import GameArchive, GameArchiveWriter, build_index, get_index_path
+from GameRecord import GameRecordError, GameRecordWriter, read_games, record_game, decode_record_move
+from GameServer import GameClient, GameServer, GameServerError
+from MemoryBenchmark import benchmark_construction
+from MonteCarlo import MonteCarloPlayer, SearchTree
+from OpeningBook import OpeningBook, OpeningBookError
+from Perft import Perft, PerftError, cross_check, perft, play_reference_move, reference_perft, main as perft_main
+from Simulation import (BLACK_PLAYER, WHITE_PLAYER, capture_policy, get_play_game_moves, new_simulated_game,
+                        play_simulated_game, random_policy, replay_game, simulate_games)
+from Symmetry import (canonicalize, get_canonical_hash, get_canonical_key, get_snapshot, mirror_bitboard,
+                      mirror_location, mirror_move, mirror_position, restore_position)
+from Tablebase import (DRAW, LOSS, WIN, LEVEL_SIZES, Tablebase, TablebaseError, build_tablebase, get_position,
+                       get_position_index)
+from Tournament import (EngineSpec, SprtTest, Tournament, TournamentError, compute_ratings, gauntlet_schedule,
+                        get_sprt_llr, parse_engine_spec, play_tournament_game, round_robin_schedule,
+                        main as tournament_main)
+from Zobrist import EXACT, TranspositionTable, get_board_key, get_position_key
+try:
+    import numpy
+    import BatchEval
+except ImportError:
+    numpy = None
+
+# Moves of TestCheckersGame.test_play_game, the last one forces a triple king
+SCRIPTED_GAME = [("Black Player", (5, 4), (4, 3)), ("White Player", (2, 5), (3, 4)),
+                 ("Black Player", (6, 3), (5, 4)), ("White Player", (2, 3), (3, 2)),
+                 ("Black Player", (4, 3), (2, 5)), ("White Player", (1, 4), (2, 3)),
+                 ("Black Player", (5, 2), (4, 3)), ("White Player", (3, 2), (4, 1)),
+                 ("Black Player", (5, 0), (3, 2)), ("Black Player", (3, 2), (1, 4)),
+                 ("White Player", (1, 2), (2, 3)), ("Black Player", (6, 1), (5, 2)),
+                 ("White Player", (0, 3), (1, 2)), ("Black Player", (1, 4), (0, 3)),
+                 ("White Player", (1, 6), (3, 4)), ("Black Player", (0, 3), (1, 4)),
+                 ("White Player", (2, 3), (3, 2)), ("Black Player", (1, 4), (4, 1)),
+                 ("White Player", (2, 1), (3, 0)), ("Black Player", (7, 4), (6, 3)),
+                 ("White Player", (1, 0), (2, 1)), ("Black Player", (4, 1), (7, 4))]
+
+
+def new_game(engine=OBJECT_ENGINE):
+    """Returns a game with White Player and Black Player created"""
+    game = Checkers(engine)
+    game.create_player("White Player", "White")
+    game.create_player("Black Player", "Black")
+    return game
+
+
+def next_random_move(game, rng):
+    """Returns (player name, move) of a random legal move in the game, or None if no player can move"""
+    player_name, moves = game.get_turn_moves()
+    if not moves:
+        return None
+    return player_name, rng.choice(moves)
+
+
+def printed_board(game):
+    """Returns what print_board prints"""
+    output = io.StringIO()
+    with redirect_stdout(output):
+        game.print_board()
+    return output.getvalue()
 
 
 class TestSquare(unittest.TestCase):
@@ -225,5 +302,1515 @@ class TestCheckersGame(unittest.TestCase):
         self.assertEqual(self.player_2.get_captured_pieces_count(), 4)
 
 
+class TestBitBoardEngine(unittest.TestCase):
+    def setUp(self):
+        self.object_game = new_game(OBJECT_ENGINE)
+        self.bit_game = new_game(BITBOARD_ENGINE)
+
+    def test_unknown_engine(self):
+        self.assertRaises(ValueError, Checkers, "abacus")
+
+    def test_starting_board(self):
+        self.assertIsInstance(self.bit_game._game_board, BitBoard)
+        self.assertEqual(printed_board(self.bit_game), printed_board(self.object_game))
+        for row in range(8):
+            for col in range(8):
+                self.assertEqual(self.bit_game.get_checker_details((row, col)),
+                                 self.object_game.get_checker_details((row, col)))
+
+    def test_scripted_game_matches_object_board(self):
+        for player_name, start, destination in SCRIPTED_GAME:
+            self.assertEqual(self.bit_game.play_game(player_name, start, destination),
+                             self.object_game.play_game(player_name, start, destination))
+            self.assertEqual(self.bit_game._current_turn, self.object_game._current_turn)
+            self.assertEqual(printed_board(self.bit_game), printed_board(self.object_game))
+
+        self.assertEqual(self.bit_game.get_checker_details((7, 4)), "Black_Triple_King")
+        for player_name in ("Black Player", "White Player"):
+            bit_player = self.bit_game._players[player_name]
+            object_player = self.object_game._players[player_name]
+            self.assertEqual(bit_player.get_king_count(), object_player.get_king_count())
+            self.assertEqual(bit_player.get_triple_king_count(), object_player.get_triple_king_count())
+            self.assertEqual(bit_player.get_captured_pieces_count(), object_player.get_captured_pieces_count())
+
+    def test_exceptions(self):
+        self.assertRaises(InvalidPlayer, self.bit_game.play_game, "Red Player", (0, 1), (1, 2))
+        self.assertRaises(OutofTurn, self.bit_game.play_game, "White Player", (0, 1), (1, 2))
+        self.assertRaises(InvalidSquare, self.bit_game.play_game, "Black Player", (9, 1), (8, 1))
+        self.assertRaises(InvalidSquare, self.bit_game.play_game, "Black Player", (0, 1), (1, 2))
+        self.assertRaises(InvalidSquare, self.bit_game.play_game, "Black Player", (7, 0), (6, 1))
+        self.assertRaises(InvalidSquare, self.bit_game.play_game, "Black Player", (5, 0), (3, 4))
+        self.assertRaises(InvalidSquare, self.bit_game.get_checker_details, (9, 9))
+
+    def test_capture_continuation(self):
+        for player_name, start, destination in SCRIPTED_GAME[:9]:
+            self.bit_game.play_game(player_name, start, destination)
+        # Only the capturing piece can move again
+        self.assertRaises(OutofTurn, self.bit_game.play_game, "Black Player", (6, 1), (5, 0))
+        self.assertEqual(self.bit_game.play_game("Black Player", (3, 2), (1, 4)), 1)
+
+
+class TestLegalMoves(unittest.TestCase):
+    def setUp(self):
+        self.game = new_game()
+
+    def locations(self, moves):
+        return sorted(get_move_locations(move) for move in moves)
+
+    def test_starting_moves(self):
+        self.assertEqual(len(self.game.legal_moves("Black Player")), 7)
+        self.assertEqual(self.game.legal_moves("White Player"), [])
+        self.assertRaises(InvalidPlayer, self.game.legal_moves, "Red Player")
+
+    def test_capture_continuation(self):
+        for player_name, start, destination in SCRIPTED_GAME[:9]:
+            self.game.play_game(player_name, start, destination)
+        self.assertEqual(self.locations(self.game.legal_moves("Black Player")), [((3, 2), (1, 4))])
+        # The opponent may take the turn instead
+        self.assertTrue(self.game.legal_moves("White Player"))
+
+    def test_king_and_triple_king_moves(self):
+        game = new_game(BITBOARD_ENGINE)
+        board = game._game_board
+        black_king = 1 << get_square_index((6, 1))
+        white_pieces = (1 << get_square_index((4, 3))) | (1 << get_square_index((2, 5)))
+        board.set_bitboards(black_king, white_pieces, black_king, 0)
+        moves = game.legal_moves("Black Player")
+        captures = [move for move in moves if get_move_captured(move)]
+        # A king captures one piece, the second piece stops it
+        self.assertEqual(len(moves), 5)
+        self.assertEqual(self.locations(captures), [((6, 1), (3, 4))])
+
+        board.set_bitboards(black_king, white_pieces, 0, black_king)
+        moves = game.legal_moves("Black Player")
+        captures = [move for move in moves if get_move_captured(move)]
+        # A triple king captures up to two pieces
+        self.assertEqual(len(moves), 7)
+        self.assertEqual(self.locations(captures), [((6, 1), (0, 7)), ((6, 1), (1, 6)), ((6, 1), (3, 4))])
+        self.assertEqual(game.play_game("Black Player", (6, 1), (0, 7)), 2)
+        self.assertEqual(game.get_checker_details((0, 7)), "Black_Triple_King")
+
+    def test_random_games_match_play_game(self):
+        rng = random.Random(7)
+        for _ in range(20):
+            object_game = new_game(OBJECT_ENGINE)
+            bit_game = new_game(BITBOARD_ENGINE)
+            for _ in range(150):
+                choice = next_random_move(object_game, rng)
+                if choice is None:
+                    break
+                player_name, move = choice
+                self.assertEqual(sorted(bit_game.legal_moves(player_name)),
+                                 sorted(object_game.legal_moves(player_name)))
+                start, destination = get_move_locations(move)
+                captured = get_move_captured(move).bit_count()
+                self.assertEqual(object_game.play_game(player_name, start, destination), captured)
+                self.assertEqual(bit_game.play_game(player_name, start, destination), captured)
+            self.assertEqual(printed_board(bit_game), printed_board(object_game))
+
+
+def game_state(game):
+    """Returns the printed board, turn, pending location, captured counts, king counts of the game"""
+    players = game._players.values()
+    return (printed_board(game), game.get_current_turn(), game.get_pending_location(),
+            [player.get_captured_pieces_count() for player in players],
+            [player.get_king_count() for player in players],
+            [player.get_triple_king_count() for player in players])
+
+
+class TestMakeUnmakeMove(unittest.TestCase):
+    def check_engine(self, engine):
+        rng = random.Random(11)
+        for _ in range(10):
+            game = new_game(engine)
+            reference_game = new_game(OBJECT_ENGINE)
+            states = [game_state(game)]
+            for _ in range(150):
+                choice = next_random_move(reference_game, rng)
+                if choice is None:
+                    break
+                player_name, move = choice
+                start, destination = get_move_locations(move)
+                self.assertEqual(game.make_move(move), reference_game.play_game(player_name, start, destination))
+                self.assertEqual(game_state(game), game_state(reference_game))
+                states.append(game_state(game))
+
+            states.pop()
+            while states:
+                game.unmake_move()
+                self.assertEqual(game_state(game), states.pop())
+            self.assertIsNone(game._last_move)
+
+    def test_object_engine(self):
+        self.check_engine(OBJECT_ENGINE)
+
+    def test_bitboard_engine(self):
+        self.check_engine(BITBOARD_ENGINE)
+
+    def test_compact_engine(self):
+        self.check_engine(COMPACT_ENGINE)
+
+    def test_unmake_promotion(self):
+        game = new_game()
+        for player_name, start, destination in SCRIPTED_GAME[:13]:
+            game.play_game(player_name, start, destination)
+        piece = game.get_picked_checker((1, 4))
+        move = encode_move(get_square_index((1, 4)), get_square_index((0, 3)))
+        game.make_move(move)
+        self.assertEqual(game.get_checker_details((0, 3)), "Black_king")
+        game.unmake_move()
+        self.assertFalse(piece.is_king())
+        self.assertIs(game.get_picked_checker((1, 4)), piece)
+        self.assertEqual(piece.get_location(), (1, 4))
+
+
+class TestComputerPlayer(unittest.TestCase):
+    def test_best_move_is_legal(self):
+        game = new_game()
+        computer = ComputerPlayer(game)
+        move = computer.best_move("Black Player", 100)
+        self.assertIn(move, game.legal_moves("Black Player"))
+        info = computer.get_search_info()
+        self.assertGreaterEqual(info["depth"], 1)
+        self.assertGreater(info["nodes"], 0)
+        self.assertLess(info["time_ms"], 1000)
+        self.assertIsNone(computer.best_move("White Player", 100))
+
+    def test_finds_winning_capture(self):
+        game = new_game(BITBOARD_ENGINE)
+        black = (1 << get_square_index((5, 2))) | (1 << get_square_index((7, 0)))
+        white = 1 << get_square_index((4, 3))
+        game._game_board.set_bitboards(black, white, 0, 0)
+        computer = ComputerPlayer(game)
+        move = computer.best_move("Black Player", 200)
+        self.assertEqual(get_move_locations(move), ((5, 2), (3, 4)))
+        self.assertGreater(computer.get_search_info()["score"], 1000)
+        self.assertEqual(computer.play_turn("Black Player", 200), 1)
+
+    def test_continues_capture_chain(self):
+        game = new_game()
+        for player_name, start, destination in SCRIPTED_GAME[:9]:
+            game.play_game(player_name, start, destination)
+        computer = ComputerPlayer(game)
+        self.assertEqual(get_move_locations(computer.best_move("Black Player", 100)), ((3, 2), (1, 4)))
+
+
+class TestZobrist(unittest.TestCase):
+    def expected_hash(self, game):
+        pending_location = game.get_pending_location()
+        pending_square = None if pending_location is None else get_square_index(pending_location)
+        color = game.get_player(game.get_current_turn()).get_piece_color()
+        return get_position_key(get_board_key(*game.get_bit_board().get_bitboards()), color, pending_square)
+
+    def test_incremental_hash(self):
+        rng = random.Random(5)
+        for _ in range(10):
+            object_game = new_game(OBJECT_ENGINE)
+            # make_move and unmake_move on every engine, captures included
+            made_games = [new_game(engine) for engine in (OBJECT_ENGINE, COMPACT_ENGINE, BITBOARD_ENGINE)]
+            hashes = [(object_game.get_hash(), object_game.get_board_hash())]
+            for _ in range(150):
+                choice = next_random_move(object_game, rng)
+                if choice is None:
+                    break
+                player_name, move = choice
+                start, destination = get_move_locations(move)
+                object_game.play_game(player_name, start, destination)
+                self.assertEqual(object_game.get_hash(), self.expected_hash(object_game))
+                for game in made_games:
+                    game.make_move(move)
+                    self.assertEqual(game.get_hash(), object_game.get_hash())
+                    self.assertEqual(game.get_board_hash(), object_game.get_board_hash())
+                hashes.append((object_game.get_hash(), object_game.get_board_hash()))
+            hashes.pop()
+            while hashes:
+                expected = hashes.pop()
+                for game in made_games:
+                    game.unmake_move()
+                    self.assertEqual((game.get_hash(), game.get_board_hash()), expected)
+
+    def test_side_to_move_and_pending_piece(self):
+        game = new_game()
+        for player_name, start, destination in SCRIPTED_GAME[:9]:
+            game.play_game(player_name, start, destination)
+        board_key = get_board_key(*game.get_bit_board().get_bitboards())
+        pending_square = get_square_index((3, 2))
+        self.assertEqual(game.get_hash(), get_position_key(board_key, "Black", pending_square))
+        self.assertNotEqual(game.get_hash(), get_position_key(board_key, "Black"))
+        self.assertNotEqual(game.get_hash(), get_position_key(board_key, "White", pending_square))
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_probe_and_store(self):
+        table = TranspositionTable(4)
+        self.assertIsNone(table.probe(5))
+        table.store(5, 3, 10, EXACT, 42)
+        self.assertEqual(table.probe(5), (5, 3, 10, EXACT, 42))
+        # a shallower entry in the same bucket goes to the always-replace slot
+        table.store(9, 1, 20, EXACT, 7)
+        self.assertEqual(table.probe(5)[1], 3)
+        self.assertEqual(table.probe(9)[1], 1)
+        table.store(13, 1, 30, EXACT, 8)
+        self.assertIsNone(table.probe(9))
+        # a deeper entry replaces the depth-preferred slot
+        table.store(17, 4, 40, EXACT, 9)
+        self.assertIsNone(table.probe(5))
+        stats = table.get_stats()
+        self.assertEqual(stats["hits"], 3)
+        self.assertEqual(stats["misses"], 3)
+        self.assertEqual(stats["stores"], 4)
+
+
+class TestSimulation(unittest.TestCase):
+    def test_results_do_not_depend_on_workers(self):
+        in_process = list(simulate_games(5, workers=0, seed=3, max_moves=120))
+        in_pool = list(simulate_games(5, workers=2, seed=3, max_moves=120, chunk_size=2))
+        self.assertEqual(in_process, in_pool)
+        self.assertEqual([result["game"] for result in in_pool], list(range(5)))
+        self.assertNotEqual(in_pool[0]["moves"], in_pool[1]["moves"])
+
+    def test_replay_game(self):
+        for result in simulate_games(3, capture_policy, workers=0, seed=1):
+            game = replay_game(result["moves"])
+            self.assertEqual(game.game_winner(), result["winner"])
+            self.assertEqual(len(result["moves"]), result["move_count"])
+            for player_name in (BLACK_PLAYER, WHITE_PLAYER):
+                self.assertEqual(game.get_player(player_name).get_captured_pieces_count(),
+                                 result["captures"][player_name])
+
+
+class TestGameRecord(unittest.TestCase):
+    players = [("White Player", "White"), ("Black Player", "Black")]
+
+    def test_write_and_read_games(self):
+        moves = record_game(self.players, SCRIPTED_GAME)
+        self.assertEqual(moves[4][3], 1)
+        self.assertTrue(moves[13][4])
+        record_file = io.BytesIO()
+        writer = GameRecordWriter(record_file)
+        self.assertEqual(writer.write_game(self.players, moves), 0)
+        writer.write_game(self.players, SCRIPTED_GAME[:3])
+        record_file.seek(0)
+
+        games = read_games(record_file)
+        game = next(games)
+        self.assertEqual(game.get_players(), self.players)
+        self.assertEqual(game.get_moves(), SCRIPTED_GAME)
+        self.assertEqual(printed_board(game.replay()), printed_board(game.replay(BITBOARD_ENGINE)))
+        self.assertEqual(game.replay().get_checker_details((7, 4)), "Black_Triple_King")
+        self.assertEqual(next(games).get_moves(), SCRIPTED_GAME[:3])
+        self.assertRaises(StopIteration, next, games)
+
+    def test_move_record(self):
+        moves = record_game(self.players, SCRIPTED_GAME)
+        record_file = io.BytesIO()
+        GameRecordWriter(record_file).write_game(self.players, moves)
+        self.assertEqual(len(record_file.getvalue()), 7 + 1 + 2 * (2 + 12) + 4 + 2 * len(SCRIPTED_GAME))
+        record_file.seek(0)
+        record_moves = next(read_games(record_file))._record_moves
+        self.assertEqual(decode_record_move(record_moves[13]), ("Black", (1, 4), (0, 3), 0, True))
+
+    def test_bad_frame(self):
+        self.assertRaises(GameRecordError, list, read_games(io.BytesIO(b"XX" + bytes(10))))
+        self.assertRaises(GameRecordError, list, read_games(io.BytesIO(b"CR\x01")))
+
+
+class TestGameArchive(unittest.TestCase):
+    players = [("Black Player", "Black"), ("White Player", "White")]
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.archive_path = os.path.join(self.directory.name, "games.bin")
+        self.results = list(simulate_games(4, capture_policy, workers=0, seed=2))
+        with GameArchiveWriter(self.archive_path) as writer:
+            for result in self.results:
+                self.assertEqual(writer.add_game(self.players, get_play_game_moves(result["moves"])),
+                                 result["winner"])
+            writer.add_game(list(reversed(self.players)), SCRIPTED_GAME)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_random_access(self):
+        with GameArchive(self.archive_path) as archive:
+            self.assertEqual(len(archive), 5)
+            for game_number, result in enumerate(self.results):
+                self.assertEqual(archive.get_winner(game_number), result["winner"])
+                self.assertEqual(archive.get_metadata(game_number)["move_count"], result["move_count"])
+                game = archive.get_position(game_number, engine=BITBOARD_ENGINE)
+                self.assertEqual(printed_board(game), printed_board(replay_game(result["moves"])))
+            position = archive.get_position(4, 14)
+            self.assertEqual(position.get_checker_details((0, 3)), "Black_king")
+            self.assertIsNone(archive.get_position(4, 13).get_checker_details((0, 3)))
+            self.assertEqual(archive.get_metadata(4)["winner_color"], None)
+            self.assertRaises(IndexError, archive.get_game, 5)
+
+    def test_find_games_and_rebuild_index(self):
+        with GameArchive(self.archive_path) as archive:
+            black_wins = list(archive.find_games("Black"))
+            long_games = list(archive.find_games(min_moves=30))
+        self.assertEqual(black_wins, [number for number, result in enumerate(self.results)
+                                      if result["winner"] == "Black Player"])
+        os.remove(get_index_path(self.archive_path))
+        self.assertEqual(build_index(self.archive_path), 5)
+        with GameArchive(self.archive_path) as archive:
+            self.assertEqual(list(archive.find_games(min_moves=30)), long_games)
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestBatchEval(unittest.TestCase):
+    def setUp(self):
+        self.games = [replay_game(result["moves"]) for result in simulate_games(8, workers=0, seed=4)]
+        self.games.append(new_game())
+
+    def test_export(self):
+        squares = BatchEval.export_squares(self.games)
+        self.assertEqual(squares.shape, (9, 32))
+        self.assertEqual(squares.dtype, numpy.int8)
+        grid = BatchEval.squares_to_grid(squares)
+        labels = {0: None, 1: "Black", 2: "Black_king", 3: "Black_Triple_King",
+                  -1: "White", -2: "White_king", -3: "White_Triple_King"}
+        for game, board in zip(self.games, grid):
+            for row in range(8):
+                for col in range(8):
+                    self.assertEqual(labels[int(board[row, col])], game.get_checker_details((row, col)))
+        self.assertTrue((BatchEval.grid_to_squares(grid) == squares).all())
+
+    def test_features(self):
+        features = BatchEval.compute_features(BatchEval.export_squares(self.games))
+        for game, row in zip(self.games, features):
+            black = game.get_player_by_color("Black")
+            white = game.get_player_by_color("White")
+            bit_board = game.get_bit_board()
+            self.assertEqual(row[1], game.get_player(black).get_king_count() - game.get_player(white).get_king_count())
+            self.assertEqual(row[2], game.get_player(black).get_triple_king_count()
+                             - game.get_player(white).get_triple_king_count())
+            quiet_moves = [len([move for move in bit_board.generate_moves(color) if not move >> 10])
+                           for color in ("Black", "White")]
+            self.assertEqual(row[3], quiet_moves[0] - quiet_moves[1])
+        self.assertEqual(list(features[-1]), [0, 0, 0, 0, 0])
+
+    def test_linear_evaluator(self):
+        evaluator = BatchEval.LinearEvaluator()
+        squares = BatchEval.export_squares(self.games)
+        scores = evaluator.evaluate_squares(squares)
+        expected = BatchEval.compute_features(squares) @ numpy.array(BatchEval.DEFAULT_WEIGHTS)
+        self.assertTrue(numpy.allclose(scores, expected))
+        side = BatchEval.export_side_to_move(self.games)
+        self.assertTrue(numpy.allclose(evaluator.evaluate_games(self.games), scores * side))
+        self.assertRaises(ValueError, BatchEval.LinearEvaluator, (1.0, 2.0))
+
+
+class TestCompactEngine(unittest.TestCase):
+    def test_scripted_game_matches_object_board(self):
+        compact_game = new_game(COMPACT_ENGINE)
+        object_game = new_game(OBJECT_ENGINE)
+        self.assertIsInstance(compact_game._game_board, CompactBoard)
+        self.assertEqual([piece.get_location() for piece in compact_game._players["Black Player"].get_pieces()],
+                         [piece.get_location() for piece in object_game._players["Black Player"].get_pieces()])
+        self.assertEqual(compact_game.get_hash(), object_game.get_hash())
+        for player_name, start, destination in SCRIPTED_GAME:
+            self.assertEqual(compact_game.play_game(player_name, start, destination),
+                             object_game.play_game(player_name, start, destination))
+            self.assertEqual(printed_board(compact_game), printed_board(object_game))
+        self.assertEqual(compact_game.get_hash(), object_game.get_hash())
+
+    def test_flyweight_squares(self):
+        game = new_game(COMPACT_ENGINE)
+        printed_board(game)
+        self.assertIsNone(game.get_game_board()._squares)
+        squares = game.get_game_board().get_board()
+        self.assertIs(game.get_game_board().get_board(), squares)
+        self.assertEqual(squares[5][0].get_piece().get_details(), "Black")
+        game.play_game("Black Player", (5, 0), (4, 1))
+        self.assertIsNone(squares[5][0].get_piece())
+        self.assertEqual(squares[4][1].get_piece().get_details(), "Black")
+        self.assertFalse(hasattr(squares[0][0], "__dict__"))
+
+    def test_slots(self):
+        piece = Piece("Lili", "Black", (0, 0))
+        self.assertFalse(hasattr(piece, "__dict__"))
+        self.assertFalse(hasattr(Square(), "__dict__"))
+        self.assertFalse(hasattr(Player("Lili", "Black"), "__dict__"))
+
+    def test_benchmark(self):
+        object_result = benchmark_construction(OBJECT_ENGINE, 200)
+        compact_result = benchmark_construction(COMPACT_ENGINE, 200)
+        self.assertLess(compact_result["bytes_per_game"], object_result["bytes_per_game"])
+
+
+def piece_counts(game):
+    """Returns the piece, king and triple king counts of every player of the game"""
+    return {player_name: (game.get_player(player_name).get_piece_count(), game.get_player(player_name).get_king_count(),
+                          game.get_player(player_name).get_triple_king_count())
+            for player_name in ("Black Player", "White Player")}
+
+
+class TestPieceCounters(unittest.TestCase):
+    def setUp(self):
+        Player.self_check = True
+
+    def tearDown(self):
+        Player.self_check = False
+
+    def check_engine(self, engine):
+        rng = random.Random(5)
+        for _ in range(10):
+            game = new_game(engine)
+            bitboard_game = new_game(BITBOARD_ENGINE)
+            self.assertEqual(piece_counts(game), {"Black Player": (12, 0, 0), "White Player": (12, 0, 0)})
+            counts = []
+            for ply in range(150):
+                choice = next_random_move(bitboard_game, rng)
+                if choice is None:
+                    break
+                player_name, move = choice
+                start, destination = get_move_locations(move)
+                bitboard_game.make_move(move)
+                # play_game for the first moves, then make_move so that the moves can be taken back
+                if ply < 50:
+                    game.play_game(player_name, start, destination)
+                else:
+                    counts.append(piece_counts(game))
+                    game.make_move(move)
+                self.assertEqual(piece_counts(game), piece_counts(bitboard_game))
+
+            while counts:
+                game.unmake_move()
+                self.assertEqual(piece_counts(game), counts.pop())
+
+    def test_object_engine(self):
+        self.check_engine(OBJECT_ENGINE)
+
+    def test_compact_engine(self):
+        self.check_engine(COMPACT_ENGINE)
+
+    def test_scripted_game(self):
+        game = new_game()
+        for player_name, start, destination in SCRIPTED_GAME:
+            game.play_game(player_name, start, destination)
+        self.assertEqual(game.get_player("White Player").get_piece_count(),
+                         12 - game.get_player("Black Player").get_captured_pieces_count())
+        self.assertEqual(game.get_player("Black Player").get_piece_count(),
+                         12 - game.get_player("White Player").get_captured_pieces_count())
+
+    def test_mismatch(self):
+        game = new_game()
+        game.get_picked_checker((5, 0)).make_king()
+        with self.assertRaises(CounterMismatch):
+            game.get_player("Black Player").get_king_count()
+        Player.self_check = False
+        self.assertEqual(game.get_player("Black Player").get_king_count(), 0)
+
+
+class TestGameServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = GameServer(max_sessions=1000, push_interval=0.01)
+        self.host, self.port = await self.server.start(port=0)
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def new_server_game(self, client, game_id=None):
+        game_id = (await client.request("create_game", game=game_id))["game"]
+        await client.request("create_player", game=game_id, player="White Player", color="White")
+        await client.request("create_player", game=game_id, player="Black Player", color="Black")
+        return game_id
+
+    async def test_scripted_game(self):
+        client = await GameClient.connect(self.host, self.port)
+        game_id = await self.new_server_game(client, "scripted")
+        game = new_game(BITBOARD_ENGINE)
+        for player_name, start, destination in SCRIPTED_GAME:
+            self.assertEqual(await client.play_game(game_id, player_name, start, destination),
+                             game.play_game(player_name, start, destination))
+        state = await client.request("get_state", game=game_id)
+        self.assertEqual(state["bitboards"], list(game.get_bit_board().get_bitboards()))
+        self.assertEqual(state["turn"], game.get_current_turn())
+        self.assertEqual(state["winner"], game.game_winner())
+        await client.close()
+
+    async def test_errors(self):
+        client = await GameClient.connect(self.host, self.port)
+        game_id = await self.new_server_game(client)
+        with self.assertRaises(OutofTurn):
+            await client.play_game(game_id, "White Player", (2, 1), (3, 0))
+        with self.assertRaises(InvalidSquare):
+            await client.play_game(game_id, "Black Player", (4, 1), (3, 0))
+        with self.assertRaises(InvalidPlayer):
+            await client.play_game(game_id, "Lili", (5, 0), (4, 1))
+        with self.assertRaises(GameServerError) as context:
+            await client.play_game("missing", "Black Player", (5, 0), (4, 1))
+        self.assertEqual(context.exception.code, "unknown_game")
+        with self.assertRaises(GameServerError) as context:
+            await client.request("create_game", game=game_id)
+        self.assertEqual(context.exception.code, "game_exists")
+        for request in (b'{"id":1,"op":"get_state","game":[1]}', b'{"id":2,"op":"create_player","game":{},'
+                        b'"player":"P","color":"Black"}', b'{"id":3,"op":"play_game","game":"%s","player":[],'
+                        b'"start":[5,0],"destination":[4,1]}' % game_id.encode()):
+            self.assertEqual(self.server.handle_request(None, request)["error"], "bad_request")
+        with self.assertLogs("GameServer", "ERROR"):
+            reply = self.server.handle_request(None, b'{"id":4,"op":"subscribe","game":"%s"}' % game_id.encode())
+        self.assertEqual(reply, {"id": 4, "error": "internal_error", "message": "Internal server error"})
+        # the connection still serves requests after the errors
+        self.assertEqual(await client.play_game(game_id, "Black Player", (5, 0), (4, 1)), 0)
+        await client.close()
+
+    async def test_create_player_checks(self):
+        client = await GameClient.connect(self.host, self.port)
+        full_game = await self.new_server_game(client)
+        game_id = (await client.request("create_game"))["game"]
+        await client.request("create_player", game=game_id, player="White Player", color="White")
+        for game, player_name, color, message in ((full_game, "Third Player", "Black", "two players"),
+                                                  (game_id, "White Player", "Black", "player White Player"),
+                                                  (game_id, "Other Player", "White", "color White")):
+            with self.assertRaises(GameServerError) as context:
+                await client.request("create_player", game=game, player=player_name, color=color)
+            self.assertEqual(context.exception.code, "bad_request")
+            self.assertIn(message, str(context.exception))
+        await client.request("create_player", game=game_id, player="Black Player", color="Black")
+        self.assertEqual(await client.play_game(game_id, "Black Player", (5, 0), (4, 1)), 0)
+        await client.close()
+
+    async def test_batched_pushes(self):
+        await self.server.close()
+        self.server = GameServer(push_interval=60)
+        self.host, self.port = await self.server.start(port=0)
+        player = await GameClient.connect(self.host, self.port)
+        watcher = await GameClient.connect(self.host, self.port)
+        game_id = await self.new_server_game(player)
+        self.assertEqual((await watcher.request("subscribe", game=game_id))["version"], 2)
+        for player_name, start, destination in SCRIPTED_GAME[:4]:
+            await player.play_game(game_id, player_name, start, destination)
+        self.server.push_changes()
+        push = await asyncio.wait_for(watcher.next_push(), 1)
+        # the four moves played within a push interval are sent as one state
+        self.assertEqual(push["version"], 6)
+        self.assertEqual(push["bitboards"], (await player.request("get_state", game=game_id))["bitboards"])
+        self.server.push_changes()
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(watcher.next_push(), 0.1)
+        await player.close()
+        await watcher.close()
+
+    async def test_many_sessions(self):
+        clients = [await GameClient.connect(self.host, self.port) for _ in range(4)]
+
+        async def play_games(client):
+            for _ in range(50):
+                game_id = await self.new_server_game(client)
+                await client.play_game(game_id, "Black Player", (5, 0), (4, 1))
+
+        await asyncio.gather(*(play_games(client) for client in clients))
+        self.assertEqual(self.server.get_stats(), {"sessions": 200, "connections": 4})
+        for client in clients:
+            await client.close()
+
+
+class TestTablebase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "tablebase.bin")
+        cls.entry_count = build_tablebase(cls.path, 2)
+        cls.tablebase = Tablebase(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tablebase.close()
+        cls.directory.cleanup()
+
+    def test_file_size(self):
+        # the positions with Black to move, the positions with White to move are their mirrors
+        self.assertEqual(self.entry_count, (LEVEL_SIZES[1] + LEVEL_SIZES[2]) // 2)
+        self.assertEqual(os.path.getsize(self.path), 8 + 2 * self.entry_count)
+        self.assertEqual(self.tablebase.get_max_pieces(), 2)
+
+    def test_position_index(self):
+        for index in range(0, LEVEL_SIZES[2], 7):
+            self.assertEqual(get_position_index(*get_position(2, index)), index)
+
+    def test_results_match_moves(self):
+        # the result of a position is the best result of its moves
+        rng = random.Random(3)
+        bit_board = BitBoard()
+        results = set()
+        for _ in range(2000):
+            black, white, kings, triple_kings, color = get_position(2, rng.randrange(LEVEL_SIZES[2]))
+            if not black or not white:
+                continue
+            bit_board.set_bitboards(black, white, kings, triple_kings)
+            result = self.tablebase.probe_board(bit_board, color)
+            results.add(result[0])
+            move_results = []
+            for move in bit_board.generate_moves(color):
+                saved = bit_board.make_move(move)
+                if move >> 10:
+                    move_result = self.tablebase.probe_board(bit_board, color, (move >> 5) & 31)
+                else:
+                    move_result = self.tablebase.probe_board(bit_board, "White" if color == "Black" else "Black")
+                    move_result = ({WIN: LOSS, LOSS: WIN, DRAW: DRAW}[move_result[0]], move_result[1])
+                bit_board.unmake_move(saved)
+                move_results.append(move_result)
+            if not move_results:
+                self.assertEqual(result, (LOSS, 0))
+            elif result[0] == WIN:
+                self.assertEqual(result[1], 1 + min(distance for found, distance in move_results if found == WIN))
+            elif result[0] == LOSS:
+                self.assertTrue(all(found == LOSS for found, distance in move_results))
+                self.assertEqual(result[1], 1 + max(distance for found, distance in move_results))
+            else:
+                self.assertIn(DRAW, [found for found, distance in move_results])
+                self.assertNotIn(WIN, [found for found, distance in move_results])
+        self.assertEqual(results, {DRAW, WIN, LOSS})
+
+    def test_probe_game(self):
+        game = new_game(BITBOARD_ENGINE)
+        game._game_board.set_bitboards(1 << get_square_index((5, 2)), 1 << get_square_index((4, 3)), 0, 0)
+        self.assertEqual(self.tablebase.probe(game), (WIN, 1))
+        game.play_game("Black Player", (5, 2), (3, 4))
+        self.assertEqual(self.tablebase.probe(game), (WIN, 0))
+        self.assertIsNone(self.tablebase.probe(new_game()))
+
+    def test_computer_player(self):
+        game = new_game(BITBOARD_ENGINE)
+        game._game_board.set_bitboards(1 << get_square_index((5, 2)), 1 << get_square_index((4, 3)), 0, 0)
+        computer = ComputerPlayer(game, tablebase=self.tablebase)
+        self.assertEqual(get_move_locations(computer.best_move("Black Player", 200)), ((5, 2), (3, 4)))
+        self.assertGreater(computer.get_search_info()["score"], 1000)
+
+    def test_bad_file(self):
+        path = os.path.join(self.directory.name, "bad.bin")
+        with open(path, "wb") as bad_file:
+            bad_file.write(b"CKTB" + bytes(100))
+        with self.assertRaises(TablebaseError):
+            Tablebase(path)
+        with self.assertRaises(TablebaseError):
+            build_tablebase(path, 5)
+
+
+class TestOpeningBook(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.players = [(BLACK_PLAYER, "Black"), (WHITE_PLAYER, "White")]
+        cls.games = [(get_play_game_moves(result["moves"]), result["winner"])
+                     for result in simulate_games(20, workers=0, seed=4, max_moves=60)]
+        cls.book = OpeningBook(depth=6)
+        for moves, winner in cls.games:
+            cls.book.add_game(cls.players, moves)
+
+    def test_start_position(self):
+        game = new_simulated_game()
+        book_moves = self.book.get_book_moves(game)
+        self.assertEqual(sum(book_move["games"] for book_move in book_moves), 20)
+        self.assertEqual([book_move["games"] for book_move in book_moves],
+                         sorted((book_move["games"] for book_move in book_moves), reverse=True))
+        legal_moves = [get_move_locations(move) for move in game.legal_moves(BLACK_PLAYER)]
+        for book_move in book_moves:
+            self.assertIn((book_move["start"], book_move["destination"]), legal_moves)
+        self.assertEqual(self.book.get_game_count(), 20)
+
+    def test_outcomes(self):
+        black_wins = sum(1 for moves, winner in self.games if winner == BLACK_PLAYER)
+        book_moves = self.book.get_book_moves(new_simulated_game())
+        self.assertEqual(sum(book_move["wins"] for book_move in book_moves), black_wins)
+
+    def test_follow_book(self):
+        # every game of the book can be followed move by move on the object engine
+        moves, winner = self.games[0]
+        game = new_simulated_game(OBJECT_ENGINE)
+        for player_name, start, destination in moves[:6]:
+            self.assertIn((start, destination), [(book_move["start"], book_move["destination"])
+                                                 for book_move in self.book.get_book_moves(game)])
+            game.play_game(player_name, start, destination)
+        self.assertEqual(self.book.get_book_moves(game), [])
+        self.assertIsNone(self.book.choose_move(game, random.Random(0)))
+        self.assertIsNotNone(self.book.choose_move(new_simulated_game(), random.Random(0)))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.bin")
+            rows = self.book.save(path)
+            self.assertEqual(os.path.getsize(path), 16 + 22 * rows)
+            book = OpeningBook.load(path)
+            self.assertEqual(book.get_depth(), 6)
+            self.assertEqual(book.get_game_count(), 20)
+            self.assertEqual(book.get_position_count(), self.book.get_position_count())
+            self.assertEqual(book.get_book_moves(new_simulated_game()),
+                             self.book.get_book_moves(new_simulated_game()))
+            with open(path, "r+b") as book_file:
+                book_file.write(b"XXXX")
+            with self.assertRaises(OpeningBookError):
+                OpeningBook.load(path)
+
+    def test_add_archive(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.bin")
+            with GameArchiveWriter(path) as writer:
+                for moves, winner in self.games:
+                    writer.add_game(self.players, moves)
+            book = OpeningBook(depth=6)
+            with GameArchive(path) as archive:
+                book.add_archive(archive)
+            game = new_simulated_game()
+            self.assertEqual(book.get_book_moves(game), self.book.get_book_moves(game))
+
+
+class TestProfiling(unittest.TestCase):
+    def test_phases(self):
+        game = new_game()
+        reference_game = new_game()
+        profiler = game.enable_profiling()
+        self.assertIs(game.get_profiler(), profiler)
+        self.assertIsInstance(game, Checkers)
+        for player_name, start, destination in SCRIPTED_GAME:
+            self.assertEqual(game.play_game(player_name, start, destination),
+                             reference_game.play_game(player_name, start, destination))
+        self.assertEqual(printed_board(game), printed_board(reference_game))
+
+        phases = profiler.snapshot()
+        self.assertEqual(phases["Checkers.play_game"]["calls"], len(SCRIPTED_GAME))
+        self.assertEqual(phases["Checkers.move_destination"]["calls"], len(SCRIPTED_GAME))
+        self.assertEqual(phases["Checkers.resolve_captures"]["calls"], len(SCRIPTED_GAME))
+        captured = sum(game.get_player(name).get_captured_pieces_count() for name in ("Black Player", "White Player"))
+        # one removal per captured piece and one per move from the starting square
+        self.assertEqual(phases["Board.remove_piece_from_board"]["calls"], captured + len(SCRIPTED_GAME))
+        self.assertLessEqual(phases["Checkers.resolve_captures"]["total_ms"], phases["Checkers.play_game"]["total_ms"])
+        for stats in phases.values():
+            self.assertLessEqual(stats["self_ms"], stats["total_ms"] + 1e-9)
+
+        folded = profiler.export_folded().splitlines()
+        self.assertIn("Checkers.play_game", [line.rsplit(" ", 1)[0] for line in folded])
+        self.assertTrue(any(line.startswith("Checkers.play_game;Checkers.remove_captured_pieces;"
+                                            "Board.remove_piece_from_board") for line in folded))
+
+        game.disable_profiling()
+        self.assertIs(type(game), Checkers)
+        self.assertIs(type(game.get_game_board()), Board)
+        self.assertIsNone(game.get_profiler())
+
+    def test_exceptions(self):
+        game = new_game(BITBOARD_ENGINE)
+        profiler = game.enable_profiling()
+        with self.assertRaises(OutofTurn):
+            game.play_game("White Player", (2, 1), (3, 0))
+        game.play_game("Black Player", (5, 0), (4, 1))
+        phases = profiler.snapshot()
+        self.assertEqual(phases["Checkers.play_game"]["calls"], 2)
+        self.assertEqual(phases["Checkers.play_game_bitboard"]["calls"], 2)
+        self.assertEqual(phases["BitBoard.move_piece"]["calls"], 1)
+        # the call stack was unwound by the exception, the second play_game is not nested in the first one
+        for line in profiler.export_folded(io.StringIO()).splitlines():
+            self.assertTrue(line.startswith("Checkers.play_game"))
+            self.assertEqual(line.count("Checkers.play_game;"), 1 if ";" in line else 0)
+        profiler.reset()
+        self.assertEqual(profiler.snapshot(), {})
+        game.disable_profiling()
+        self.assertIs(type(game.get_game_board()), BitBoard)
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_run_and_compare(self):
+        results = run_benchmarks(scale=0.01)
+        self.assertIn("construction/object", results)
+        self.assertIn("play_game/capture/compact", results)
+        self.assertIn("play_game/king/bitboard", results)
+        self.assertIn("print_board/object", results)
+        self.assertIn("get_checker_details/bitboard", results)
+        self.assertIn("playouts/bitboard", results)
+        self.assertTrue(all(rate > 0 for rate in results.values()))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baseline.json")
+            save_results(results, path)
+            self.assertEqual(load_results(path), results)
+            # a baseline ten times faster reports every benchmark as a regression
+            save_results({name: rate * 10 for name, rate in results.items()}, path)
+            with redirect_stdout(io.StringIO()) as output:
+                self.assertEqual(benchmark_main(["--scale", "0.01", "--baseline", path]), 1)
+            self.assertIn("%d regression(s)" % len(results), output.getvalue())
+            with open(path) as results_file:
+                self.assertEqual(json.load(results_file)["version"], 1)
+
+    def test_compare_results(self):
+        rows = compare_results({"a": 100.0, "b": 80.0, "c": 130.0, "d": 1.0}, {"a": 105.0, "b": 100.0, "c": 100.0,
+                                                                                "e": 1.0})
+        self.assertEqual([(row[0], row[4]) for row in rows],
+                         [("a", "ok"), ("b", "regression"), ("c", "improvement"), ("d", "new"), ("e", "missing")])
+        self.assertAlmostEqual(rows[1][3], -0.2)
+
+
+class TestCaptureResolution(unittest.TestCase):
+    def test_diagonal_paths(self):
+        for start in range(32):
+            for destination in range(32):
+                (start_row, start_col), (row, col) = SQUARE_LOCATIONS[start], SQUARE_LOCATIONS[destination]
+                path = DIAGONAL_PATHS[start][destination]
+                if start == destination or abs(row - start_row) != abs(col - start_col):
+                    self.assertIsNone(path)
+                    continue
+                row_step = 1 if row > start_row else -1
+                col_step = 1 if col > start_col else -1
+                between = [(start_row + step * row_step, start_col + step * col_step)
+                           for step in range(1, abs(row - start_row))]
+                self.assertEqual(path, tuple(get_square_index(location) for location in between))
+
+    def test_invalid_moves_change_nothing(self):
+        for engine in (OBJECT_ENGINE, COMPACT_ENGINE, BITBOARD_ENGINE):
+            game = new_game(engine)
+            for player_name, start, destination in SCRIPTED_GAME[:9]:
+                game.play_game(player_name, start, destination)
+            board = printed_board(game)
+            key = game.get_hash()
+            # the capturing piece on (3, 2) moves to squares not on a diagonal, off the board and a white square
+            for destination in ((2, 5), (5, 6), (8, 5), (-1, 5), (3, 4)):
+                with self.assertRaises(InvalidSquare):
+                    game.play_game("Black Player", (3, 2), destination)
+                self.assertEqual(printed_board(game), board)
+                self.assertEqual(game.get_hash(), key)
+            self.assertEqual(game.play_game(*SCRIPTED_GAME[9]), 1)
+
+    def test_captured_squares_buffer(self):
+        game = new_game()
+        for player_name, start, destination in SCRIPTED_GAME[:9]:
+            game.play_game(player_name, start, destination)
+        player_name, start, destination = SCRIPTED_GAME[9]
+        count = game.resolve_captures(player_name, get_square_index(start), get_square_index(destination))
+        self.assertEqual(count, 1)
+        # resolving does not change the board
+        self.assertIsNotNone(game.get_picked_checker(SQUARE_LOCATIONS[game._captured_squares[0]]))
+
+
+
+class TestSnapshot(unittest.TestCase):
+    def test_snapshot_is_equal_on_every_engine(self):
+        snapshots = set()
+        for engine in (OBJECT_ENGINE, COMPACT_ENGINE, BITBOARD_ENGINE):
+            game = new_game(engine)
+            for player_name, start, destination in SCRIPTED_GAME[:9]:
+                game.play_game(player_name, start, destination)
+            snapshot = game.snapshot()
+            self.assertEqual(snapshot.pending_square, get_square_index((3, 2)))
+            self.assertEqual(snapshot.current_turn, "Black Player")
+            snapshots.add(snapshot)
+        self.assertEqual(len(snapshots), 1)
+
+    def test_from_snapshot(self):
+        rng = random.Random(5)
+        for engine in (OBJECT_ENGINE, COMPACT_ENGINE, BITBOARD_ENGINE):
+            game = new_game(OBJECT_ENGINE)
+            for _ in range(60):
+                choice = next_random_move(game, rng)
+                if choice is None:
+                    break
+                restored = Checkers.from_snapshot(game.snapshot(), engine)
+                self.assertEqual(game_state(restored), game_state(game))
+                self.assertEqual(restored.get_hash(), game.get_hash())
+                self.assertEqual(restored.snapshot(), game.snapshot())
+                self.assertEqual(restored.get_turn_moves(), game.get_turn_moves())
+                for player in restored._players.values():
+                    player.check_counters()
+                player_name, move = choice
+                game.play_game(player_name, *get_move_locations(move))
+
+    def test_fork_continues_a_capture(self):
+        for engine in (OBJECT_ENGINE, COMPACT_ENGINE, BITBOARD_ENGINE):
+            game = new_game(engine)
+            for player_name, start, destination in SCRIPTED_GAME[:9]:
+                game.play_game(player_name, start, destination)
+            board = printed_board(game)
+            fork = game.fork()
+            self.assertEqual(fork.get_engine(), engine)
+            with self.assertRaises(OutofTurn):
+                fork.play_game("Black Player", (6, 1), (5, 0))
+            self.assertEqual(fork.play_game(*SCRIPTED_GAME[9]), 1)
+            for player_name, start, destination in SCRIPTED_GAME[10:]:
+                fork.play_game(player_name, start, destination)
+            self.assertEqual(fork.get_checker_details((7, 4)), "Black_Triple_King")
+            self.assertEqual(printed_board(game), board)
+            self.assertEqual(game.play_game(*SCRIPTED_GAME[9]), 1)
+
+    def test_snapshot_is_immutable(self):
+        snapshot = new_game().snapshot()
+        with self.assertRaises(AttributeError):
+            snapshot.current_turn = "White Player"
+        self.assertEqual({snapshot: 1}[new_game(BITBOARD_ENGINE).snapshot()], 1)
+
+
+class TestMonteCarlo(unittest.TestCase):
+    def test_best_move_is_legal_and_repeatable(self):
+        game = new_game(BITBOARD_ENGINE)
+        for player_name, start, destination in SCRIPTED_GAME[:9]:
+            game.play_game(player_name, start, destination)
+        moves = [MonteCarloPlayer(game, seed=3).best_move("Black Player", iterations=100) for _ in range(2)]
+        self.assertEqual(moves[0], moves[1])
+        self.assertIn(moves[0], game.legal_moves("Black Player"))
+        self.assertEqual(get_move_locations(moves[0]), ((3, 2), (1, 4)))
+
+    def test_finds_the_winning_capture(self):
+        # Black man on (4, 3) can capture the last White piece on (3, 4), or step away
+        snapshot = GameSnapshot(SQUARE_BITS[get_square_index((4, 3))], SQUARE_BITS[get_square_index((3, 4))], 0, 0,
+                                (("White Player", "White", 11), ("Black Player", "Black", 11)), "Black Player", None)
+        game = Checkers.from_snapshot(snapshot)
+        player = MonteCarloPlayer(game, seed=1)
+        self.assertEqual(player.play_turn("Black Player", iterations=200), 1)
+        self.assertEqual(game.game_winner(), "Black Player")
+        self.assertIsNone(player.best_move("White Player", iterations=10))
+
+    def test_tree_reuse(self):
+        game = new_game(BITBOARD_ENGINE)
+        player = MonteCarloPlayer(game, seed=2)
+        player.play_turn("Black Player", iterations=300)
+        self.assertFalse(player.get_search_info()["reused"])
+        visits = player.get_search_info()["visits"]
+        self.assertEqual(visits, 300)
+        # the White move played is one of the searched replies
+        tree_root = player._tree.get_root()
+        white_move = max(tree_root.children, key=lambda child: child.visits).children[0].move
+        game.make_move(white_move)
+        player.best_move("Black Player", iterations=50)
+        self.assertTrue(player.get_search_info()["reused"])
+        self.assertGreater(player.get_search_info()["visits"], 50)
+
+    def test_search_tree_keeps_the_capture_chain(self):
+        game = new_game(BITBOARD_ENGINE)
+        for player_name, start, destination in SCRIPTED_GAME[:9]:
+            game.play_game(player_name, start, destination)
+        tree = SearchTree(seed=4)
+        tree.set_root(game.get_bit_board().get_bitboards(), "Black", get_square_index((3, 2)))
+        tree.run(iterations=60)
+        root = tree.get_root()
+        self.assertEqual(set(tree.get_root_stats()), set(game.legal_moves("Black Player")))
+        self.assertEqual(root.visits, 60)
+        # after the capture from (3, 2) the piece can't capture again, White moves
+        child = root.children[0]
+        self.assertEqual(child.color, "White")
+        self.assertIsNone(child.pending)
+        self.assertNotIn(END_CHAIN, [grandchild.move for grandchild in child.children])
+
+    def test_root_parallel_workers(self):
+        game = new_game(BITBOARD_ENGINE)
+        player = MonteCarloPlayer(game, workers=2, seed=5)
+        try:
+            move = player.best_move("Black Player", iterations=30)
+            self.assertIn(move, game.legal_moves("Black Player"))
+            info = player.get_search_info()
+            self.assertEqual(info["iterations"], 60)
+            # every worker process runs one search, the visits of both trees are added up
+            self.assertEqual(info["visits"], 60)
+            player.best_move("Black Player", iterations=10)
+            self.assertTrue(player.get_search_info()["reused"])
+        finally:
+            player.close()
+
+    def test_plays_a_game(self):
+        game = new_game(OBJECT_ENGINE)
+        player = MonteCarloPlayer(game, max_playout_moves=60, seed=6)
+        for _ in range(40):
+            player_name, moves = game.get_turn_moves()
+            if not moves:
+                break
+            self.assertIsNotNone(player.play_turn(player_name, iterations=20))
+
+
+class TestPerft(unittest.TestCase):
+    def test_start_position(self):
+        game = new_game(BITBOARD_ENGINE)
+        counts = [perft(game, depth) for depth in range(1, 6)]
+        self.assertEqual(counts, [7, 49, 379, 2872, 23582])
+        self.assertEqual([perft(game, depth, table_size=0) for depth in range(1, 6)], counts)
+        self.assertEqual([reference_perft(new_game(OBJECT_ENGINE), depth) for depth in range(1, 4)], counts[:3])
+
+    def test_divide(self):
+        counter = Perft()
+        counter.set_game(new_game(COMPACT_ENGINE))
+        divide = counter.divide(5)
+        self.assertEqual(len(divide), 7)
+        self.assertEqual(sum(count for _, _, count in divide), 23582)
+        self.assertTrue(all(color == "Black" for color, _, _ in divide))
+        self.assertGreater(counter.get_table().get_stats()["hits"], 0)
+
+    def test_pending_capture_has_moves_of_both_players(self):
+        game = new_game(OBJECT_ENGINE)
+        for player_name, start, destination in SCRIPTED_GAME[:9]:
+            game.play_game(player_name, start, destination)
+        counter = Perft()
+        counter.set_game(game)
+        colors = [color for color, _ in counter.get_moves()]
+        self.assertEqual(colors.count("Black"), len(game.legal_moves("Black Player")))
+        self.assertEqual(colors.count("White"), len(game.legal_moves("White Player")))
+        self.assertEqual(cross_check(game, 3), [])
+
+    def test_cross_check_mid_game(self):
+        rng = random.Random(8)
+        game = new_game(BITBOARD_ENGINE)
+        for _ in range(50):
+            choice = next_random_move(game, rng)
+            if choice is None:
+                break
+            game.make_move(choice[1])
+        self.assertEqual(cross_check(game, 3), [])
+
+    def test_cross_check_reports_a_wrong_count(self):
+        original_generate_moves = BitBoard.generate_moves
+
+        def generate_moves_without_last(board, color, pending=None):
+            moves = original_generate_moves(board, color, pending)
+            if board.get_bitboards()[0] == ((1 << 12) - 1) << 20 and moves:
+                return moves[:-1]
+            return moves
+        BitBoard.generate_moves = generate_moves_without_last
+        try:
+            mismatches = cross_check(new_game(BITBOARD_ENGINE), 2)
+        finally:
+            BitBoard.generate_moves = original_generate_moves
+        self.assertTrue(mismatches)
+
+    def test_rejected_move(self):
+        # a White move at the start position is rejected by play_game as out of turn
+        move = encode_move(get_square_index((2, 1)), get_square_index((3, 0)))
+        with self.assertRaises(PerftError) as context:
+            play_reference_move(new_game(OBJECT_ENGINE), "White Player", move)
+        self.assertIsInstance(context.exception.__cause__, OutofTurn)
+
+    def test_negative_depth(self):
+        game = new_game(BITBOARD_ENGINE)
+        self.assertEqual(perft(game, 0), 1)
+        with self.assertRaises(ValueError):
+            perft(game, -1)
+        with self.assertRaises(ValueError):
+            reference_perft(game, -1)
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            perft_main(["-1"])
+
+    def test_main(self):
+        with redirect_stdout(io.StringIO()) as output:
+            self.assertEqual(perft_main(["3", "--divide", "--cross-check"]), 0)
+        self.assertIn("perft(3) = 379", output.getvalue())
+        self.assertIn("cross-check: ok", output.getvalue())
+
+
+def rendered_board(game):
+    """Returns the 8x8 list of get_checker_details of every square"""
+    return [[game.get_checker_details((row, col)) for col in range(8)] for row in range(8)]
+
+
+class TestBoardView(unittest.TestCase):
+    def test_print_board_after_moves_and_unmoves(self):
+        for engine in (OBJECT_ENGINE, COMPACT_ENGINE, BITBOARD_ENGINE):
+            rng = random.Random(3)
+            game = new_game(engine)
+            view = game.get_board_view()
+            for ply in range(120):
+                choice = next_random_move(game, rng)
+                if choice is None:
+                    break
+                game.make_move(choice[1])
+                if ply % 7 == 6:
+                    game.unmake_move()
+                self.assertEqual(printed_board(game), str(rendered_board(game)) + "\n")
+                self.assertEqual(view.get_board(), rendered_board(game))
+
+    def test_print_board_after_board_change(self):
+        for engine in (OBJECT_ENGINE, COMPACT_ENGINE, BITBOARD_ENGINE):
+            game = new_game(engine)
+            game.get_board_view().get_text()
+            game.get_game_board().remove_piece_from_board((5, 0))
+            self.assertIsNone(game.get_checker_details((5, 0)))
+            self.assertEqual(printed_board(game), str(rendered_board(game)) + "\n")
+
+    def test_player_without_starting_squares(self):
+        game = Checkers()
+        game.get_board_view()
+        game.create_player("Red Player", "Red")
+        self.assertEqual(game.get_changed_squares(0), 0)
+
+    def test_change_log_starts_with_the_view(self):
+        game = new_game()
+        game.play_game(*SCRIPTED_GAME[0])
+        self.assertIsNone(game.get_changed_squares(game.get_version() - 1))
+        view = game.get_board_view()
+        self.assertEqual(view.get_board(), rendered_board(game))
+        version = game.get_version()
+        game.play_game(*SCRIPTED_GAME[1])
+        self.assertEqual(game.get_changed_squares(version),
+                         SQUARE_BITS[get_square_index(SCRIPTED_GAME[1][1])]
+                         | SQUARE_BITS[get_square_index(SCRIPTED_GAME[1][2])])
+
+    def test_only_changed_squares_are_rendered(self):
+        game = new_game()
+        view = game.get_board_view()
+        self.assertEqual(view.update(), (1 << 32) - 1)
+        self.assertEqual(view.update(), 0)
+        for player_name, start, destination in SCRIPTED_GAME[:9]:
+            game.play_game(player_name, start, destination)
+        version = view.get_version()
+        game.play_game(*SCRIPTED_GAME[9])
+        changed = [get_square_index(location) for location in ((3, 2), (2, 3), (1, 4))]
+        self.assertEqual(view.update(), sum(1 << square for square in changed))
+        self.assertEqual(game.get_changed_squares(version), sum(1 << square for square in changed))
+        self.assertEqual(sorted(view.get_changes(version)), sorted(changed))
+        with self.assertRaises(InvalidSquare):
+            game.play_game("White Player", (1, 2), (1, 2))
+        self.assertEqual(view.update(), 0)
+
+    def test_serialized_deltas(self):
+        for engine in (OBJECT_ENGINE, BITBOARD_ENGINE):
+            game = new_game(engine)
+            view = game.get_board_view()
+            json_details = [None] * 32
+            bytes_details = [None] * 32
+            version, since, changes = decode_json(view.to_json())
+            self.assertIsNone(since)
+            apply_changes(json_details, changes)
+            self.assertEqual(decode_bytes(view.to_bytes())[2], changes)
+            apply_changes(bytes_details, changes)
+            for player_name, start, destination in SCRIPTED_GAME:
+                game.play_game(player_name, start, destination)
+                new_version, since, changes = decode_json(view.to_json(version))
+                self.assertEqual(since, version)
+                self.assertEqual(decode_bytes(view.to_bytes(version)), (new_version, since, changes))
+                self.assertLessEqual(len(changes), 4)
+                apply_changes(json_details, changes)
+                apply_changes(bytes_details, decode_bytes(view.to_bytes(version))[2])
+                version = new_version
+                expected = [game.get_checker_details(location) for location in SQUARE_LOCATIONS]
+                self.assertEqual(json_details, expected)
+                self.assertEqual(bytes_details, expected)
+            self.assertEqual(json.loads(view.to_json(version)), {"version": version, "since": version, "changes": {}})
+
+    def test_old_version_gets_the_whole_board(self):
+        game = new_game(BITBOARD_ENGINE)
+        view = game.get_board_view()
+        version = view.get_version()
+        move = game.legal_moves("Black Player")[0]
+        for _ in range(CHANGE_LOG_SIZE + 1):
+            game.make_move(move)
+            game.unmake_move()
+        self.assertEqual(len(view.get_changes(version)), 32)
+        data = view.to_bytes(version)
+        self.assertEqual(len(data), 9 + 32)
+        self.assertEqual(struct.unpack_from("<I", data, 4)[0], FULL_BOARD)
+        self.assertIsNone(decode_bytes(data)[1])
+        self.assertEqual(json.loads(view.to_json(version))["version"], game.get_version())
+        self.assertEqual(len(view.get_changes(game.get_version() - 2)), 2)
+
+
+class TestPlayMoves(unittest.TestCase):
+    def test_trusted_moves_match_play_game(self):
+        for seed in range(6):
+            moves = get_play_game_moves(play_simulated_game(0, seed, random_policy, 400)["moves"])
+            for engine in (OBJECT_ENGINE, COMPACT_ENGINE, BITBOARD_ENGINE):
+                expected = new_game(engine)
+                expected_captured = sum(expected.play_game(*move) for move in moves)
+                game = new_game(engine)
+                view = game.get_board_view()
+                view.update()
+                self.assertEqual(game.play_moves(moves, validate=False), expected_captured)
+                self.assertEqual(game.snapshot(), expected.snapshot())
+                self.assertEqual(game.get_hash(), expected.get_hash())
+                self.assertEqual(game.get_pending_location(), expected.get_pending_location())
+                self.assertEqual(game.get_turn_moves(), expected.get_turn_moves())
+                self.assertEqual(game.game_winner(), expected.game_winner())
+                self.assertEqual(printed_board(game), printed_board(expected))
+                self.assertEqual(view.get_board(), rendered_board(expected))
+                for player in game._players.values():
+                    player.check_counters()
+
+    def test_validated_moves_report_the_first_illegal_ply(self):
+        for engine in (OBJECT_ENGINE, BITBOARD_ENGINE):
+            game = new_game(engine)
+            moves = SCRIPTED_GAME[:4] + [("White Player", (2, 1), (3, 0))] + SCRIPTED_GAME[4:]
+            with self.assertRaises(IllegalPly) as raised:
+                game.play_moves(moves)
+            self.assertEqual(raised.exception.ply, 4)
+            self.assertIsInstance(raised.exception.error, OutofTurn)
+            self.assertIs(raised.exception.__cause__, raised.exception.error)
+            expected = new_game(engine)
+            for move in SCRIPTED_GAME[:4]:
+                expected.play_game(*move)
+            self.assertEqual(game.snapshot(), expected.snapshot())
+            self.assertEqual(game.play_moves(SCRIPTED_GAME[4:]), 5)
+
+    def test_trusted_moves_off_a_diagonal_change_nothing(self):
+        for engine in (OBJECT_ENGINE, COMPACT_ENGINE, BITBOARD_ENGINE):
+            game = new_game(engine)
+            snapshot = game.snapshot()
+            version = game.get_version()
+            with self.assertRaises(IllegalPly) as raised:
+                game.play_moves(SCRIPTED_GAME[:3] + [("White Player", (2, 3), (3, 3))], validate=False)
+            self.assertEqual(raised.exception.ply, 3)
+            self.assertIsInstance(raised.exception.error, InvalidSquare)
+            with self.assertRaises(IllegalPly) as raised:
+                game.play_moves([("Nobody", (5, 4), (4, 3))], validate=False)
+            self.assertIsInstance(raised.exception.error, InvalidPlayer)
+            self.assertEqual(game.snapshot(), snapshot)
+            self.assertEqual(game.get_version(), version)
+
+    def test_list_locations(self):
+        game = new_game(COMPACT_ENGINE)
+        moves = [(player_name, list(start), list(destination)) for player_name, start, destination in SCRIPTED_GAME]
+        self.assertEqual(game.play_moves(moves, validate=False), 5)
+        expected = new_game(COMPACT_ENGINE)
+        expected.play_moves(SCRIPTED_GAME)
+        self.assertEqual(game.snapshot(), expected.snapshot())
+        self.assertEqual(game.get_checker_details((7, 4)), "Black_Triple_King")
+
+
+class TestEvaluationCache(unittest.TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = EvaluationCache(2)
+        cache.put(1, 10)
+        cache.put(2, 20)
+        self.assertEqual(cache.get(1), 10)
+        cache.put(3, 30)
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(1), 10)
+        self.assertEqual(cache.get(3), 30)
+        self.assertEqual(cache.get_stats(), {"hits": 3, "misses": 1, "stores": 3, "evictions": 1, "size": 2,
+                                             "capacity": 2, "hit_rate": 0.75})
+        self.assertIn("checkers_evaluation_cache_hit_rate 0.75\n", cache.format_stats())
+        cache.clear()
+        self.assertEqual(cache.get_size(), 0)
+
+    def test_cached_scores_match_evaluate(self):
+        for engine in (OBJECT_ENGINE, COMPACT_ENGINE, BITBOARD_ENGINE):
+            rng = random.Random(4)
+            cache = EvaluationCache(16)
+            game = new_game(engine)
+            for _ in range(80):
+                choice = next_random_move(game, rng)
+                if choice is None:
+                    break
+                game.make_move(choice[1])
+                bit_board = game.get_bit_board()
+                self.assertEqual(game.get_board_hash(), bit_board.get_hash())
+                for player_name, color in (("Black Player", "Black"), ("White Player", "White")):
+                    self.assertEqual(cache.evaluate_game(game, player_name), evaluate(bit_board, color))
+                    self.assertEqual(cache.evaluate(bit_board, color), evaluate(bit_board, color))
+            self.assertEqual(cache.get_stats()["misses"], cache.get_stats()["stores"])
+            self.assertEqual(cache.get_stats()["hits"], 3 * cache.get_stats()["misses"])
+
+    def test_shared_cache_is_seen_by_every_attached_cache(self):
+        cache = SharedEvaluationCache(64)
+        try:
+            attached = SharedEvaluationCache(name=cache.get_name(), create=False)
+            self.assertEqual(attached.get_capacity(), 64)
+            game = new_game()
+            self.assertEqual(cache.evaluate_game(game, "White Player"), 0)
+            game.play_game(*SCRIPTED_GAME[0])
+            score = cache.evaluate_game(game, "Black Player")
+            self.assertEqual(attached.evaluate_game(game, "White Player"), -score)
+            self.assertEqual(attached.get_stats()["hits"], 1)
+            attached.put(game.get_board_hash(), -7)
+            self.assertEqual(cache.get(game.get_board_hash()), -7)
+            self.assertEqual(cache.get_size(), 2)
+            attached.clear()
+            self.assertEqual(cache.get_size(), 0)
+            attached.close()
+        finally:
+            cache.close()
+            cache.unlink()
+
+    def test_shared_cache_clock_eviction(self):
+        with SharedEvaluationCache(4) as cache:
+            try:
+                # one bucket of four slots
+                for key in range(4):
+                    cache.put(key << 8, key)
+                self.assertEqual(cache.get(0), 0)
+                cache.put(4 << 8, 4)
+                self.assertEqual(cache.get_stats()["evictions"], 1)
+                self.assertEqual(cache.get(0), 0)
+                self.assertIsNone(cache.get(1 << 8))
+                self.assertEqual(cache.get(4 << 8), 4)
+                cache.put(5 << 8, -5)
+                self.assertIsNone(cache.get(2 << 8))
+                self.assertEqual(cache.get(5 << 8), -5)
+                self.assertEqual(cache.get_size(), 4)
+            finally:
+                cache.unlink()
+
+    def test_attach_to_another_segment(self):
+        memory = shared_memory.SharedMemory(create=True, size=64)
+        try:
+            with self.assertRaises(EvaluationCacheError):
+                SharedEvaluationCache(name=memory.name, create=False)
+        finally:
+            memory.close()
+            memory.unlink()
+
+    def test_computer_player_with_cache(self):
+        game = new_game(BITBOARD_ENGINE)
+        cache = EvaluationCache()
+        player = ComputerPlayer(game, max_depth=4, evaluation_cache=cache)
+        self.assertIn(player.best_move("Black Player", 200), game.legal_moves("Black Player"))
+        self.assertGreater(cache.get_stats()["hits"], 0)
+
+
+class TestSymmetry(unittest.TestCase):
+    def test_mirror_squares(self):
+        for square, location in enumerate(SQUARE_LOCATIONS):
+            self.assertEqual(mirror_bitboard(1 << square), 1 << (31 - square))
+            self.assertEqual(get_square_index(mirror_location(location)), 31 - square)
+        self.assertEqual(mirror_bitboard(mirror_bitboard(0x12345678)), 0x12345678)
+        move = encode_move(get_square_index((5, 0)), get_square_index((3, 2)), 1 << get_square_index((4, 1)))
+        self.assertEqual(get_move_locations(mirror_move(move)), ((2, 7), (4, 5)))
+        self.assertEqual(get_move_captured(mirror_move(move)), 1 << get_square_index((3, 6)))
+        self.assertEqual(mirror_move(END_CHAIN), END_CHAIN)
+
+    def test_mirrored_positions_have_mirrored_moves(self):
+        rng = random.Random(6)
+        board = BitBoard()
+        mirrored_board = BitBoard()
+        for _ in range(10):
+            game = new_game(BITBOARD_ENGINE)
+            for _ in range(100):
+                player_name, moves = game.get_turn_moves()
+                if not moves:
+                    break
+                color = game.get_player(player_name).get_piece_color()
+                pending_location = game.get_pending_location()
+                pending = None if pending_location is None else get_square_index(pending_location)
+                bitboards = game.get_bit_board().get_bitboards()
+                mirrored_bitboards, mirrored_color, mirrored_pending = mirror_position(bitboards, color, pending)
+                board.set_bitboards(*bitboards)
+                mirrored_board.set_bitboards(*mirrored_bitboards)
+                self.assertEqual(sorted(mirror_move(move) for move in board.generate_moves(color, pending)),
+                                 sorted(mirrored_board.generate_moves(mirrored_color, mirrored_pending)))
+                self.assertEqual(evaluate(board, color), evaluate(mirrored_board, mirrored_color))
+                move = rng.choice(moves)
+                board.make_move(move)
+                mirrored_board.make_move(mirror_move(move))
+                self.assertEqual(mirrored_board.get_bitboards(), mirror_position(board.get_bitboards(), color)[0])
+                game.make_move(move)
+
+    def test_canonical_key(self):
+        players = [("White Player", "White"), ("Black Player", "Black")]
+        rng = random.Random(8)
+        game = new_game()
+        flips = set()
+        for _ in range(60):
+            choice = next_random_move(game, rng)
+            if choice is None:
+                break
+            game.play_game(choice[0], *get_move_locations(choice[1]))
+            key, flipped = get_canonical_key(game)
+            flips.add(flipped)
+            self.assertLess(key.bit_length(), 17 * 8)
+            self.assertEqual(canonicalize(*restore_position(key, flipped))[2], flipped)
+            self.assertEqual(get_snapshot(key, players, flipped), game.snapshot())
+            # the mirror of the position has the same canonical form, with Black to move if the game has White
+            mirrored_game = Checkers.from_snapshot(get_snapshot(key, players, not flipped), COMPACT_ENGINE)
+            self.assertEqual(get_canonical_key(mirrored_game), (key, not flipped))
+            self.assertEqual(get_canonical_hash(mirrored_game), (get_canonical_hash(game)[0], not flipped))
+            if not flipped:
+                self.assertEqual(get_canonical_hash(game)[0], game.get_hash())
+        self.assertEqual(flips, {False, True})
+
+    def test_book_of_mirrored_position(self):
+        book = OpeningBook(depth=4)
+        players = [(BLACK_PLAYER, "Black"), (WHITE_PLAYER, "White")]
+        for result in simulate_games(10, workers=0, seed=2, max_moves=40):
+            book.add_game(players, get_play_game_moves(result["moves"]))
+        game = new_simulated_game()
+        first_move = book.get_book_moves(game)[0]
+        game.play_game(BLACK_PLAYER, first_move["start"], first_move["destination"])
+        book_moves = book.get_book_moves(game)
+        self.assertTrue(book_moves)
+        key, flipped = get_canonical_key(game)
+        self.assertTrue(flipped)
+        mirrored_game = Checkers.from_snapshot(get_snapshot(key, players), BITBOARD_ENGINE)
+        mirrored_moves = book.get_book_moves(mirrored_game)
+        self.assertEqual(sorted((mirror_location(book_move["start"]), mirror_location(book_move["destination"]),
+                                 book_move["games"], book_move["wins"], book_move["losses"])
+                                for book_move in book_moves),
+                         sorted((book_move["start"], book_move["destination"], book_move["games"], book_move["wins"],
+                                 book_move["losses"]) for book_move in mirrored_moves))
+
+
+class TestTournament(unittest.TestCase):
+    engines = [EngineSpec("capture", "capture"), EngineSpec("random", "random"), EngineSpec("random2", "random")]
+
+    def test_schedules(self):
+        schedule = round_robin_schedule(["a", "b", "c"], 2)
+        self.assertEqual(len(schedule), 12)
+        self.assertEqual(schedule.count(("a", "b")), 2)
+        self.assertEqual(schedule.count(("b", "a")), 2)
+        self.assertEqual(gauntlet_schedule("a", ["b", "c"]), [("a", "b"), ("b", "a"), ("a", "c"), ("c", "a")])
+        self.assertEqual(parse_engine_spec("ab=alphabeta:5000+50"), EngineSpec("ab", "alphabeta", 5000, 50))
+        self.assertEqual(parse_engine_spec("r=random").time_ms, 10000)
+        with self.assertRaises(TournamentError):
+            parse_engine_spec("x=unknown")
+        with self.assertRaises(TournamentError):
+            Tournament(self.engines, [("capture", "nobody")])
+
+    def test_game_results(self):
+        result = play_tournament_game(3, self.engines[0], self.engines[1], seed=5)
+        self.assertEqual(result, play_tournament_game(3, self.engines[0], self.engines[1], seed=5) | {
+            "time_ms": result["time_ms"]})
+        self.assertIn(result["score"], (0.0, 0.5, 1.0))
+        self.assertEqual(set(result["time_ms"]), {"capture", "random"})
+        result = play_tournament_game(0, self.engines[1], self.engines[2], max_moves=4)
+        self.assertEqual((result["score"], result["reason"], result["move_count"]), (0.5, "move limit", 4))
+        # a search that overruns a 1 ms clock loses on time
+        result = play_tournament_game(0, EngineSpec("fast", "alphabeta", 1), self.engines[1])
+        self.assertEqual((result["score"], result["reason"]), (0.0, "time forfeit"))
+
+    def test_resume_from_checkpoint(self):
+        schedule = round_robin_schedule([spec.name for spec in self.engines])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "run.json")
+            played = []
+            tournament = Tournament(self.engines, schedule[:4], seed=2, checkpoint_path=path)
+            tournament.run(progress=played.append)
+            self.assertEqual([result["game"] for result in played], [0, 1, 2, 3])
+            # a run stopped after 4 of the 6 games resumes with the last 2
+            with open(path) as checkpoint_file:
+                data = json.load(checkpoint_file)
+            data["config"]["schedule"] = [list(game) for game in schedule]
+            with open(path, "w") as checkpoint_file:
+                json.dump(data, checkpoint_file)
+            resumed = Tournament(self.engines, schedule, seed=2, checkpoint_path=path)
+            self.assertEqual(resumed.get_pending_games(), [4, 5])
+            played = []
+            resumed.run(workers=2, progress=played.append)
+            self.assertEqual(sorted(result["game"] for result in played), [4, 5])
+            expected = Tournament(self.engines, schedule, seed=2)
+            expected.run()
+            self.assertEqual([dict(result, time_ms=None) for result in Tournament(self.engines, schedule, seed=2,
+                                                                                  checkpoint_path=path).get_results()],
+                             [dict(result, time_ms=None) for result in expected.get_results()])
+            with self.assertRaises(TournamentError):
+                Tournament(self.engines, schedule, seed=3, checkpoint_path=path)
+
+    def test_ratings_and_sprt(self):
+        results = ([{"black": "a", "white": "b", "score": 1.0}] * 6 + [{"black": "b", "white": "a", "score": 0.5}] * 2
+                   + [{"black": "b", "white": "c", "score": 1.0}] * 3 + [{"black": "c", "white": "b", "score": 0.0}])
+        ratings = compute_ratings(results, ["a", "b", "c"])
+        self.assertGreater(ratings["a"], ratings["b"])
+        self.assertGreater(ratings["b"], ratings["c"])
+        self.assertAlmostEqual(sum(ratings.values()), 0.0)
+        self.assertGreater(get_sprt_llr(60, 20, 20, 0, 50), 2.95)
+        self.assertLess(get_sprt_llr(20, 20, 60, 0, 50), -2.95)
+
+        tournament = Tournament(self.engines[:2], gauntlet_schedule("capture", ["random"], 100), seed=1,
+                                sprt=SprtTest(0, 100))
+        tournament.run()
+        self.assertEqual(tournament.get_sprt_decision(), "H1")
+        self.assertLess(len(tournament.get_results()), 200)
+        self.assertEqual(tournament.get_standings()[0]["name"], "capture")
+        self.assertIn("SPRT", tournament.format_report())
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "run.json")
+            output = io.StringIO()
+            with redirect_stdout(output):
+                self.assertEqual(tournament_main(["c=capture", "r=random", "--gauntlet", "--checkpoint", path]), 0)
+                self.assertEqual(tournament_main(["c=capture", "r=random", "--gauntlet", "--checkpoint", path]), 0)
+            self.assertIn("2 games, 2 played", output.getvalue())
+
+
 if __name__ == '__main__':
     unittest.main()
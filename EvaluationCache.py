@@ -0,0 +1,232 @@
+# Description: Cache of the evaluation of Checkers positions, keyed by the Zobrist key of the board.
+#              The score of a board is stored once for Black and negated for White, so the same position reached
+#              with either color to move, or on any board engine, is one entry. Scores are integers, as returned by
+#              CheckersAI.evaluate or another evaluator taking a BitBoard and a color.
+#              EvaluationCache keeps the entries of one process in an OrderedDict and evicts the least recently
+#              used entry beyond its capacity. SharedEvaluationCache keeps them in a shared memory segment that
+#              worker processes attach to by name: buckets of 4 slots, each slot holds the key XOR the score
+#              (a slot written by two processes at once is read as a miss), the score and a state byte.
+#              A full bucket evicts with CLOCK: the hand of the bucket skips, and clears, the slots read since it
+#              last passed them. get_stats() returns the hits, misses, stores, evictions, size and hit rate,
+#              format_stats() the same as "name value" lines for a metrics scraper.
+
+import struct
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+from CheckersAI import evaluate
+
+DEFAULT_CAPACITY = 1 << 16
+KEY_MASK = (1 << 64) - 1
+
+SHARED_MAGIC = b"CKEV"
+SHARED_VERSION = 1
+# magic, version, bucket count
+SHARED_HEADER = struct.Struct("<4sII")
+# key XOR score, score, state
+SHARED_SLOT = struct.Struct("<QqB7x")
+STATE_OFFSET = 16
+BUCKET_SLOTS = 4
+
+# Slot states
+EMPTY = 0
+CACHED = 1
+REFERENCED = 2  # read since the hand of the bucket last passed
+
+
+class EvaluationCacheError(Exception):
+    """Exception raise if a shared memory segment is not an evaluation cache"""
+    pass
+
+
+class EvaluationCache:
+    """Represents a bounded cache of the scores of boards in one process, with least recently used eviction"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, evaluator=evaluate):
+        """Takes as parameter the maximum number of entries and the evaluator of a BitBoard for a color"""
+        self._capacity = capacity
+        self._evaluator = evaluator
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+
+    def get_capacity(self):
+        """Returns the maximum number of entries"""
+        return self._capacity
+
+    def get_size(self):
+        """Returns the number of entries"""
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns the score for Black of the board key, or None if it's not cached"""
+        score = self._entries.get(key)
+        if score is None:
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return score
+
+    def put(self, key, score):
+        """Caches the score for Black of the board key, evicts the least recently used entry if the cache is full"""
+        entries = self._entries
+        entries[key] = score
+        entries.move_to_end(key)
+        self._stores += 1
+        if len(entries) > self._capacity:
+            entries.popitem(last=False)
+            self._evictions += 1
+
+    def evaluate(self, bit_board, color):
+        """Returns the score of the BitBoard for the color, evaluated if it's not cached"""
+        key = bit_board.get_hash()
+        score = self.get(key)
+        if score is None:
+            score = self._evaluator(bit_board, "Black")
+            self.put(key, score)
+        if color == "Black":
+            return score
+        return -score
+
+    def evaluate_game(self, game, player_name):
+        """
+        Returns the score of the board of a Checkers game for the player, evaluated if it's not cached
+        :exception: InvalidPlayer
+        """
+        color = game.get_player(player_name).get_piece_color()
+        key = game.get_board_hash()
+        score = self.get(key)
+        if score is None:
+            score = self._evaluator(game.get_bit_board(), "Black")
+            self.put(key, score)
+        if color == "Black":
+            return score
+        return -score
+
+    def clear(self):
+        """Removes every entry and resets the counters"""
+        self._entries.clear()
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+
+    def get_stats(self):
+        """Returns the hits, misses, stores, evictions, size, capacity and hit rate of the cache"""
+        probes = self._hits + self._misses
+        return {"hits": self._hits, "misses": self._misses, "stores": self._stores, "evictions": self._evictions,
+                "size": self.get_size(), "capacity": self._capacity,
+                "hit_rate": self._hits / probes if probes else 0.0}
+
+    def format_stats(self, prefix="checkers_evaluation_cache"):
+        """Returns the stats as "prefix_name value" lines"""
+        return "".join("%s_%s %s\n" % (prefix, name, value) for name, value in sorted(self.get_stats().items()))
+
+
+class SharedEvaluationCache(EvaluationCache):
+    """
+    Represents a bounded cache of the scores of boards in a shared memory segment, shared by the processes that
+    attach to it, with CLOCK eviction in every bucket. The counters of get_stats are those of this process.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, name=None, create=True, evaluator=evaluate):
+        """
+        Takes as parameter the number of entries, rounded up to a power of two of at least BUCKET_SLOTS,
+        the name of the segment, whether to create it or attach to an existing one, and the evaluator.
+        A new segment without a name gets a unique name, see get_name.
+        :exception: EvaluationCacheError if an existing segment is not an evaluation cache
+        """
+        if create:
+            bucket_count = 1
+            while bucket_count * BUCKET_SLOTS < capacity:
+                bucket_count *= 2
+            self._memory = shared_memory.SharedMemory(name, create=True,
+                                                      size=SHARED_HEADER.size + bucket_count
+                                                      + bucket_count * BUCKET_SLOTS * SHARED_SLOT.size)
+            SHARED_HEADER.pack_into(self._memory.buf, 0, SHARED_MAGIC, SHARED_VERSION, bucket_count)
+        else:
+            self._memory = shared_memory.SharedMemory(name)
+            magic, version, bucket_count = SHARED_HEADER.unpack_from(self._memory.buf)
+            if magic != SHARED_MAGIC or version != SHARED_VERSION:
+                self._memory.close()
+                raise EvaluationCacheError("Not an evaluation cache: " + str(name))
+        super().__init__(bucket_count * BUCKET_SLOTS, evaluator)
+        self._mask = bucket_count - 1
+        self._hands = SHARED_HEADER.size  # offset of the hand of every bucket, one byte each
+        self._slots = self._hands + bucket_count  # offset of the first slot
+
+    def get_name(self):
+        """Returns the name of the shared memory segment, for the processes that attach to it"""
+        return self._memory.name
+
+    def get_size(self):
+        """Returns the number of entries"""
+        states = self._memory.buf[self._slots + STATE_OFFSET::SHARED_SLOT.size]
+        size = len(states) - bytes(states).count(EMPTY)
+        states.release()
+        return size
+
+    def get(self, key):
+        """Returns the score for Black of the board key, or None if it's not cached"""
+        buffer = self._memory.buf
+        offset = self._slots + (key & self._mask) * BUCKET_SLOTS * SHARED_SLOT.size
+        for _ in range(BUCKET_SLOTS):
+            check, score, state = SHARED_SLOT.unpack_from(buffer, offset)
+            if state != EMPTY and check ^ (score & KEY_MASK) == key:
+                if state != REFERENCED:
+                    buffer[offset + STATE_OFFSET] = REFERENCED
+                self._hits += 1
+                return score
+            offset += SHARED_SLOT.size
+        self._misses += 1
+        return None
+
+    def put(self, key, score):
+        """Caches the score for Black of the board key, in the slot of the key or an empty or evicted slot"""
+        buffer = self._memory.buf
+        bucket = key & self._mask
+        bucket_offset = self._slots + bucket * BUCKET_SLOTS * SHARED_SLOT.size
+        victim = None
+        for index in range(BUCKET_SLOTS):
+            offset = bucket_offset + index * SHARED_SLOT.size
+            check, stored_score, state = SHARED_SLOT.unpack_from(buffer, offset)
+            if state == EMPTY or check ^ (stored_score & KEY_MASK) == key:
+                victim = offset
+                break
+        if victim is None:
+            # CLOCK: a slot read since the hand last passed gets a second chance
+            hand = buffer[self._hands + bucket] % BUCKET_SLOTS
+            while True:
+                offset = bucket_offset + hand * SHARED_SLOT.size
+                hand = (hand + 1) % BUCKET_SLOTS
+                if buffer[offset + STATE_OFFSET] != REFERENCED:
+                    victim = offset
+                    break
+                buffer[offset + STATE_OFFSET] = CACHED
+            buffer[self._hands + bucket] = hand
+            self._evictions += 1
+        SHARED_SLOT.pack_into(buffer, victim, key ^ (score & KEY_MASK), score, CACHED)
+        self._stores += 1
+
+    def clear(self):
+        """Removes every entry of every process and resets the counters of this process"""
+        buffer = self._memory.buf
+        buffer[self._hands:] = bytes(len(buffer) - self._hands)
+        super().clear()
+
+    def close(self):
+        """Detaches this process from the shared memory segment"""
+        self._memory.close()
+
+    def unlink(self):
+        """Destroys the shared memory segment, once every process has closed it"""
+        self._memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
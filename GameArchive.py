@@ -0,0 +1,180 @@
+# Description: Memory-mapped archive of finished games with a random access index.
+#              The archive file is a sequence of game frames of GameRecord.py, and the sidecar index file
+#              (archive path + ".idx") has one fixed-size entry per game: frame offset, body length, number of
+#              moves and the winner reported by game_winner. The GameArchive class maps both files with mmap, so
+#              a game or a position in a game is read without loading the whole archive, and the moves of a game
+#              are viewed in the mapped buffer without copying them.
+
+import mmap
+import os
+import struct
+
+from GameRecord import (FRAME_HEADER, GameRecordError, decode_game, encode_game, play_recorded_moves,
+                        read_frame_header)
+from CheckersGame import OBJECT_ENGINE, GAME_NOT_ENDED
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"CKIX"
+INDEX_HEADER = struct.Struct("<4sB3x")
+INDEX_VERSION = 1
+
+# frame offset, body length, move count, winner color (0 game has not ended, 1 Black, 2 White)
+INDEX_ENTRY = struct.Struct("<QIIB3x")
+WINNER_CODES = {None: 0, "Black": 1, "White": 2}
+WINNER_COLORS = (None, "Black", "White")
+
+
+def get_index_path(archive_path):
+    """Returns the path of the sidecar index of the archive"""
+    return archive_path + INDEX_SUFFIX
+
+
+def get_winner_code(game):
+    """Returns the index winner code of a Checkers game"""
+    winner = game.game_winner()
+    if winner == GAME_NOT_ENDED:
+        return 0
+    return WINNER_CODES[game.get_player(winner).get_piece_color()]
+
+
+class GameArchiveWriter:
+    """Represents a writer appending games to an archive and its index"""
+
+    def __init__(self, archive_path):
+        index_path = get_index_path(archive_path)
+        new_index = not os.path.exists(index_path) or os.path.getsize(index_path) == 0
+        self._archive_file = open(archive_path, "ab")
+        self._index_file = open(index_path, "ab")
+        if new_index:
+            self._index_file.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION))
+
+    def add_game(self, players, moves, engine=OBJECT_ENGINE):
+        """
+        Replays the moves to find the winner, then appends the game to the archive and the index.
+        players is a list of (player_name, piece_color), moves a list of (player_name, start, destination).
+        Returns the winner reported by game_winner.
+        """
+        game, recorded_moves = play_recorded_moves(players, moves, engine)
+        frame = encode_game(players, recorded_moves)
+        offset = self._archive_file.tell()
+        self._archive_file.write(frame)
+        self._index_file.write(INDEX_ENTRY.pack(offset, len(frame) - FRAME_HEADER.size, len(moves),
+                                                get_winner_code(game)))
+        return game.game_winner()
+
+    def close(self):
+        """Closes the archive and index files"""
+        self._archive_file.close()
+        self._index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def build_index(archive_path, engine=OBJECT_ENGINE):
+    """Writes the sidecar index of an archive by reading every frame, returns the number of games"""
+    game_count = 0
+    with open(archive_path, "rb") as archive_file, open(get_index_path(archive_path), "wb") as index_file:
+        index_file.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION))
+        while True:
+            offset = archive_file.tell()
+            header = archive_file.read(FRAME_HEADER.size)
+            if not header:
+                break
+            body_length = read_frame_header(header)
+            recorded_game = decode_game(archive_file.read(body_length))
+            game = recorded_game.replay(engine, validate=False)
+            index_file.write(INDEX_ENTRY.pack(offset, body_length, recorded_game.get_move_count(),
+                                              get_winner_code(game)))
+            game_count += 1
+    return game_count
+
+
+def _map_file(path):
+    """Helper function that maps a file read-only, returns None for an empty file"""
+    with open(path, "rb") as mapped_file:
+        if os.fstat(mapped_file.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(mapped_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class GameArchive:
+    """
+    Represents a read-only archive of games with random access by game number.
+    Games returned by get_game view the mapped archive, drop them before closing the archive.
+    """
+
+    def __init__(self, archive_path):
+        if not os.path.exists(get_index_path(archive_path)):
+            build_index(archive_path)
+        self._archive_map = _map_file(archive_path)
+        self._index_map = _map_file(get_index_path(archive_path))
+        if self._index_map is None:
+            raise GameRecordError("Index file is empty")
+        magic, version = INDEX_HEADER.unpack_from(self._index_map, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise GameRecordError("Not a game archive index")
+        self._game_count = (len(self._index_map) - INDEX_HEADER.size) // INDEX_ENTRY.size
+
+    def __len__(self):
+        return self._game_count
+
+    def get_game_count(self):
+        """Returns the number of games in the archive"""
+        return self._game_count
+
+    def _get_entry(self, game_number):
+        """Helper method that returns the index entry of the game"""
+        if not 0 <= game_number < self._game_count:
+            raise IndexError("Game number out of range: " + str(game_number))
+        return INDEX_ENTRY.unpack_from(self._index_map, INDEX_HEADER.size + game_number * INDEX_ENTRY.size)
+
+    def get_metadata(self, game_number):
+        """Returns the offset, move count and winner color (None if the game has not ended) of the game"""
+        offset, body_length, move_count, winner_code = self._get_entry(game_number)
+        return {"offset": offset, "move_count": move_count, "winner_color": WINNER_COLORS[winner_code]}
+
+    def get_game(self, game_number):
+        """Returns the RecordedGame of the game number, its moves are read in the mapped archive"""
+        offset, body_length, move_count, winner_code = self._get_entry(game_number)
+        body_start = offset + FRAME_HEADER.size
+        return decode_game(memoryview(self._archive_map)[body_start:body_start + body_length])
+
+    def get_position(self, game_number, ply=None, engine=OBJECT_ENGINE):
+        """Returns a Checkers game with the first ply moves of the game played, all moves by default"""
+        return self.get_game(game_number).replay(engine, ply)
+
+    def get_winner(self, game_number):
+        """Returns the winner of the game as reported by game_winner"""
+        winner_color = WINNER_COLORS[self._get_entry(game_number)[3]]
+        if winner_color is None:
+            return GAME_NOT_ENDED
+        for player_name, piece_color in self.get_game(game_number).get_players():
+            if piece_color == winner_color:
+                return player_name
+        return GAME_NOT_ENDED
+
+    def find_games(self, winner_color=None, min_moves=0, max_moves=None):
+        """Yields the game numbers with the winner color and number of moves, reading only the index"""
+        for game_number in range(self._game_count):
+            offset, body_length, move_count, winner_code = self._get_entry(game_number)
+            if winner_color is not None and WINNER_COLORS[winner_code] != winner_color:
+                continue
+            if move_count < min_moves or (max_moves is not None and move_count > max_moves):
+                continue
+            yield game_number
+
+    def close(self):
+        """Unmaps the archive and the index"""
+        if self._archive_map is not None:
+            self._archive_map.close()
+        self._index_map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
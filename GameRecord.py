@@ -0,0 +1,194 @@
+# Description: Compact binary record format for games played with play_game.
+#              A record file is a sequence of frames, one per game, so games can be appended to the same file.
+#              Frame: 2 bytes magic "CR", 1 byte version, 4 bytes body length, then the body.
+#              Body: 1 byte player count, then for each player 1 byte color (0 Black, 1 White), 1 byte name length
+#              and the UTF-8 name; 4 bytes move count, then 2 bytes per move.
+#              Move: bits 0-4 starting square index, bits 5-9 destination square index, bit 10 color of the
+#              player, bits 11-12 number of captured pieces, bit 13 set if the move promoted the piece.
+#              Integers are little-endian.
+
+import struct
+import sys
+
+from BitBoard import SQUARE_LOCATIONS, get_square_index
+from CheckersGame import Checkers, OBJECT_ENGINE
+
+FRAME_MAGIC = b"CR"
+FORMAT_VERSION = 1
+FRAME_HEADER = struct.Struct("<2sBI")
+MOVE_COUNT = struct.Struct("<I")
+COLORS = ("Black", "White")
+
+PLAYER_BIT = 1 << 10
+PROMOTION_BIT = 1 << 13
+
+
+class GameRecordError(Exception):
+    """Exception raise if a game record is not in the record format"""
+    pass
+
+
+def encode_record_move(color, starting_square_location, destination_square_location, captured=0, promoted=False):
+    """Returns the 16-bit record of a move"""
+    start = get_square_index(starting_square_location)
+    destination = get_square_index(destination_square_location)
+    if start is None or destination is None:
+        raise GameRecordError("Only moves between playable squares can be recorded")
+    record_move = start | (destination << 5) | (min(captured, 3) << 11)
+    if color == "White":
+        record_move |= PLAYER_BIT
+    if promoted:
+        record_move |= PROMOTION_BIT
+    return record_move
+
+
+def decode_record_move(record_move):
+    """Returns the color, starting location, destination location, captured count and promotion of a move record"""
+    return (COLORS[(record_move >> 10) & 1], SQUARE_LOCATIONS[record_move & 31],
+            SQUARE_LOCATIONS[(record_move >> 5) & 31], (record_move >> 11) & 3, bool(record_move & PROMOTION_BIT))
+
+
+def encode_game(players, moves):
+    """
+    Returns the frame of a game. players is a list of (player_name, piece_color) in the order they were created,
+    moves is a list of (player_name, starting_square_location, destination_square_location) as given to play_game,
+    optionally followed by the number of captured pieces and whether the piece was promoted.
+    """
+    colors = {}
+    body = bytearray([len(players)])
+    for player_name, piece_color in players:
+        name = player_name.encode("utf-8")
+        if len(name) > 255:
+            raise GameRecordError("Player name is longer than 255 bytes")
+        colors[player_name] = piece_color
+        body.append(COLORS.index(piece_color))
+        body.append(len(name))
+        body += name
+
+    body += MOVE_COUNT.pack(len(moves))
+    record_moves = [encode_record_move(colors[move[0]], *move[1:]) for move in moves]
+    body += struct.pack("<%dH" % len(record_moves), *record_moves)
+    return FRAME_HEADER.pack(FRAME_MAGIC, FORMAT_VERSION, len(body)) + bytes(body)
+
+
+def decode_game(body):
+    """Returns the RecordedGame of a frame body, body is a bytes-like object"""
+    body = memoryview(body)
+    player_count = body[0]
+    position = 1
+    players = []
+    for _ in range(player_count):
+        piece_color = COLORS[body[position]]
+        name_length = body[position + 1]
+        player_name = bytes(body[position + 2:position + 2 + name_length]).decode("utf-8")
+        players.append((player_name, piece_color))
+        position += 2 + name_length
+    (move_count,) = MOVE_COUNT.unpack_from(body, position)
+    position += MOVE_COUNT.size
+    if len(body) - position != 2 * move_count:
+        raise GameRecordError("Move count does not match the frame length")
+    if sys.byteorder == "little":
+        # view the moves in place, without copying them
+        record_moves = body[position:].cast("H") if move_count else ()
+    else:
+        record_moves = struct.unpack_from("<%dH" % move_count, body, position)
+    return RecordedGame(players, record_moves)
+
+
+def read_frame_header(header):
+    """Returns the body length of a frame header"""
+    magic, version, body_length = FRAME_HEADER.unpack(header)
+    if magic != FRAME_MAGIC:
+        raise GameRecordError("Not a game record frame")
+    if version != FORMAT_VERSION:
+        raise GameRecordError("Unknown game record version: " + str(version))
+    return body_length
+
+
+class RecordedGame:
+    """Represents a game read from a record file"""
+
+    def __init__(self, players, record_moves):
+        self._players = players
+        self._record_moves = record_moves
+
+    def get_players(self):
+        """Returns the list of (player_name, piece_color) of the game"""
+        return self._players
+
+    def get_move_count(self):
+        """Returns the number of moves of the game"""
+        return len(self._record_moves)
+
+    def get_moves(self):
+        """Returns the list of (player_name, starting_square_location, destination_square_location) of the game"""
+        names = {piece_color: player_name for player_name, piece_color in self._players}
+        moves = []
+        for record_move in self._record_moves:
+            piece_color, start, destination, captured, promoted = decode_record_move(record_move)
+            moves.append((names[piece_color], start, destination))
+        return moves
+
+    def replay(self, engine=OBJECT_ENGINE, ply_count=None, validate=True):
+        """
+        Returns a new Checkers game with the first ply_count moves played with play_moves, all by default.
+        Without validate, the moves are trusted to be legal.
+        """
+        game = Checkers(engine)
+        for player_name, piece_color in self._players:
+            game.create_player(player_name, piece_color)
+        moves = self.get_moves()
+        if ply_count is not None:
+            moves = moves[:ply_count]
+        game.play_moves(moves, validate)
+        return game
+
+
+class GameRecordWriter:
+    """Represents a writer appending game frames to a binary file"""
+
+    def __init__(self, record_file):
+        self._file = record_file
+
+    def write_game(self, players, moves):
+        """Appends a game to the file, returns the offset of its frame. See encode_game for the arguments."""
+        offset = self._file.tell()
+        self._file.write(encode_game(players, moves))
+        return offset
+
+
+def read_games(record_file):
+    """Yields the RecordedGame of every frame in a binary file, one frame at a time"""
+    while True:
+        header = record_file.read(FRAME_HEADER.size)
+        if not header:
+            return
+        if len(header) < FRAME_HEADER.size:
+            raise GameRecordError("Truncated frame header")
+        body_length = read_frame_header(header)
+        body = record_file.read(body_length)
+        if len(body) < body_length:
+            raise GameRecordError("Truncated frame body")
+        yield decode_game(body)
+
+
+def play_recorded_moves(players, moves, engine=OBJECT_ENGINE):
+    """
+    Plays the moves with play_game, returns the game and the moves with the number of captured pieces and
+    promotion of every move, ready for encode_game
+    """
+    game = Checkers(engine)
+    for player_name, piece_color in players:
+        game.create_player(player_name, piece_color)
+    recorded_moves = []
+    for player_name, start, destination in moves:
+        details = game.get_checker_details(start)
+        captured = game.play_game(player_name, start, destination)
+        recorded_moves.append((player_name, start, destination, captured,
+                               game.get_checker_details(destination) != details))
+    return game, recorded_moves
+
+
+def record_game(players, moves, engine=OBJECT_ENGINE):
+    """Returns the moves with the number of captured pieces and promotion of every move, ready for encode_game"""
+    return play_recorded_moves(players, moves, engine)[1]
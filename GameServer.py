@@ -0,0 +1,408 @@
+# Description: Asyncio server hosting many Checkers games, keyed by game id, from one event loop.
+#              The protocol is one JSON object per line. A request has an "id", an "op" and its arguments, the
+#              reply has the same "id" and either a "result" or an "error" code and message:
+#                  create_game   [game, engine]                  -> {"game": game id}
+#                  create_player game, player, color             -> null, at most one player of each color
+#                  play_game     game, player, start, destination -> number of captured pieces
+#                  get_state     game                            -> state
+#                  subscribe     game / unsubscribe game         -> state / null
+#                  close_game    game                            -> null
+#              OutofTurn, InvalidSquare and InvalidPlayer are sent as the "out_of_turn", "invalid_square" and
+#              "invalid_player" errors, a malformed request as "bad_request" and any other failure of a request as
+#              "internal_error", the connection keeps serving the client. A subscribed connection is sent
+#              {"push": "state", ...} messages: the changes of its games are collected and sent together every push
+#              interval, one state per game, so a game only keeps its latest state for a slow client.
+#              Games use the bitboard engine by default, the server limits the number of games, subscribers per
+#              game and the length of a request line.
+
+import asyncio
+import itertools
+import json
+import logging
+import sys
+
+from CheckersGame import Checkers, InvalidPlayer, InvalidSquare, OutofTurn
+from CheckersGame import OBJECT_ENGINE, BITBOARD_ENGINE, COMPACT_ENGINE
+
+ENGINES = (OBJECT_ENGINE, BITBOARD_ENGINE, COMPACT_ENGINE)
+DEFAULT_PORT = 8765
+MAX_SESSIONS = 10000
+MAX_SUBSCRIBERS = 16
+MAX_LINE_LENGTH = 4096
+PUSH_INTERVAL = 0.05
+# Pushes are skipped while a connection has more than this many bytes waiting to be sent
+MAX_WRITE_BUFFER = 64 * 1024
+
+ERROR_CODES = {OutofTurn: "out_of_turn", InvalidSquare: "invalid_square", InvalidPlayer: "invalid_player"}
+ERROR_EXCEPTIONS = {code: exception for exception, code in ERROR_CODES.items()}
+
+logger = logging.getLogger(__name__)
+
+
+class ProtocolError(Exception):
+    """Exception raise if a request is not valid, the code is sent as the error of the reply"""
+
+    def __init__(self, code, message=""):
+        super().__init__(message)
+        self.code = code
+
+
+class GameServerError(Exception):
+    """Exception raise by GameClient when the server replies with an error that is not a game exception"""
+
+    def __init__(self, code, message=""):
+        super().__init__(message)
+        self.code = code
+
+
+def encode_message(message):
+    """Returns the line of a protocol message"""
+    return json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def _get_location(request, name):
+    """Helper function that returns a location argument of a request as a tuple"""
+    location = request.get(name)
+    if (not isinstance(location, list) or len(location) != 2
+            or not all(isinstance(coordinate, int) and 0 <= coordinate < 8 for coordinate in location)):
+        raise ProtocolError("bad_request", name + " must be a [row, column] location")
+    return tuple(location)
+
+
+def _get_string(request, name):
+    """Helper function that returns a string argument of a request"""
+    value = request.get(name)
+    if not isinstance(value, str):
+        raise ProtocolError("bad_request", name + " must be a string")
+    return value
+
+
+class GameSession:
+    """Represents a game hosted by the server and the connections subscribed to it"""
+
+    __slots__ = ("_game_id", "_game", "_subscribers", "_version")
+
+    def __init__(self, game_id, engine=BITBOARD_ENGINE):
+        self._game_id = game_id
+        self._game = Checkers(engine)
+        self._subscribers = set()
+        self._version = 0
+
+    def get_game_id(self):
+        """Returns the id of the game"""
+        return self._game_id
+
+    def get_game(self):
+        """Returns the Checkers game"""
+        return self._game
+
+    def get_subscribers(self):
+        """Returns the set of connections subscribed to the game"""
+        return self._subscribers
+
+    def changed(self):
+        """Counts a change of the game and marks it for the next push to every subscriber"""
+        self._version += 1
+        for connection in self._subscribers:
+            connection.mark_changed(self)
+
+    def get_state(self):
+        """Returns the state of the game sent to the clients"""
+        game = self._game
+        return {"game": self._game_id, "version": self._version, "turn": game.get_current_turn(),
+                "winner": game.game_winner(), "pending": game.get_pending_location(),
+                "bitboards": list(game.get_bit_board().get_bitboards())}
+
+
+class ClientConnection:
+    """Represents a client connected to the server"""
+
+    def __init__(self, server, reader, writer):
+        self._server = server
+        self._reader = reader
+        self._writer = writer
+        self._subscriptions = set()
+        self._changed = {}  # game id -> session with changes not pushed yet
+
+    def mark_changed(self, session):
+        """Marks a subscribed game to be pushed at the next push interval"""
+        self._changed[session.get_game_id()] = session
+
+    def push_changes(self):
+        """Sends the state of the changed games in one write, unless the client is not reading its messages"""
+        if not self._changed or self._writer.is_closing():
+            return
+        if self._writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            return
+        self._writer.write(b"".join(encode_message(dict(session.get_state(), push="state"))
+                                    for session in self._changed.values()))
+        self._changed.clear()
+
+    def subscribe(self, session):
+        """Subscribes to the game of the session"""
+        if self not in session.get_subscribers() and len(session.get_subscribers()) >= MAX_SUBSCRIBERS:
+            raise ProtocolError("too_many_subscribers", "The game has too many subscribers")
+        session.get_subscribers().add(self)
+        self._subscriptions.add(session)
+
+    def unsubscribe(self, session):
+        """Unsubscribes from the game of the session"""
+        session.get_subscribers().discard(self)
+        self._subscriptions.discard(session)
+        self._changed.pop(session.get_game_id(), None)
+
+    def close(self):
+        """Closes the connection"""
+        self._writer.close()
+
+    async def serve(self):
+        """Reads and answers the requests of the client until it disconnects"""
+        try:
+            while True:
+                try:
+                    line = await self._reader.readline()
+                except ValueError:
+                    # the line is longer than MAX_LINE_LENGTH, the rest of the stream can't be read as lines
+                    self._writer.write(encode_message({"id": None, "error": "bad_request",
+                                                       "message": "Request line is too long"}))
+                    break
+                if not line:
+                    break
+                self._writer.write(encode_message(self._server.handle_request(self, line)))
+                await self._writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for session in list(self._subscriptions):
+                self.unsubscribe(session)
+            self._server.remove_connection(self)
+            self._writer.close()
+
+
+class GameServer:
+    """Represents a server hosting Checkers games for the clients connected to it"""
+
+    def __init__(self, max_sessions=MAX_SESSIONS, push_interval=PUSH_INTERVAL):
+        self._sessions = {}
+        self._connections = set()
+        self._max_sessions = max_sessions
+        self._push_interval = push_interval
+        self._game_ids = itertools.count(1)
+        self._server = None
+        self._push_task = None
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        """Starts listening, port 0 picks a free port. Returns the (host, port) the server listens on."""
+        self._server = await asyncio.start_server(self._accept, host, port, limit=MAX_LINE_LENGTH)
+        self._push_task = asyncio.create_task(self._push_loop())
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        """Stops listening and disconnects the clients"""
+        self._push_task.cancel()
+        self._server.close()
+        for connection in list(self._connections):
+            connection.close()
+        await self._server.wait_closed()
+
+    async def serve_forever(self):
+        """Serves the clients until the server is closed"""
+        await self._server.serve_forever()
+
+    def get_session(self, game_id):
+        """Returns the session of the game id, raises ProtocolError if there's no such game"""
+        if not isinstance(game_id, str):
+            raise ProtocolError("bad_request", "game must be a string")
+        session = self._sessions.get(game_id)
+        if session is None:
+            raise ProtocolError("unknown_game", "No game with id " + str(game_id))
+        return session
+
+    def get_stats(self):
+        """Returns the number of games and connected clients"""
+        return {"sessions": len(self._sessions), "connections": len(self._connections)}
+
+    def remove_connection(self, connection):
+        """Forgets a disconnected client"""
+        self._connections.discard(connection)
+
+    async def _accept(self, reader, writer):
+        """Helper method that serves a new client connection"""
+        connection = ClientConnection(self, reader, writer)
+        self._connections.add(connection)
+        await connection.serve()
+
+    async def _push_loop(self):
+        """Helper method that pushes the changed games to the subscribers every push interval"""
+        while True:
+            await asyncio.sleep(self._push_interval)
+            self.push_changes()
+
+    def push_changes(self):
+        """Sends the changed games to their subscribers"""
+        for connection in self._connections:
+            connection.push_changes()
+
+    def handle_request(self, connection, line):
+        """Returns the reply to a request line"""
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                raise ProtocolError("bad_request", "Request is not JSON")
+            if not isinstance(request, dict):
+                raise ProtocolError("bad_request", "Request is not a JSON object")
+            request_id = request.get("id")
+            return {"id": request_id, "result": self.run_request(connection, request)}
+        except ProtocolError as error:
+            return {"id": request_id, "error": error.code, "message": str(error)}
+        except (OutofTurn, InvalidSquare, InvalidPlayer) as error:
+            return {"id": request_id, "error": ERROR_CODES[type(error)], "message": str(error)}
+        except Exception:
+            # a bug in a request must not drop the connection of the client, its details stay in the server log
+            logger.exception("Request %r failed", request_id)
+            return {"id": request_id, "error": "internal_error", "message": "Internal server error"}
+
+    def run_request(self, connection, request):
+        """Runs a request, returns its result"""
+        op = request.get("op")
+        if op == "create_game":
+            return self.create_game(request.get("game"), request.get("engine", BITBOARD_ENGINE))
+
+        session = self.get_session(request.get("game"))
+        game = session.get_game()
+        if op == "create_player":
+            player_name = _get_string(request, "player")
+            color = request.get("color")
+            if color not in ("Black", "White"):
+                raise ProtocolError("bad_request", "color must be Black or White")
+            if all(game.get_player_by_color(player_color) is not None for player_color in ("Black", "White")):
+                raise ProtocolError("bad_request", "The game already has two players")
+            if game.get_player_by_color(color) is not None:
+                raise ProtocolError("bad_request", "color " + color + " is taken")
+            try:
+                game.get_player(player_name)
+            except InvalidPlayer:
+                pass
+            else:
+                raise ProtocolError("bad_request", "player " + player_name + " is taken")
+            game.create_player(player_name, color)
+            session.changed()
+            return None
+        if op == "play_game":
+            captured = game.play_game(_get_string(request, "player"), _get_location(request, "start"),
+                                      _get_location(request, "destination"))
+            session.changed()
+            return captured
+        if op == "get_state":
+            return session.get_state()
+        if op == "subscribe":
+            connection.subscribe(session)
+            return session.get_state()
+        if op == "unsubscribe":
+            connection.unsubscribe(session)
+            return None
+        if op == "close_game":
+            for subscriber in list(session.get_subscribers()):
+                subscriber.unsubscribe(session)
+            del self._sessions[session.get_game_id()]
+            return None
+        raise ProtocolError("bad_request", "Unknown op " + str(op))
+
+    def create_game(self, game_id=None, engine=BITBOARD_ENGINE):
+        """Creates a game, with a new game id if game_id is None, returns the game id"""
+        if len(self._sessions) >= self._max_sessions:
+            raise ProtocolError("server_full", "The server hosts too many games")
+        if engine not in ENGINES:
+            raise ProtocolError("bad_request", "Unknown engine " + str(engine))
+        if game_id is None:
+            game_id = str(next(self._game_ids))
+            while game_id in self._sessions:
+                game_id = str(next(self._game_ids))
+        elif not isinstance(game_id, str) or game_id in self._sessions:
+            raise ProtocolError("game_exists", "Game id is taken or not a string")
+        self._sessions[game_id] = GameSession(game_id, engine)
+        return {"game": game_id}
+
+
+class GameClient:
+    """
+    Represents a client of the game server. request() waits for the reply of a request, the game errors are
+    raised as OutofTurn, InvalidSquare and InvalidPlayer and the other errors as GameServerError.
+    The pushed states are read with next_push().
+    """
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._request_ids = itertools.count(1)
+        self._replies = {}
+        self._pushes = asyncio.Queue()
+        self._read_task = asyncio.create_task(self._read_loop())
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=DEFAULT_PORT):
+        """Returns a client connected to the server"""
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _read_loop(self):
+        """Helper method that routes the replies to their requests and queues the pushes"""
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if "push" in message:
+                    self._pushes.put_nowait(message)
+                elif message.get("id") in self._replies:
+                    self._replies.pop(message["id"]).set_result(message)
+        finally:
+            for reply in self._replies.values():
+                if not reply.done():
+                    reply.set_exception(ConnectionError("Connection to the game server closed"))
+
+    async def request(self, op, **arguments):
+        """Sends a request and returns its result"""
+        request_id = next(self._request_ids)
+        reply = asyncio.get_running_loop().create_future()
+        self._replies[request_id] = reply
+        self._writer.write(encode_message(dict(arguments, id=request_id, op=op)))
+        await self._writer.drain()
+        message = await reply
+        if "error" in message:
+            if message["error"] in ERROR_EXCEPTIONS:
+                raise ERROR_EXCEPTIONS[message["error"]]
+            raise GameServerError(message["error"], message.get("message", ""))
+        return message["result"]
+
+    async def play_game(self, game_id, player_name, starting_square_location, destination_square_location):
+        """Plays a move in the game, returns the number of captured pieces"""
+        return await self.request("play_game", game=game_id, player=player_name,
+                                  start=list(starting_square_location),
+                                  destination=list(destination_square_location))
+
+    async def next_push(self):
+        """Waits for the next pushed state"""
+        return await self._pushes.get()
+
+    async def close(self):
+        """Closes the connection"""
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._read_task.cancel()
+
+
+async def main(port=DEFAULT_PORT):
+    """Runs a game server on the port"""
+    server = GameServer()
+    host, port = await server.start("0.0.0.0", port)
+    print("Serving Checkers games on port", port)
+    await server.serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT))
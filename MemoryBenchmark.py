@@ -0,0 +1,52 @@
+# Description: Memory and construction time benchmark of the board engines.
+#              Builds many games with both players created on every engine and reports the time and the memory
+#              allocated per game, measured with tracemalloc.
+#              Usage: python MemoryBenchmark.py [game_count]
+
+import sys
+import time
+import tracemalloc
+
+from CheckersGame import Checkers, OBJECT_ENGINE, COMPACT_ENGINE, BITBOARD_ENGINE
+
+ENGINES = (OBJECT_ENGINE, COMPACT_ENGINE, BITBOARD_ENGINE)
+
+
+def new_games(engine, game_count):
+    """Returns game_count games on the engine with both players created"""
+    games = []
+    for _ in range(game_count):
+        game = Checkers(engine)
+        game.create_player("White Player", "White")
+        game.create_player("Black Player", "Black")
+        games.append(game)
+    return games
+
+
+def benchmark_construction(engine, game_count):
+    """Returns the seconds and the bytes per game of building game_count live games on the engine"""
+    started = time.perf_counter()
+    new_games(engine, game_count)
+    seconds = time.perf_counter() - started
+
+    tracemalloc.start()
+    games = new_games(engine, game_count)
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del games
+    return {"engine": engine, "games": game_count, "seconds": seconds,
+            "microseconds_per_game": seconds / game_count * 1e6, "bytes_per_game": allocated / game_count}
+
+
+def main():
+    game_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    results = [benchmark_construction(engine, game_count) for engine in ENGINES]
+    baseline = results[0]
+    for result in results:
+        print("%-9s %9.1f us/game %9.0f bytes/game  %5.2fx faster  %5.2fx smaller" % (
+            result["engine"], result["microseconds_per_game"], result["bytes_per_game"],
+            baseline["seconds"] / result["seconds"], baseline["bytes_per_game"] / result["bytes_per_game"]))
+
+
+if __name__ == "__main__":
+    main()
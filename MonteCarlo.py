@@ -0,0 +1,359 @@
+# Description: Monte Carlo tree search opponent for the Checkers game.
+#              MonteCarloPlayer chooses the moves of a player with UCT: every iteration walks down the tree to the
+#              child with the best upper confidence bound, adds one new position, plays a random game from it on a
+#              BitBoard and counts the result in every position on the way back up. Positions follow play_game: a
+#              capture keeps the turn, the capturing piece may capture again or end the chain (END_CHAIN) and let
+#              the opponent move, and a player with no legal move has lost. Random games are played with
+#              generate_moves and make_move, so no move is ever rejected with an exception.
+#              The tree is kept between moves: the next search starts from the position of the game if the last
+#              tree reached it. With workers, every worker process runs one search loop for the life of the player
+#              and grows its own tree from the root (root parallelization): a search is sent to every process over
+#              its pipe, so the processes search at the same time, and the visits and wins of the root moves of
+#              every worker are added up.
+
+import math
+import multiprocessing
+import os
+import random
+import time
+
+from BitBoard import BitBoard, get_move_locations, get_square_index, opponent_color
+from CheckersAI import END_CHAIN
+from Zobrist import get_position_key
+
+DEFAULT_EXPLORATION = 1.4
+MAX_PLAYOUT_MOVES = 200
+# Plies searched below the last root for the position of the next search
+REUSE_DEPTH = 4
+# Check the clock every this many iterations
+TIME_CHECK_ITERATIONS = 8
+
+
+class _TreeNode:
+    """Represents a position of the search tree, reached by a move of the mover"""
+
+    __slots__ = ("move", "mover", "color", "pending", "key", "parent", "children", "untried", "visits", "wins")
+
+    def __init__(self, move, mover, parent):
+        self.move = move
+        self.mover = mover  # color that played the move
+        self.color = None  # color to move
+        self.pending = None  # square index of the piece that may capture again
+        self.key = None
+        self.parent = parent
+        self.children = []
+        self.untried = None  # moves without a child yet
+        self.visits = 0
+        self.wins = 0.0  # wins of the mover, a game not finished counts as half a win
+
+
+class SearchTree:
+    """Represents the Monte Carlo search tree of the moves from a root position"""
+
+    def __init__(self, exploration=DEFAULT_EXPLORATION, max_playout_moves=MAX_PLAYOUT_MOVES, seed=None):
+        self._exploration = exploration
+        self._max_playout_moves = max_playout_moves
+        self._rng = random.Random(seed)
+        self._board = BitBoard()
+        self._root = None
+        self._root_state = None  # bitboards and key of the root, for BitBoard.unmake_move
+
+    def seed(self, seed):
+        """Seeds the random games of the next iterations"""
+        self._rng.seed(seed)
+
+    def get_root(self):
+        """Returns the root node, None before set_root"""
+        return self._root
+
+    def set_root(self, bitboards, color, pending=None):
+        """
+        Makes the position the root of the tree: the bitboards of a BitBoard, the color to move and the square index
+        of a piece that has just captured and must capture again. The root only has the moves of generate_moves,
+        not END_CHAIN. Keeps the subtree of the position if the tree reached it, returns True if it did.
+        """
+        board = self._board
+        board.set_bitboards(*bitboards)
+        self._root_state = bitboards + (board.get_hash(),)
+        key = get_position_key(board.get_hash(), color, pending)
+
+        root = self._find_node(key)
+        reused = root is not None
+        if root is None:
+            root = _TreeNode(None, None, None)
+            root.color = color
+            root.pending = pending
+            root.key = key
+            root.untried = board.generate_moves(color, pending)
+        else:
+            root.parent = None
+            root.children = [child for child in root.children if child.move != END_CHAIN]
+            root.untried = [move for move in root.untried if move != END_CHAIN]
+        self._root = root
+        return reused
+
+    def _find_node(self, key):
+        """Helper method that returns the node of the position key in the first plies of the tree, or None"""
+        if self._root is None:
+            return None
+        nodes = [self._root]
+        for _ in range(REUSE_DEPTH + 1):
+            next_nodes = []
+            for node in nodes:
+                if node.key == key:
+                    return node
+                next_nodes.extend(node.children)
+            nodes = next_nodes
+        return None
+
+    def get_root_stats(self):
+        """Returns {move: (visits, wins)} of the root moves searched"""
+        return {child.move: (child.visits, child.wins) for child in self._root.children}
+
+    def run(self, iterations=None, deadline=None):
+        """
+        Runs iterations, or until the perf_counter deadline if iterations is None, returns the number of iterations
+        """
+        count = 0
+        while True:
+            if iterations is not None:
+                if count >= iterations:
+                    break
+            elif count % TIME_CHECK_ITERATIONS == 0 and time.perf_counter() >= deadline:
+                break
+            self._iterate()
+            count += 1
+        return count
+
+    def _iterate(self):
+        """Helper method that selects, expands, plays out and backs up one iteration"""
+        board = self._board
+        board.unmake_move(self._root_state)
+        exploration = self._exploration
+
+        # selection
+        node = self._root
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            best_child = None
+            best_bound = -1.0
+            for child in node.children:
+                bound = child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits)
+                if bound > best_bound:
+                    best_bound = bound
+                    best_child = child
+            node = best_child
+            if node.move != END_CHAIN:
+                board.make_move(node.move)
+
+        # expansion
+        if node.untried:
+            move = node.untried.pop(self._rng.randrange(len(node.untried)))
+            node = self._add_child(node, move)
+
+        # playout and backup
+        winner = self._playout(node.color, node.pending)
+        while node is not None:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner == node.mover:
+                node.wins += 1
+            node = node.parent
+
+    def _add_child(self, node, move):
+        """Helper method that plays the move of the node on the board, returns the new child node"""
+        board = self._board
+        color = node.color
+        child = _TreeNode(move, color, node)
+        pending = None
+        if move == END_CHAIN:
+            color = opponent_color(color)
+        else:
+            board.make_move(move)
+            if move >> 10:
+                pending = (move >> 5) & 31
+            else:
+                color = opponent_color(color)
+
+        moves = None
+        if pending is not None:
+            moves = board.generate_moves(color, pending)
+            if moves:
+                moves.append(END_CHAIN)
+            else:
+                # the piece can't capture again, the opponent moves
+                color = opponent_color(color)
+                pending = None
+        if moves is None or pending is None:
+            moves = board.generate_moves(color)
+        child.color = color
+        child.pending = pending
+        child.key = get_position_key(board.get_hash(), color, pending)
+        child.untried = moves
+        node.children.append(child)
+        return child
+
+    def _playout(self, color, pending):
+        """Helper method that plays random moves on the board, returns the winner color or None for no winner"""
+        board = self._board
+        rng = self._rng
+        for _ in range(self._max_playout_moves):
+            moves = board.generate_moves(color, pending)
+            if pending is not None:
+                pending = None
+                # ends the chain if the piece can't capture again, or as one more random choice
+                index = rng.randrange(len(moves) + 1)
+                if index == len(moves):
+                    color = opponent_color(color)
+                    continue
+            elif not moves:
+                return opponent_color(color)
+            else:
+                index = rng.randrange(len(moves))
+            move = moves[index]
+            board.make_move(move)
+            if move >> 10:
+                pending = (move >> 5) & 31
+            else:
+                color = opponent_color(color)
+        return None
+
+
+def _search_in_worker(connection, exploration, max_playout_moves):
+    """
+    Helper function that runs the searches received on the connection in a worker process, with the worker's
+    tree of the last search if it reached the root, until it receives None. Sends back the root stats,
+    the number of iterations and the reuse flag of every search.
+    """
+    tree = SearchTree(exploration, max_playout_moves)
+    while True:
+        search = connection.recv()
+        if search is None:
+            break
+        bitboards, color, pending, iterations, time_budget_ms, seed = search
+        deadline = time.perf_counter() + time_budget_ms / 1000
+        tree.seed(seed)
+        reused = tree.set_root(bitboards, color, pending)
+        iteration_count = tree.run(iterations, deadline)
+        connection.send((tree.get_root_stats(), iteration_count, reused))
+    connection.close()
+
+
+class MonteCarloPlayer:
+    """Represents a computer opponent that chooses the moves of a player in a Checkers game with tree search"""
+
+    def __init__(self, game, exploration=DEFAULT_EXPLORATION, workers=0, max_playout_moves=MAX_PLAYOUT_MOVES,
+                 seed=None):
+        """
+        Takes as parameter the game, the exploration constant of UCT, the number of worker processes
+        (0 searches in this process, None uses every core), the length of the random games and a seed
+        """
+        self._game = game
+        self._exploration = exploration
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self._workers = workers
+        self._max_playout_moves = max_playout_moves
+        self._rng = random.Random(seed)
+        self._tree = SearchTree(exploration, max_playout_moves)
+        self._worker_processes = []  # (process, connection) of every worker
+        self._search_info = {"iterations": 0, "time_ms": 0.0, "iterations_per_second": 0.0, "visits": 0,
+                             "win_rate": 0.0, "reused": False, "workers": workers}
+
+    def get_search_info(self):
+        """
+        Returns the iterations, time, iterations per second, root visits, win rate of the best move
+        and whether the tree was reused in the last search
+        """
+        return self._search_info
+
+    def best_move(self, player_name, time_budget_ms=1000, iterations=None):
+        """
+        Returns the most visited move of the player after searching for time_budget_ms milliseconds,
+        or for a number of iterations (in every worker) if iterations is given. The move is an integer move
+        of legal_moves. Returns None if the player has no legal move.
+        :exception: InvalidPlayer
+        """
+        started = time.perf_counter()
+        moves = self._game.legal_moves(player_name)
+        if not moves:
+            return None
+
+        color = self._game.get_player(player_name).get_piece_color()
+        pending = None
+        pending_location = self._game.get_pending_location()
+        if pending_location is not None and player_name == self._game.get_current_turn():
+            pending = get_square_index(pending_location)
+        bitboards = self._game.get_bit_board().get_bitboards()
+
+        if self._workers == 0:
+            self._tree.seed(self._rng.getrandbits(64))
+            reused = self._tree.set_root(bitboards, color, pending)
+            iteration_count = self._tree.run(iterations, started + time_budget_ms / 1000)
+            stats = self._tree.get_root_stats()
+        else:
+            stats, iteration_count, reused = self._search_in_workers(bitboards, color, pending, time_budget_ms,
+                                                                     iterations)
+
+        best_move = moves[0]
+        best_stats = (0, 0.0)
+        for move, move_stats in stats.items():
+            if move_stats > best_stats:
+                best_move = move
+                best_stats = move_stats
+
+        elapsed = time.perf_counter() - started
+        self._search_info = {"iterations": iteration_count, "time_ms": elapsed * 1000,
+                             "iterations_per_second": iteration_count / elapsed if elapsed > 0 else 0.0,
+                             "visits": sum(move_stats[0] for move_stats in stats.values()),
+                             "win_rate": best_stats[1] / best_stats[0] if best_stats[0] else 0.0,
+                             "reused": reused, "workers": self._workers}
+        return best_move
+
+    def _search_in_workers(self, bitboards, color, pending, time_budget_ms, iterations):
+        """
+        Helper method that searches the root in every worker process and adds up the root stats.
+        Returns the merged stats, the number of iterations and whether a worker reused its tree.
+        """
+        if not self._worker_processes:
+            for _ in range(self._workers):
+                connection, worker_connection = multiprocessing.Pipe()
+                process = multiprocessing.Process(target=_search_in_worker, daemon=True,
+                                                  args=(worker_connection, self._exploration, self._max_playout_moves))
+                process.start()
+                worker_connection.close()
+                self._worker_processes.append((process, connection))
+        for _, connection in self._worker_processes:
+            connection.send((bitboards, color, pending, iterations, time_budget_ms, self._rng.getrandbits(64)))
+
+        merged = {}
+        iteration_count = 0
+        reused = False
+        for _, connection in self._worker_processes:
+            stats, worker_iterations, worker_reused = connection.recv()
+            iteration_count += worker_iterations
+            reused = reused or worker_reused
+            for move, (visits, wins) in stats.items():
+                merged_visits, merged_wins = merged.get(move, (0, 0.0))
+                merged[move] = (merged_visits + visits, merged_wins + wins)
+        return merged, iteration_count, reused
+
+    def play_turn(self, player_name, time_budget_ms=1000, iterations=None):
+        """
+        Plays the best move of the player with play_game, returns the number of captured pieces,
+        returns None if the player has no legal move
+        """
+        move = self.best_move(player_name, time_budget_ms, iterations)
+        if move is None:
+            return None
+        start, destination = get_move_locations(move)
+        return self._game.play_game(player_name, start, destination)
+
+    def close(self):
+        """Shuts down the worker processes"""
+        for process, connection in self._worker_processes:
+            connection.send(None)
+            connection.close()
+            process.join()
+        self._worker_processes = []
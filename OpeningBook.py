@@ -0,0 +1,177 @@
+# Description: Opening book of the moves played from the first positions of recorded games.
+#              Positions are keyed by the Zobrist key of their canonical form (Symmetry.get_canonical_hash), so a
+#              lookup is one dict access. A position with White to move is stored as its mirror with Black to move:
+#              its book moves are rotated and its Black and White wins swapped, so both share one entry.
+#              Every book move of a position counts the games that played it and how many of them Black and White
+#              won according to game_winner. Games are replayed with play_game up to the book depth.
+#              The book file has a header ("CKOB", version, depth, game count, row count) then one fixed-size row
+#              per position and move, sorted by key: 8 bytes key, 2 bytes move (bits 0-4 starting square index,
+#              bits 5-9 destination square index), 4 bytes games, 4 bytes Black wins, 4 bytes White wins.
+
+import struct
+
+from BitBoard import SQUARE_LOCATIONS, get_square_index
+from CheckersGame import Checkers, BITBOARD_ENGINE, GAME_NOT_ENDED
+from Symmetry import get_canonical_hash, mirror_move
+
+BOOK_MAGIC = b"CKOB"
+BOOK_VERSION = 2
+BOOK_HEADER = struct.Struct("<4sBBxxII")
+BOOK_ROW = struct.Struct("<QHIII")
+DEFAULT_DEPTH = 12
+
+# Indexes of the counts of a book move
+GAMES = 0
+BLACK_WINS = 1
+WHITE_WINS = 2
+
+
+class OpeningBookError(Exception):
+    """Exception raise if a book file is not in the book format"""
+    pass
+
+
+def encode_book_move(starting_square_location, destination_square_location):
+    """Returns the 10-bit book move of a move between playable squares"""
+    start = get_square_index(tuple(starting_square_location))
+    destination = get_square_index(tuple(destination_square_location))
+    return start | (destination << 5)
+
+
+def decode_book_move(book_move):
+    """Returns the starting and destination locations of a book move"""
+    return SQUARE_LOCATIONS[book_move & 31], SQUARE_LOCATIONS[(book_move >> 5) & 31]
+
+
+class OpeningBook:
+    """Represents the book moves of the positions of the first depth moves of the games added to it"""
+
+    def __init__(self, depth=DEFAULT_DEPTH):
+        self._depth = depth
+        self._positions = {}  # canonical position key -> {book move: [games, Black wins, White wins]}
+        self._game_count = 0
+
+    def get_depth(self):
+        """Returns the number of moves of every game added to the book"""
+        return self._depth
+
+    def get_position_count(self):
+        """Returns the number of positions in the book"""
+        return len(self._positions)
+
+    def get_game_count(self):
+        """Returns the number of games added to the book"""
+        return self._game_count
+
+    def add_game(self, players, moves, winner_color=None, engine=BITBOARD_ENGINE):
+        """
+        Adds the first moves of a game to the book. players is a list of (player_name, piece_color) in the order
+        they were created, moves a list of (player_name, start, destination) as given to play_game.
+        winner_color is the color of the winner, the whole game is replayed to find it with game_winner if it's None.
+        Returns the winner color, None if the game has not ended.
+        """
+        game = Checkers(engine)
+        colors = {}
+        for player_name, piece_color in players:
+            game.create_player(player_name, piece_color)
+            colors[player_name] = piece_color
+
+        book_moves = []
+        replayed_moves = moves if winner_color is None else moves[:self._depth]
+        for ply, (player_name, start, destination) in enumerate(replayed_moves):
+            if ply < self._depth:
+                key, flipped = get_canonical_hash(game)
+                book_move = encode_book_move(start, destination)
+                book_moves.append((key, mirror_move(book_move) if flipped else book_move, flipped))
+            game.play_game(player_name, start, destination)
+        if winner_color is None:
+            winner = game.game_winner()
+            winner_color = None if winner == GAME_NOT_ENDED else colors[winner]
+
+        for key, book_move, flipped in book_moves:
+            counts = self._positions.setdefault(key, {}).setdefault(book_move, [0, 0, 0])
+            counts[GAMES] += 1
+            if winner_color is not None:
+                # the colors of a flipped position are swapped in its canonical form
+                counts[BLACK_WINS if (winner_color == "Black") != flipped else WHITE_WINS] += 1
+        self._game_count += 1
+        return winner_color
+
+    def add_recorded_game(self, recorded_game, winner_color=None):
+        """Adds a RecordedGame of GameRecord.py to the book, returns the winner color"""
+        return self.add_game(recorded_game.get_players(), recorded_game.get_moves(), winner_color)
+
+    def add_archive(self, archive):
+        """Adds every game of a GameArchive to the book, the winners are read in the archive index"""
+        for game_number in range(archive.get_game_count()):
+            winner_color = archive.get_metadata(game_number)["winner_color"]
+            self.add_recorded_game(archive.get_game(game_number), winner_color)
+
+    def get_position_moves(self, key):
+        """
+        Returns the {book move: [games, Black wins, White wins]} of a canonical position key of get_canonical_hash,
+        empty if it's not in the book. The book moves and wins are those of the canonical position.
+        """
+        return self._positions.get(key, {})
+
+    def get_book_moves(self, checkers):
+        """
+        Returns the book moves of the position of a Checkers game, the most played first. Every book move is a dict
+        of the starting and destination locations, the number of games, and the wins and losses of the player to move.
+        """
+        key, flipped = get_canonical_hash(checkers)
+        book_moves = []
+        for book_move, counts in self.get_position_moves(key).items():
+            # the canonical position has Black to move
+            start, destination = decode_book_move(mirror_move(book_move) if flipped else book_move)
+            book_moves.append({"start": start, "destination": destination, "games": counts[GAMES],
+                               "wins": counts[BLACK_WINS], "losses": counts[WHITE_WINS]})
+        book_moves.sort(key=lambda book_move: (-book_move["games"], book_move["start"], book_move["destination"]))
+        return book_moves
+
+    def choose_move(self, checkers, rng):
+        """
+        Returns the (start, destination) of a book move of the game chosen at random in proportion to
+        the number of games, or None if the position is not in the book
+        """
+        key, flipped = get_canonical_hash(checkers)
+        position_moves = self.get_position_moves(key)
+        if not position_moves:
+            return None
+        book_moves = list(position_moves)
+        book_move = rng.choices(book_moves, [position_moves[book_move][GAMES] for book_move in book_moves])[0]
+        return decode_book_move(mirror_move(book_move) if flipped else book_move)
+
+    def save(self, path):
+        """Writes the book file, returns the number of rows"""
+        rows = [BOOK_ROW.pack(key, book_move, *counts)
+                for key in sorted(self._positions)
+                for book_move, counts in sorted(self._positions[key].items())]
+        with open(path, "wb") as book_file:
+            book_file.write(BOOK_HEADER.pack(BOOK_MAGIC, BOOK_VERSION, self._depth, self._game_count, len(rows)))
+            book_file.write(b"".join(rows))
+        return len(rows)
+
+    @classmethod
+    def load(cls, path):
+        """Returns the book of a book file"""
+        with open(path, "rb") as book_file:
+            data = book_file.read()
+        if len(data) < BOOK_HEADER.size:
+            raise OpeningBookError("Not an opening book file")
+        magic, version, depth, game_count, row_count = BOOK_HEADER.unpack_from(data)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION:
+            raise OpeningBookError("Not an opening book file")
+        if len(data) != BOOK_HEADER.size + row_count * BOOK_ROW.size:
+            raise OpeningBookError("Book file has the wrong length")
+
+        book = cls(depth)
+        book._game_count = game_count
+        positions = book._positions
+        rows = BOOK_ROW.iter_unpack(memoryview(data)[BOOK_HEADER.size:])
+        for key, book_move, games, black_wins, white_wins in rows:
+            position_moves = positions.get(key)
+            if position_moves is None:
+                position_moves = positions[key] = {}
+            position_moves[book_move] = [games, black_wins, white_wins]
+        return book
@@ -0,0 +1,342 @@
+# Description: Perft verifier of the move generation of the Checkers game.
+#              perft counts the positions reached after depth plies from the position of a game, by the rules of
+#              play_game: after a capture the capturing piece may capture again, or the opponent may take the turn
+#              with any move. The counts are played with generate_moves and make_move on a BitBoard, and the counts
+#              of the subtrees are kept in a TranspositionTable keyed by position key and depth, so the subtrees of
+#              positions reached by different move orders are counted once.
+#              divide gives the count of every root move. cross_check counts them again on the object engine, with
+#              the moves found square by square on the board of Piece objects and played with play_game, and
+#              reports the root moves whose counts differ.
+#              Usage: python Perft.py [depth] [--divide] [--cross-check] [--no-cache]
+#                                     [--archive games.rec --game 0 --ply 20]
+
+import argparse
+import sys
+import time
+
+from BitBoard import BitBoard, encode_move, get_move_locations, get_square_index, opponent_color
+from CheckersGame import Checkers, InvalidSquare, OutofTurn, BITBOARD_ENGINE, OBJECT_ENGINE, get_game_position
+from GameArchive import GameArchive
+from Simulation import new_simulated_game
+from Zobrist import EXACT, TranspositionTable, get_position_key
+
+DEFAULT_DEPTH = 6
+DEFAULT_TABLE_SIZE = 1 << 18
+
+
+class PerftError(Exception):
+    """Exception raise if play_game rejects a move of the move generation"""
+    pass
+
+
+def _check_depth(depth, minimum=0):
+    """Helper function that raises ValueError if the depth is below the minimum"""
+    if depth < minimum:
+        raise ValueError("Perft depth must be at least " + str(minimum) + ": " + str(depth))
+
+
+class Perft:
+    """Represents the move counter of the positions of a BitBoard"""
+
+    def __init__(self, table_size=DEFAULT_TABLE_SIZE):
+        """Takes as parameter the number of buckets of the table of subtree counts, 0 counts without a table"""
+        self._board = BitBoard()
+        self._table = TranspositionTable(table_size) if table_size else None
+        self._color = "Black"
+        self._pending = None
+        self._nodes = 0
+
+    def set_position(self, bitboards, color, pending=None):
+        """Sets the position: the bitboards of a BitBoard, the color to move and the pending piece square index"""
+        self._board.set_bitboards(*bitboards)
+        self._color = color
+        self._pending = pending
+
+    def set_game(self, game):
+        """Sets the position of a Checkers game"""
+        self.set_position(*get_game_position(game))
+
+    def get_moves(self):
+        """
+        Returns the (color, move) of the moves of the position. After a capture, the captures of the pending piece
+        and the moves of the opponent.
+        """
+        return self._get_moves(self._color, self._pending)
+
+    def _get_moves(self, color, pending):
+        """Helper method that returns the (color, move) of the moves of a position"""
+        board = self._board
+        if pending is None:
+            return [(color, move) for move in board.generate_moves(color)]
+        opponent = opponent_color(color)
+        return ([(color, move) for move in board.generate_moves(color, pending)]
+                + [(opponent, move) for move in board.generate_moves(opponent)])
+
+    def get_table(self):
+        """Returns the TranspositionTable of the subtree counts, None without a table"""
+        return self._table
+
+    def get_nodes(self):
+        """Returns the number of positions visited by the last count"""
+        return self._nodes
+
+    def perft(self, depth):
+        """
+        Returns the number of positions after depth plies
+        :exception: ValueError if the depth is negative
+        """
+        _check_depth(depth)
+        self._nodes = 0
+        return self._perft(depth, self._color, self._pending)
+
+    def divide(self, depth):
+        """
+        Returns the [(color, move, count)] of the root moves, count is the number of positions after depth plies
+        :exception: ValueError if the depth is below 1
+        """
+        _check_depth(depth, 1)
+        self._nodes = 0
+        board = self._board
+        counts = []
+        for color, move in self.get_moves():
+            saved = board.make_move(move)
+            if move >> 10:
+                count = self._perft(depth - 1, color, (move >> 5) & 31)
+            else:
+                count = self._perft(depth - 1, opponent_color(color), None)
+            board.unmake_move(saved)
+            counts.append((color, move, count))
+        return counts
+
+    def _perft(self, depth, color, pending):
+        """Helper method that counts the positions after depth plies from the position of the board"""
+        self._nodes += 1
+        if depth == 0:
+            return 1
+        board = self._board
+        if pending is None:
+            moves = board.generate_moves(color)
+            if depth == 1:
+                return len(moves)
+        else:
+            moves = None
+
+        table = self._table
+        key = None
+        if table is not None and depth > 1:
+            key = get_position_key(board.get_hash(), color, pending)
+            entry = table.probe(key)
+            if entry is not None and entry[1] == depth:
+                return entry[2]
+
+        if moves is None:
+            count = 0
+            for move_color, move in self._get_moves(color, pending):
+                count += self._count_move(depth, move_color, move)
+        else:
+            count = 0
+            for move in moves:
+                count += self._count_move(depth, color, move)
+
+        if key is not None:
+            table.store(key, depth, count, EXACT, None)
+        return count
+
+    def _count_move(self, depth, color, move):
+        """Helper method that plays the move of the color and counts the positions after depth - 1 more plies"""
+        board = self._board
+        saved = board.make_move(move)
+        if move >> 10:
+            count = self._perft(depth - 1, color, (move >> 5) & 31)
+        else:
+            count = self._perft(depth - 1, opponent_color(color), None)
+        board.unmake_move(saved)
+        return count
+
+
+def perft(game, depth, table_size=DEFAULT_TABLE_SIZE):
+    """
+    Returns the number of positions after depth plies from the position of the Checkers game
+    :exception: ValueError if the depth is negative
+    """
+    counter = Perft(table_size)
+    counter.set_game(game)
+    return counter.perft(depth)
+
+
+def get_reference_moves(game, player_name, pending_location=None):
+    """
+    Returns the moves of the player's pieces found square by square on the board of a Checkers game, apart from
+    BitBoard.generate_moves: a man steps or jumps over an opponent's piece forward, a king moves along a diagonal
+    over at most one opponent's piece, a triple king over at most two. With the location of the pending piece,
+    only the captures of that piece.
+    """
+    color = game.get_player(player_name).get_piece_color()
+    forward = -1 if color == "Black" else 1
+    if pending_location is None:
+        locations = [(row, col) for row in range(8) for col in range(8)]
+    else:
+        locations = [tuple(pending_location)]
+
+    moves = []
+    for row, col in locations:
+        piece = game.get_picked_checker((row, col))
+        if piece is None or piece.get_owner() != player_name:
+            continue
+        start = get_square_index((row, col))
+        if piece.is_king() or piece.is_triple_king():
+            max_captures = 2 if piece.is_triple_king() else 1
+            for row_step, col_step in ((-1, -1), (-1, 1), (1, -1), (1, 1)):
+                captured = 0
+                captured_count = 0
+                target_row, target_col = row + row_step, col + col_step
+                while 0 <= target_row < 8 and 0 <= target_col < 8:
+                    target = game.get_picked_checker((target_row, target_col))
+                    target_square = get_square_index((target_row, target_col))
+                    if target is None:
+                        if captured_count or pending_location is None:
+                            moves.append(encode_move(start, target_square, captured))
+                    elif target.get_owner() != player_name and captured_count < max_captures:
+                        captured |= 1 << target_square
+                        captured_count += 1
+                    else:
+                        break
+                    target_row += row_step
+                    target_col += col_step
+        else:
+            for col_step in (-1, 1):
+                step = (row + forward, col + col_step)
+                jump = (row + 2 * forward, col + 2 * col_step)
+                if not (0 <= step[0] < 8 and 0 <= step[1] < 8):
+                    continue
+                jumped = game.get_picked_checker(step)
+                if jumped is None:
+                    if pending_location is None:
+                        moves.append(encode_move(start, get_square_index(step)))
+                elif (jumped.get_owner() != player_name and 0 <= jump[0] < 8 and 0 <= jump[1] < 8
+                      and game.get_picked_checker(jump) is None):
+                    moves.append(encode_move(start, get_square_index(jump), 1 << get_square_index(step)))
+    return moves
+
+
+def get_play_game_moves(game):
+    """
+    Returns the (player_name, move) of the moves of a Checkers game by get_reference_moves:
+    after a capture, the captures of the pending piece and the moves of the opponent
+    """
+    player_name = game.get_current_turn()
+    pending_location = game.get_pending_location()
+    moves = [(player_name, move) for move in get_reference_moves(game, player_name, pending_location)]
+    if pending_location is not None:
+        opponent = game.get_player_by_color(opponent_color(game.get_player(player_name).get_piece_color()))
+        moves.extend((opponent, move) for move in get_reference_moves(game, opponent))
+    return moves
+
+
+def reference_perft(game, depth):
+    """
+    Returns the number of positions after depth plies from the position of the Checkers game,
+    every move played with play_game on a fork of the game
+    :exception: PerftError if play_game rejects a move
+    :exception: ValueError if the depth is negative
+    """
+    _check_depth(depth)
+    if depth == 0:
+        return 1
+    count = 0
+    for player_name, move in get_play_game_moves(game):
+        count += reference_perft(play_reference_move(game, player_name, move), depth - 1)
+    return count
+
+
+def play_reference_move(game, player_name, move):
+    """
+    Returns a fork of the game with the move played with play_game
+    :exception: PerftError if play_game rejects the move
+    """
+    child = game.fork()
+    start, destination = get_move_locations(move)
+    try:
+        child.play_game(player_name, start, destination)
+    except (InvalidSquare, OutofTurn) as error:
+        raise PerftError("play_game rejected " + str(player_name) + " " + str(start) + " -> " + str(destination)
+                         + ": " + type(error).__name__) from error
+    return child
+
+
+def cross_check(game, depth, table_size=DEFAULT_TABLE_SIZE):
+    """
+    Counts the positions of every root move after depth plies with divide, and again with play_game
+    on the object engine. Returns the (color, move, divide count, play_game count) of the root moves whose
+    counts differ, a count is None for a move missing from one of them. Returns an empty list if they all match.
+    :exception: PerftError if play_game rejects a move
+    :exception: ValueError if the depth is below 1
+    """
+    counter = Perft(table_size)
+    counter.set_game(game)
+    counts = {(color, move): count for color, move, count in counter.divide(depth)}
+
+    reference_game = Checkers.from_snapshot(game.snapshot(), OBJECT_ENGINE)
+    reference_counts = {}
+    for player_name, move in get_play_game_moves(reference_game):
+        color = reference_game.get_player(player_name).get_piece_color()
+        reference_counts[(color, move)] = reference_perft(play_reference_move(reference_game, player_name, move),
+                                                          depth - 1)
+
+    mismatches = []
+    for color, move in sorted(set(counts) | set(reference_counts)):
+        count = counts.get((color, move))
+        reference_count = reference_counts.get((color, move))
+        if count != reference_count:
+            mismatches.append((color, move, count, reference_count))
+    return mismatches
+
+
+def format_move(color, move):
+    """Returns the move as "color (row, col) -> (row, col)" """
+    start, destination = get_move_locations(move)
+    return "%s %s -> %s" % (color, start, destination)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Perft verifier of the Checkers move generation")
+    parser.add_argument("depth", type=int, nargs="?", default=DEFAULT_DEPTH)
+    parser.add_argument("--divide", action="store_true", help="print the count of every root move")
+    parser.add_argument("--cross-check", action="store_true",
+                        help="compare the counts of the root moves with play_game on the object engine")
+    parser.add_argument("--no-cache", action="store_true", help="count without the table of subtree counts")
+    parser.add_argument("--archive", help="GameArchive to load the position from, the start position by default")
+    parser.add_argument("--game", type=int, default=0, help="game number in the archive")
+    parser.add_argument("--ply", type=int, help="number of moves of the game played, all moves by default")
+    options = parser.parse_args(arguments)
+    if options.depth < 0:
+        parser.error("depth must not be negative")
+    if options.depth < 1 and (options.divide or options.cross_check):
+        parser.error("--divide and --cross-check need a depth of at least 1")
+
+    if options.archive:
+        with GameArchive(options.archive) as archive:
+            game = archive.get_position(options.game, options.ply, BITBOARD_ENGINE)
+    else:
+        game = new_simulated_game()
+    counter = Perft(0 if options.no_cache else DEFAULT_TABLE_SIZE)
+    counter.set_game(game)
+    for depth in range(1, options.depth + 1):
+        started = time.perf_counter()
+        count = counter.perft(depth)
+        print("perft(%d) = %d  %.3f s  %d nodes" % (depth, count, time.perf_counter() - started,
+                                                  counter.get_nodes()))
+    if options.divide:
+        for color, move, count in counter.divide(options.depth):
+            print("%-28s %d" % (format_move(color, move), count))
+    if options.cross_check:
+        mismatches = cross_check(game, options.depth)
+        for color, move, count, reference_count in mismatches:
+            print("mismatch %-28s perft %s play_game %s" % (format_move(color, move), count, reference_count))
+        print("cross-check:", "%d mismatch(es)" % len(mismatches) if mismatches else "ok")
+        return 1 if mismatches else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
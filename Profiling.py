@@ -0,0 +1,114 @@
+# Description: Opt-in profiling of the Checkers game and its board.
+#              Profiler.attach(game) switches the class of the game and of its board to a subclass whose phase
+#              methods (play_game, get_picked_checker, resolve_captures, move_destination, ... and the board
+#              methods) count their calls and time them. detach(game) switches the classes back, so a game that is
+#              not profiled runs the original methods without any cost.
+#              The self time of play_game is its validation and bookkeeping, the time not spent in other phases.
+#              snapshot() returns the calls, total and self time of every phase, export_folded() the time of every
+#              call stack in the folded stack format of flame graph tools ("play_game;resolve_captures 1200").
+
+import time
+
+# Phases of Checkers and of the boards, the methods missing from a class are skipped
+CHECKERS_PHASES = ("play_game", "_play_game_bitboard", "get_picked_checker", "resolve_captures",
+                   "remove_captured_pieces", "move_destination", "promote_piece", "next_turn", "make_move",
+                   "unmake_move", "legal_moves", "get_turn_moves", "game_winner", "get_checker_details", "print_board")
+BOARD_PHASES = ("get_board", "get_piece", "add_piece_to_board", "remove_piece_from_board", "move_piece",
+                "make_move", "unmake_move", "generate_moves", "get_color", "make_king", "make_triple_king")
+
+
+def _wrap_phase(profiler, phase_name, method):
+    """Helper function that returns the method timed by the profiler as the phase"""
+    def timed_method(self, *args, **kwargs):
+        profiler.enter(phase_name)
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            profiler.exit()
+    timed_method.__name__ = method.__name__
+    timed_method.__doc__ = method.__doc__
+    return timed_method
+
+
+class Profiler:
+    """Represents the phase timers and call counters of the games attached to it"""
+
+    def __init__(self):
+        self._classes = {}  # original class -> profiled subclass
+        self._phases = {}  # phase name -> [calls, total ns, self ns]
+        self._folded = {}  # call stack -> self ns
+        self._stack = []  # [phase name, call stack, start ns, child ns] of the running phases
+        self._running = {}  # phase name -> number of running calls, a recursive call is counted once in the total
+
+    def _get_profiled_class(self, original_class, phase_names):
+        """Helper method that returns the subclass of the class with the phases timed"""
+        profiled_class = self._classes.get(original_class)
+        if profiled_class is None:
+            methods = {"__slots__": ()}
+            for name in phase_names:
+                method = getattr(original_class, name, None)
+                if method is not None:
+                    methods[name] = _wrap_phase(self, original_class.__name__ + "." + name.lstrip("_"), method)
+            profiled_class = type("Profiled" + original_class.__name__, (original_class,), methods)
+            self._classes[original_class] = profiled_class
+        return profiled_class
+
+    def attach(self, game):
+        """Starts timing the phases of the game and its board"""
+        if type(game) in self._classes.values():
+            return
+        board = game.get_game_board()
+        board.__class__ = self._get_profiled_class(type(board), BOARD_PHASES)
+        game.__class__ = self._get_profiled_class(type(game), CHECKERS_PHASES)
+
+    def detach(self, game):
+        """Stops timing the phases of the game and its board"""
+        board = game.get_game_board()
+        if type(board) in self._classes.values():
+            board.__class__ = type(board).__bases__[0]
+        if type(game) in self._classes.values():
+            game.__class__ = type(game).__bases__[0]
+
+    def enter(self, phase_name):
+        """Starts a call of the phase"""
+        call_stack = self._stack[-1][1] + ";" + phase_name if self._stack else phase_name
+        self._running[phase_name] = self._running.get(phase_name, 0) + 1
+        self._stack.append([phase_name, call_stack, time.perf_counter_ns(), 0])
+
+    def exit(self):
+        """Ends the running call of the last phase entered"""
+        phase_name, call_stack, started, child_ns = self._stack.pop()
+        elapsed = time.perf_counter_ns() - started
+        self._running[phase_name] -= 1
+        stats = self._phases.get(phase_name)
+        if stats is None:
+            stats = self._phases[phase_name] = [0, 0, 0]
+        stats[0] += 1
+        if not self._running[phase_name]:
+            stats[1] += elapsed
+        stats[2] += elapsed - child_ns
+        self._folded[call_stack] = self._folded.get(call_stack, 0) + elapsed - child_ns
+        if self._stack:
+            self._stack[-1][3] += elapsed
+
+    def reset(self):
+        """Clears the counters and timers"""
+        self._phases = {}
+        self._folded = {}
+
+    def snapshot(self):
+        """Returns {phase name: {calls, total_ms, self_ms, mean_us}} of the phases called so far"""
+        return {phase_name: {"calls": calls, "total_ms": total_ns / 1e6, "self_ms": self_ns / 1e6,
+                             "mean_us": total_ns / calls / 1e3}
+                for phase_name, (calls, total_ns, self_ns) in self._phases.items()}
+
+    def export_folded(self, output_file=None):
+        """
+        Returns the folded call stacks, one "phase;phase;phase microseconds" line per call stack,
+        and writes them to the file object if one is given
+        """
+        folded = "".join("%s %d\n" % (call_stack, self_ns // 1000)
+                         for call_stack, self_ns in sorted(self._folded.items()))
+        if output_file is not None:
+            output_file.write(folded)
+        return folded
@@ -0,0 +1,115 @@
+# Description: Batch simulator of Checkers games.
+#              simulate_games plays many independent games on the bitboard engine across a process pool and yields
+#              the result of every game in order as soon as it's ready. Every game has its own seed, so a batch
+#              gives the same results with any number of workers.
+#              Workers send back the moves of a game as a list of integer moves, replay_game rebuilds the game.
+
+import os
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from BitBoard import get_move_locations
+from CheckersGame import Checkers, BITBOARD_ENGINE, GAME_NOT_ENDED
+
+BLACK_PLAYER = "Black Player"
+WHITE_PLAYER = "White Player"
+
+
+def random_policy(game, player_name, moves, rng):
+    """Policy that plays a random legal move"""
+    return rng.choice(moves)
+
+
+def capture_policy(game, player_name, moves, rng):
+    """Policy that plays a random move among the moves capturing the most pieces"""
+    most_captured = max((move >> 10).bit_count() for move in moves)
+    return rng.choice([move for move in moves if (move >> 10).bit_count() == most_captured])
+
+
+def get_game_seed(seed, game_index):
+    """Returns the seed of the game_index-th game of a batch"""
+    return seed * 1000003 + game_index
+
+
+def new_simulated_game(engine=BITBOARD_ENGINE):
+    """Returns a new game with the Black and White players created"""
+    game = Checkers(engine)
+    game.create_player(BLACK_PLAYER, "Black")
+    game.create_player(WHITE_PLAYER, "White")
+    return game
+
+
+def replay_game(moves, engine=BITBOARD_ENGINE):
+    """Returns a new game with the integer moves of a simulated game played"""
+    game = new_simulated_game(engine)
+    for move in moves:
+        game.make_move(move)
+    return game
+
+
+def get_play_game_moves(moves):
+    """Returns the (player_name, start, destination) of the integer moves of a simulated game, for play_game"""
+    game = new_simulated_game()
+    play_game_moves = []
+    for move in moves:
+        start, destination = get_move_locations(move)
+        play_game_moves.append((game.get_player_by_color(game.get_bit_board().get_color(start)), start, destination))
+        game.make_move(move)
+    return play_game_moves
+
+
+def play_simulated_game(game_index, seed, policy, max_moves):
+    """
+    Plays one game with the policy for both players, returns the result: game index, seed, winner from
+    game_winner, number of moves, captured pieces count of each player and the list of moves
+    """
+    game_seed = get_game_seed(seed, game_index)
+    rng = random.Random(game_seed)
+    game = new_simulated_game()
+    moves = []
+    while len(moves) < max_moves and game.game_winner() == GAME_NOT_ENDED:
+        player_name, legal_moves = game.get_turn_moves()
+        if not legal_moves:
+            break
+        move = policy(game, player_name, legal_moves, rng)
+        game.make_move(move)
+        moves.append(move)
+
+    return {"game": game_index, "seed": game_seed, "winner": game.game_winner(), "move_count": len(moves),
+            "captures": {player_name: game.get_player(player_name).get_captured_pieces_count()
+                         for player_name in (BLACK_PLAYER, WHITE_PLAYER)},
+            "moves": moves}
+
+
+def _play_simulated_games(first_game, game_count, seed, policy, max_moves):
+    """Helper function that plays a chunk of games in a worker process"""
+    return [play_simulated_game(game_index, seed, policy, max_moves)
+            for game_index in range(first_game, first_game + game_count)]
+
+
+def simulate_games(n, policy=random_policy, workers=None, seed=0, max_moves=400, chunk_size=16):
+    """
+    Plays n games and yields their results in game order.
+    policy is a function of (game, player_name, moves, rng) returning the move to play, it must be picklable
+    to run in the worker processes. workers is the number of processes, None uses every core
+    and 0 plays the games in this process.
+    """
+    if workers == 0:
+        for game_index in range(n):
+            yield play_simulated_game(game_index, seed, policy, max_moves)
+        return
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # keep a few chunks per worker in flight so results stream without queueing the whole batch
+        max_in_flight = 2 * workers
+        in_flight = deque()
+        for first_game in range(0, n, chunk_size):
+            in_flight.append(executor.submit(_play_simulated_games, first_game, min(chunk_size, n - first_game),
+                                             seed, policy, max_moves))
+            if len(in_flight) >= max_in_flight:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
@@ -0,0 +1,131 @@
+# Description: Symmetry of Checkers positions under the color swap and a 180 degree rotation of the board.
+#              The rotation maps the location (row, col) to (7 - row, 7 - col), the square index square to
+#              31 - square, and the king and triple king rows of Black onto those of White. A position with the
+#              colors of the pieces swapped, the board rotated and the other color to move plays like the position:
+#              every move, capture and promotion is rotated, and a win of Black is a win of White.
+#              The canonical form of a position is the one with Black to move, a position with White to move is
+#              mirrored and flipped is True. Tables that store the canonical form keep one entry for both.
+#              The canonical key packs the black, white, king and triple king bitboards and the square of the piece
+#              that has just captured into one integer (KEY_BYTES bytes). get_canonical_hash is the Zobrist key of
+#              the canonical position, for tables keyed like Checkers.get_hash.
+#              mirror_move, mirror_location and mirror_square map the moves of a position to the moves of its
+#              canonical form and back when flipped is True.
+
+from BitBoard import SQUARE_COUNT, opponent_color
+from CheckersGame import GameSnapshot, get_game_position
+from Zobrist import get_board_key, get_position_key
+
+# Byte values with their 8 bits in reverse order
+REVERSED_BYTES = tuple(int("{:08b}".format(value)[::-1], 2) for value in range(256))
+
+# Pending square of a key without a pending piece
+NO_PENDING = SQUARE_COUNT
+KEY_BYTES = 17
+PIECE_COUNT = 12
+
+
+def mirror_bitboard(bitboard):
+    """Returns the bitboard rotated by 180 degrees: the bit of square index square moves to 31 - square"""
+    return ((REVERSED_BYTES[bitboard & 255] << 24) | (REVERSED_BYTES[(bitboard >> 8) & 255] << 16)
+            | (REVERSED_BYTES[(bitboard >> 16) & 255] << 8) | REVERSED_BYTES[bitboard >> 24])
+
+
+def mirror_square(square):
+    """Returns the square index rotated by 180 degrees, None for None"""
+    if square is None:
+        return None
+    return SQUARE_COUNT - 1 - square
+
+
+def mirror_location(location):
+    """Returns the (row, col) location rotated by 180 degrees"""
+    return 7 - location[0], 7 - location[1]
+
+
+def mirror_move(move):
+    """
+    Returns the integer move (BitBoard.encode_move, or a book move of OpeningBook.py) rotated by 180 degrees.
+    A negative move, END_CHAIN of CheckersAI.py, is returned as is.
+    """
+    if move < 0:
+        return move
+    return ((SQUARE_COUNT - 1 - (move & 31)) | ((SQUARE_COUNT - 1 - ((move >> 5) & 31)) << 5)
+            | (mirror_bitboard(move >> 10) << 10))
+
+
+def mirror_position(bitboards, color, pending=None):
+    """
+    Returns the black, white, king and triple king bitboards, the color to move and the pending square index
+    of the position with the colors swapped and the board rotated by 180 degrees
+    """
+    black, white, kings, triple_kings = bitboards
+    return ((mirror_bitboard(white), mirror_bitboard(black), mirror_bitboard(kings), mirror_bitboard(triple_kings)),
+            opponent_color(color), mirror_square(pending))
+
+
+def canonicalize(bitboards, color, pending=None):
+    """
+    Returns the bitboards and pending square index of the canonical form of the position, with Black to move,
+    and flipped: True if the position has White to move and was mirrored
+    """
+    if color == "Black":
+        return tuple(bitboards), pending, False
+    bitboards, color, pending = mirror_position(bitboards, color, pending)
+    return bitboards, pending, True
+
+
+def encode_key(bitboards, pending=None):
+    """Returns the integer key of the bitboards and pending square index of a canonical position"""
+    black, white, kings, triple_kings = bitboards
+    return (black | (white << 32) | (kings << 64) | (triple_kings << 96)
+            | ((NO_PENDING if pending is None else pending) << 128))
+
+
+def decode_key(key):
+    """Returns the bitboards and pending square index of a key"""
+    mask = (1 << 32) - 1
+    pending = key >> 128
+    return ((key & mask, (key >> 32) & mask, (key >> 64) & mask, (key >> 96) & mask),
+            None if pending == NO_PENDING else pending)
+
+
+def get_canonical_key(game):
+    """Returns the canonical key of the position of a Checkers game and whether the position was flipped"""
+    bitboards, pending, flipped = canonicalize(*get_game_position(game))
+    return encode_key(bitboards, pending), flipped
+
+
+def get_canonical_hash(game):
+    """
+    Returns the Zobrist key of the canonical form of the position of a Checkers game, equal to get_hash of
+    the game with Black to move, and whether the position was flipped
+    """
+    if game.get_player(game.get_current_turn()).get_piece_color() == "Black":
+        return game.get_hash(), False
+    bitboards, pending, flipped = canonicalize(*get_game_position(game))
+    return get_position_key(get_board_key(*bitboards), "Black", pending), flipped
+
+
+def restore_position(key, flipped=False):
+    """Returns the bitboards, the color to move and the pending square index of a key, mirrored back if flipped"""
+    bitboards, pending = decode_key(key)
+    if flipped:
+        return mirror_position(bitboards, "Black", pending)
+    return bitboards, "Black", pending
+
+
+def get_snapshot(key, players, flipped=False):
+    """
+    Returns the GameSnapshot of the position of a key, for Checkers.from_snapshot. players is a list of
+    (player_name, piece_color), the captured pieces count of a player is the number of opponent's pieces
+    missing from the board.
+    """
+    (black, white, kings, triple_kings), color, pending = restore_position(key, flipped)
+    piece_counts = {"Black": black.bit_count(), "White": white.bit_count()}
+    current_turn = None
+    snapshot_players = []
+    for player_name, piece_color in players:
+        snapshot_players.append((player_name, piece_color, PIECE_COUNT - piece_counts[opponent_color(piece_color)]))
+        if piece_color == color:
+            current_turn = player_name
+    return GameSnapshot(black, white, kings, triple_kings, tuple(snapshot_players), current_turn, pending)
@@ -0,0 +1,404 @@
+# Description: Endgame tablebase of the positions with up to a few pieces on the board.
+#              build_tablebase solves every position with 1 to max_pieces pieces (men, kings and triple kings of
+#              both colors) by retrograde analysis, with the rules of the ComputerPlayer search: a capture keeps
+#              the turn, the capturing piece may capture again or end the chain, a player without pieces or
+#              without a legal move has lost. Positions are solved from the fewest pieces up, a capture leads to a
+#              position with fewer pieces that is already solved.
+#              The file has a header ("CKTB", version, max pieces) then one 16-bit entry per position with Black to
+#              move: bits 0-1 the result for the color to move (0 draw, 1 win, 2 loss), bits 2-15 the number of
+#              moves to the end of the game with the best play. Positions are numbered by their number of pieces,
+#              then by the squares of the pieces (combinatorial number system), the kinds of the pieces and the
+#              color to move. A position with White to move has the entry of its mirror with Black to move
+#              (Symmetry.py), so the file keeps the entries of the even position indexes only.
+#              The Tablebase class maps the file with mmap to probe positions.
+
+import heapq
+import mmap
+import struct
+import sys
+from array import array
+from math import comb
+
+from BitBoard import BitBoard, KING_RAYS, ROW_0, ROW_7, SQUARE_BITS, SQUARE_COUNT, STEPS, opponent_color
+from CheckersGame import get_game_position
+from Symmetry import mirror_position
+
+TABLEBASE_MAGIC = b"CKTB"
+TABLEBASE_VERSION = 2
+TABLEBASE_HEADER = struct.Struct("<4sBB2x")
+ENTRY = struct.Struct("<H")
+MAX_PIECES = 3
+DEFAULT_PIECES = 2
+
+# Results, for the color to move
+DRAW = 0
+WIN = 1
+LOSS = 2
+RESULT_NAMES = ("draw", "win", "loss")
+
+# Piece kinds: color index (0 Black, 1 White) * 3 + rank
+KIND_COUNT = 6
+COLORS = ("Black", "White")
+MAN = 0
+KING = 1
+TRIPLE_KING = 2
+
+# COMBINATIONS[square][k] is the number of combinations of k squares among square squares
+COMBINATIONS = tuple(tuple(comb(square, k) for k in range(MAX_PIECES + 1)) for square in range(SQUARE_COUNT + 1))
+
+# Number of entries of the positions with exactly n pieces, and index of their first entry
+LEVEL_SIZES = tuple(comb(SQUARE_COUNT, n) * KIND_COUNT ** n * 2 for n in range(MAX_PIECES + 1))
+LEVEL_OFFSETS = tuple(sum(LEVEL_SIZES[1:n]) for n in range(MAX_PIECES + 1))
+
+# REVERSE_STEPS[color][square] are the squares from which a man of the color steps to the square
+REVERSE_STEPS = {color: tuple(tuple(start for start in range(SQUARE_COUNT)
+                                    for destination, destination_bit in STEPS[color][start] if destination == square)
+                              for square in range(SQUARE_COUNT))
+                 for color in COLORS}
+NO_DISTANCE = 0xFFFF
+
+
+class TablebaseError(Exception):
+    """Exception raise if a tablebase file is not valid or a position has too many pieces"""
+    pass
+
+
+def get_position_index(black, white, kings, triple_kings, color):
+    """Returns the index of the position among the positions with the same number of pieces"""
+    pieces = black | white
+    combination = 0
+    kinds = 0
+    count = 0
+    while pieces:
+        bit = pieces & -pieces
+        pieces ^= bit
+        count += 1
+        combination += COMBINATIONS[bit.bit_length() - 1][count]
+        kind = 0 if bit & black else 3
+        if bit & triple_kings:
+            kind += 2
+        elif bit & kings:
+            kind += 1
+        kinds = kinds * KIND_COUNT + kind
+    return (combination * KIND_COUNT ** count + kinds) * 2 + (color == "White")
+
+
+def get_position(piece_count, index):
+    """Returns the black, white, kings and triple kings bitboards and the color to move of a position index"""
+    color = COLORS[index & 1]
+    index >>= 1
+    combination, kinds = divmod(index, KIND_COUNT ** piece_count)
+    # squares from the highest one down, the combinatorial number system is greedy
+    squares = []
+    square = SQUARE_COUNT
+    for count in range(piece_count, 0, -1):
+        square -= 1
+        while COMBINATIONS[square][count] > combination:
+            square -= 1
+        combination -= COMBINATIONS[square][count]
+        squares.append(square)
+
+    black = white = kings = triple_kings = 0
+    # the kind of the highest square is the lowest digit
+    for square in squares:
+        kinds, kind = divmod(kinds, KIND_COUNT)
+        bit = SQUARE_BITS[square]
+        if kind < 3:
+            black |= bit
+        else:
+            white |= bit
+        if kind % 3 == KING:
+            kings |= bit
+        elif kind % 3 == TRIPLE_KING:
+            triple_kings |= bit
+    return black, white, kings, triple_kings, color
+
+
+def get_promoted_rank(rank, square, color):
+    """Returns the rank of a piece of the color after a move to the square, with the promotion rules of play_game"""
+    king_row, triple_king_row = (ROW_0, ROW_7) if color == "Black" else (ROW_7, ROW_0)
+    if SQUARE_BITS[square] & king_row:
+        return rank if rank == TRIPLE_KING else KING
+    if SQUARE_BITS[square] & triple_king_row:
+        return TRIPLE_KING
+    return rank
+
+
+def get_result(entry):
+    """Returns the result and distance of a tablebase entry"""
+    return entry & 3, entry >> 2
+
+
+def negate_entry(entry):
+    """Returns the entry seen by the opponent: a win becomes a loss in the same number of moves"""
+    if entry & 3 == DRAW:
+        return entry
+    return entry ^ 3
+
+
+def add_move(entry):
+    """Returns the entry one move earlier"""
+    if entry & 3 == DRAW:
+        return entry
+    return entry + 4
+
+
+def is_better(entry, other_entry):
+    """Returns True if the entry is better than the other entry for the color to move"""
+    return _get_rank(entry) > _get_rank(other_entry)
+
+
+def _get_rank(entry):
+    """Helper function that orders the entries: the fastest win first, the slowest loss last"""
+    result, distance = get_result(entry)
+    if result == WIN:
+        return 2, -distance
+    if result == LOSS:
+        return 0, distance
+    return 1, 0
+
+
+def get_position_entry(get_entry, black, white, kings, triple_kings, color):
+    """
+    Returns the entry of a position without a pending capture. A position where a player has no piece is
+    over, otherwise get_entry(piece_count, index) returns the entry of the table.
+    """
+    own, opponent = (black, white) if color == "Black" else (white, black)
+    if not own:
+        return LOSS
+    if not opponent:
+        return WIN
+    return get_entry((black | white).bit_count(), get_position_index(black, white, kings, triple_kings, color))
+
+
+def get_pending_entry(get_entry, bit_board, color, pending):
+    """
+    Returns the entry of the position of the BitBoard where the piece of the color on the pending square index
+    has just captured: the piece captures again or the chain ends and the opponent moves.
+    Every capture leads to a position with fewer pieces. The BitBoard is restored before returning.
+    """
+    black, white, kings, triple_kings = bit_board.get_bitboards()
+    best_entry = negate_entry(get_position_entry(get_entry, black, white, kings, triple_kings,
+                                                 opponent_color(color)))
+    for move in bit_board.generate_moves(color, pending):
+        saved = bit_board.make_move(move)
+        entry = add_move(get_pending_entry(get_entry, bit_board, color, (move >> 5) & 31))
+        bit_board.unmake_move(saved)
+        if is_better(entry, best_entry):
+            best_entry = entry
+    return best_entry
+
+
+def get_unmoves(black, white, kings, triple_kings, color):
+    """
+    Returns the bitboards of the positions with the color to move from which a move of the color
+    without capture leads to the position
+    """
+    own = black if color == "Black" else white
+    empty = ~(black | white)
+    positions = []
+    pieces = own
+    while pieces:
+        bit = pieces & -pieces
+        pieces ^= bit
+        square = bit.bit_length() - 1
+        if bit & triple_kings:
+            rank = TRIPLE_KING
+        elif bit & kings:
+            rank = KING
+        else:
+            rank = MAN
+        for previous_rank in (MAN, KING, TRIPLE_KING):
+            if get_promoted_rank(previous_rank, square, color) != rank:
+                continue
+            if previous_rank == MAN:
+                starts = [start for start in REVERSE_STEPS[color][square] if SQUARE_BITS[start] & empty]
+            else:
+                # a king moves along a diagonal over empty squares
+                starts = []
+                for ray in KING_RAYS[square]:
+                    for start in ray:
+                        if not SQUARE_BITS[start] & empty:
+                            break
+                        starts.append(start)
+            base_kings = kings & ~bit
+            base_triple_kings = triple_kings & ~bit
+            for start in starts:
+                start_bit = SQUARE_BITS[start]
+                moved_kings = base_kings | start_bit if previous_rank == KING else base_kings
+                moved_triple_kings = (base_triple_kings | start_bit if previous_rank == TRIPLE_KING
+                                      else base_triple_kings)
+                if color == "Black":
+                    positions.append((black ^ bit ^ start_bit, white, moved_kings, moved_triple_kings))
+                else:
+                    positions.append((black, white ^ bit ^ start_bit, moved_kings, moved_triple_kings))
+    return positions
+
+
+def _solve_level(entries, piece_count):
+    """
+    Helper function that solves the positions with piece_count pieces by retrograde analysis, the positions
+    with fewer pieces are already in entries. Positions are finished in order of distance: a position is won
+    as soon as a move leads to a lost position, lost when every move leads to a won position, and the
+    positions left at the end are draws.
+    """
+    offset = LEVEL_OFFSETS[piece_count]
+    size = LEVEL_SIZES[piece_count]
+
+    def get_entry(count, index):
+        return entries[LEVEL_OFFSETS[count] + index]
+
+    remaining = array("H", bytes(2 * size))  # moves without capture not known to lead to a won position
+    win_distance = array("H", [NO_DISTANCE]) * size  # fastest win found with a capture
+    loss_distance = array("H", bytes(2 * size))  # slowest loss found
+    has_draw = bytearray(size)
+    finished = bytearray(size)
+    queue = []
+    bit_board = BitBoard()
+
+    for index in range(size):
+        black, white, kings, triple_kings, color = get_position(piece_count, index)
+        own, opponent = (black, white) if color == "Black" else (white, black)
+        if not own or not opponent:
+            queue.append((0, index, LOSS if not own else WIN))
+            continue
+        bit_board.set_bitboards(black, white, kings, triple_kings)
+        moves = bit_board.generate_moves(color)
+        if not moves:
+            queue.append((0, index, LOSS))
+            continue
+        for move in moves:
+            if not move >> 10:
+                remaining[index] += 1
+                continue
+            saved = bit_board.make_move(move)
+            result, distance = get_result(add_move(get_pending_entry(get_entry, bit_board, color, (move >> 5) & 31)))
+            bit_board.unmake_move(saved)
+            if result == WIN:
+                win_distance[index] = min(win_distance[index], distance)
+            elif result == LOSS:
+                loss_distance[index] = max(loss_distance[index], distance)
+            else:
+                has_draw[index] = 1
+        if win_distance[index] != NO_DISTANCE:
+            queue.append((win_distance[index], index, WIN))
+        elif not remaining[index] and not has_draw[index]:
+            queue.append((loss_distance[index], index, LOSS))
+
+    heapq.heapify(queue)
+    while queue:
+        distance, index, result = heapq.heappop(queue)
+        if finished[index]:
+            continue
+        finished[index] = 1
+        entries[offset + index] = result | (distance << 2)
+        black, white, kings, triple_kings, color = get_position(piece_count, index)
+        previous_color = opponent_color(color)
+        for position in get_unmoves(black, white, kings, triple_kings, previous_color):
+            previous_index = get_position_index(*position, previous_color)
+            if finished[previous_index]:
+                continue
+            if result == LOSS:
+                heapq.heappush(queue, (distance + 1, previous_index, WIN))
+                continue
+            remaining[previous_index] -= 1
+            loss_distance[previous_index] = max(loss_distance[previous_index], distance + 1)
+            if (not remaining[previous_index] and not has_draw[previous_index]
+                    and win_distance[previous_index] == NO_DISTANCE):
+                heapq.heappush(queue, (loss_distance[previous_index], previous_index, LOSS))
+
+    for index in range(size):
+        if not finished[index]:
+            entries[offset + index] = DRAW
+
+
+def build_tablebase(path, max_pieces=DEFAULT_PIECES):
+    """
+    Solves the positions with 1 to max_pieces pieces and writes the entries of the positions with Black to move
+    to the tablebase file, returns the number of entries written
+    """
+    if not 1 <= max_pieces <= MAX_PIECES:
+        raise TablebaseError("max_pieces must be between 1 and " + str(MAX_PIECES))
+    entries = array("H", bytes(2 * (LEVEL_OFFSETS[max_pieces] + LEVEL_SIZES[max_pieces])))
+    for piece_count in range(1, max_pieces + 1):
+        _solve_level(entries, piece_count)
+    # every level has an even size, the even indexes are the positions with Black to move
+    entries = entries[::2]
+    if sys.byteorder != "little":
+        entries.byteswap()
+    with open(path, "wb") as tablebase_file:
+        tablebase_file.write(TABLEBASE_HEADER.pack(TABLEBASE_MAGIC, TABLEBASE_VERSION, max_pieces))
+        tablebase_file.write(entries.tobytes())
+    return len(entries)
+
+
+class Tablebase:
+    """Represents a tablebase file mapped in memory"""
+
+    def __init__(self, path):
+        with open(path, "rb") as tablebase_file:
+            self._map = mmap.mmap(tablebase_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < TABLEBASE_HEADER.size:
+            raise TablebaseError("Not a tablebase file")
+        magic, version, self._max_pieces = TABLEBASE_HEADER.unpack_from(self._map, 0)
+        if magic != TABLEBASE_MAGIC or version != TABLEBASE_VERSION:
+            raise TablebaseError("Not a tablebase file")
+        if len(self._map) != TABLEBASE_HEADER.size + LEVEL_OFFSETS[self._max_pieces] + LEVEL_SIZES[self._max_pieces]:
+            raise TablebaseError("Tablebase file has the wrong length")
+        self._bit_board = BitBoard()
+
+    def get_max_pieces(self):
+        """Returns the largest number of pieces of the positions in the tablebase"""
+        return self._max_pieces
+
+    def _get_entry(self, piece_count, index):
+        """Helper method that reads the entry of a position index in the file, or of its mirror with Black to move"""
+        if index & 1:
+            black, white, kings, triple_kings, color = get_position(piece_count, index)
+            bitboards, color, pending = mirror_position((black, white, kings, triple_kings), color)
+            index = get_position_index(*bitboards, color)
+        return ENTRY.unpack_from(self._map, TABLEBASE_HEADER.size + LEVEL_OFFSETS[piece_count] + index)[0]
+
+    def probe_board(self, bit_board, color, pending=None):
+        """
+        Returns the result (WIN, LOSS or DRAW) for the color to move and the number of moves to the end of the game
+        of a BitBoard position, or None if it has more pieces than the tablebase.
+        pending is the square index of the piece of the color that has just captured and may capture again.
+        """
+        return self.probe_position(bit_board.get_bitboards(), color, pending)
+
+    def probe_position(self, bitboards, color, pending=None):
+        """
+        Returns the result (WIN, LOSS or DRAW) for the color to move and the number of moves to the end of the game
+        of the black, white, king and triple king bitboards, or None if they have more pieces than the tablebase
+        """
+        black, white, kings, triple_kings = bitboards
+        if (black | white).bit_count() > self._max_pieces:
+            return None
+        if pending is None:
+            return get_result(get_position_entry(self._get_entry, black, white, kings, triple_kings, color))
+        self._bit_board.set_bitboards(black, white, kings, triple_kings)
+        return get_result(get_pending_entry(self._get_entry, self._bit_board, color, pending))
+
+    def probe(self, checkers):
+        """
+        Returns the result (WIN, LOSS or DRAW) for the player to move and the number of moves to the end of the game
+        of a Checkers game, or None if it has more pieces than the tablebase
+        """
+        return self.probe_position(*get_game_position(checkers))
+
+    def close(self):
+        """Unmaps the file"""
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+if __name__ == "__main__":
+    tablebase_path = sys.argv[1] if len(sys.argv) > 1 else "tablebase.bin"
+    print(build_tablebase(tablebase_path, int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PIECES),
+          "positions written to", tablebase_path)
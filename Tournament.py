@@ -0,0 +1,448 @@
+# Description: Tournament runner that plays Checkers engines against each other.
+#              An engine is an EngineSpec: a name, a kind (random or capture policy of Simulation.py, alphabeta
+#              ComputerPlayer or montecarlo MonteCarloPlayer) and a time control: a clock of time_ms milliseconds
+#              for the game plus increment_ms per move. The search engines spend the clock divided by MOVES_TO_GO
+#              plus the increment on every move, and a player whose clock runs out loses the game.
+#              Schedules are lists of (Black engine, White engine) games: round_robin_schedule plays every pair,
+#              gauntlet_schedule one candidate against every opponent, each pair with both colors.
+#              Games are played on the bitboard engine, in this process or across a process pool, every game with
+#              its own seed. A game ends when a player captures 12 pieces, when the player to move has no legal
+#              move (a loss) or as a draw after max_moves moves.
+#              Results are written to a JSON checkpoint after every game. A tournament started again with the same
+#              checkpoint and configuration plays only the games that are not in it.
+#              Standings rate the engines in Elo with the Bradley-Terry model. With an SprtTest, the score of the
+#              first engine against the others is tested with a sequential probability ratio test, and the
+#              tournament stops scheduling games once the test accepts one of the hypotheses.
+#              Usage: python Tournament.py name=kind[:time_ms[+increment_ms]] ... [--gauntlet] [--rounds 1]
+#                                          [--workers 0] [--checkpoint run.json] [--sprt elo0 elo1]
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from CheckersAI import ComputerPlayer
+from CheckersGame import GAME_NOT_ENDED
+from MonteCarlo import MonteCarloPlayer
+from Simulation import BLACK_PLAYER, WHITE_PLAYER, capture_policy, get_game_seed, new_simulated_game, random_policy
+
+CHECKPOINT_VERSION = 1
+POLICIES = {"random": random_policy, "capture": capture_policy}
+SEARCH_KINDS = ("alphabeta", "montecarlo")
+ENGINE_KINDS = tuple(POLICIES) + SEARCH_KINDS
+DEFAULT_MAX_MOVES = 300
+DEFAULT_TIME_MS = 10000
+# Moves the clock is shared between
+MOVES_TO_GO = 30
+
+# Reasons a game ended
+CAPTURED_ALL = "captured all"
+NO_MOVES = "no legal moves"
+TIME_FORFEIT = "time forfeit"
+MOVE_LIMIT = "move limit"
+
+EngineSpec = namedtuple("EngineSpec", ("name", "kind", "time_ms", "increment_ms"),
+                        defaults=(DEFAULT_TIME_MS, 0))
+SprtTest = namedtuple("SprtTest", ("elo0", "elo1", "alpha", "beta"), defaults=(0.0, 10.0, 0.05, 0.05))
+
+
+class TournamentError(Exception):
+    """Exception raise if a tournament configuration is not valid or does not match its checkpoint"""
+    pass
+
+
+def parse_engine_spec(text):
+    """
+    Returns the EngineSpec of "name=kind[:time_ms[+increment_ms]]"
+    :exception: TournamentError
+    """
+    name, separator, kind = text.partition("=")
+    if not separator or not name:
+        raise TournamentError("Engine spec is not name=kind[:time_ms[+increment_ms]]: " + text)
+    kind, separator, time_control = kind.partition(":")
+    if kind not in ENGINE_KINDS:
+        raise TournamentError("Unknown engine kind " + kind + ", expected one of " + ", ".join(ENGINE_KINDS))
+    if not separator:
+        return EngineSpec(name, kind)
+    time_ms, separator, increment_ms = time_control.partition("+")
+    try:
+        return EngineSpec(name, kind, int(time_ms), int(increment_ms) if separator else 0)
+    except ValueError:
+        raise TournamentError("Time control is not time_ms[+increment_ms]: " + time_control)
+
+
+def round_robin_schedule(names, rounds=1):
+    """Returns the (Black, White) games of every pair of engines with both colors, rounds times"""
+    return [(black, white) for _ in range(rounds)
+            for first, black in enumerate(names) for second, white in enumerate(names) if first != second]
+
+
+def gauntlet_schedule(candidate, opponents, rounds=1):
+    """Returns the (Black, White) games of the candidate against every opponent with both colors, rounds times"""
+    return [game for _ in range(rounds) for opponent in opponents
+            for game in ((candidate, opponent), (opponent, candidate))]
+
+
+def _new_searcher(spec, game, seed):
+    """Helper function that returns the ComputerPlayer or MonteCarloPlayer of a search engine, None for a policy"""
+    if spec.kind == "alphabeta":
+        return ComputerPlayer(game)
+    if spec.kind == "montecarlo":
+        return MonteCarloPlayer(game, seed=seed)
+    return None
+
+
+def play_tournament_game(game_index, black_spec, white_spec, seed=0, max_moves=DEFAULT_MAX_MOVES):
+    """
+    Plays one game between the Black and White EngineSpecs, returns the result: game index, seed, engine names,
+    score of Black (1, 0.5 or 0), the reason the game ended, number of moves and milliseconds used by each player
+    """
+    game_seed = get_game_seed(seed, game_index)
+    rng = random.Random(game_seed)
+    game = new_simulated_game()
+    specs = {BLACK_PLAYER: black_spec, WHITE_PLAYER: white_spec}
+    searchers = {player_name: _new_searcher(spec, game, rng.getrandbits(64)) for player_name, spec in specs.items()}
+    clocks = {player_name: float(spec.time_ms) for player_name, spec in specs.items()}
+    used_ms = dict.fromkeys(specs, 0.0)
+
+    winner = None
+    reason = MOVE_LIMIT
+    move_count = 0
+    while move_count < max_moves:
+        if game.game_winner() != GAME_NOT_ENDED:
+            winner = game.game_winner()
+            reason = CAPTURED_ALL
+            break
+        player_name, moves = game.get_turn_moves()
+        if not moves:
+            winner = WHITE_PLAYER if player_name == BLACK_PLAYER else BLACK_PLAYER
+            reason = NO_MOVES
+            break
+        spec = specs[player_name]
+        started = time.perf_counter()
+        if searchers[player_name] is None:
+            move = POLICIES[spec.kind](game, player_name, moves, rng)
+        else:
+            budget_ms = max(1.0, min(clocks[player_name] / MOVES_TO_GO + spec.increment_ms, clocks[player_name] / 2))
+            move = searchers[player_name].best_move(player_name, budget_ms)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        used_ms[player_name] += elapsed_ms
+        clocks[player_name] += spec.increment_ms - elapsed_ms
+        if clocks[player_name] < 0:
+            winner = WHITE_PLAYER if player_name == BLACK_PLAYER else BLACK_PLAYER
+            reason = TIME_FORFEIT
+            break
+        game.make_move(move)
+        move_count += 1
+    else:
+        if game.game_winner() != GAME_NOT_ENDED:
+            winner = game.game_winner()
+            reason = CAPTURED_ALL
+
+    for searcher in searchers.values():
+        if isinstance(searcher, MonteCarloPlayer):
+            searcher.close()
+    if winner is None:
+        score = 0.5
+    else:
+        score = 1.0 if winner == BLACK_PLAYER else 0.0
+    return {"game": game_index, "seed": game_seed, "black": black_spec.name, "white": white_spec.name,
+            "score": score, "reason": reason, "move_count": move_count,
+            "time_ms": {black_spec.name: used_ms[BLACK_PLAYER], white_spec.name: used_ms[WHITE_PLAYER]}}
+
+
+def _play_scheduled_game(game_index, black_spec, white_spec, seed, max_moves):
+    """Helper function that plays a game of the schedule in a worker process"""
+    return play_tournament_game(game_index, black_spec, white_spec, seed, max_moves)
+
+
+def get_expected_score(elo):
+    """Returns the expected score of a player rated elo points above the opponent"""
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def get_elo(score):
+    """Returns the Elo difference of an expected score, clamped to +-800 for a score of 0 or 1"""
+    score = min(max(score, 1 / (1 + 10 ** 2)), 1 / (1 + 10 ** -2))
+    return -400 * math.log10(1 / score - 1)
+
+
+def get_match_stats(results, name, opponent=None):
+    """
+    Returns the games, wins, draws, losses, score, Elo difference and its 95% error margin of the engine
+    against the opponent, or against every other engine if opponent is None
+    """
+    scores = []
+    for result in results:
+        if result["black"] == name and (opponent is None or result["white"] == opponent):
+            scores.append(result["score"])
+        elif result["white"] == name and (opponent is None or result["black"] == opponent):
+            scores.append(1 - result["score"])
+    games = len(scores)
+    stats = {"games": games, "wins": scores.count(1.0), "draws": scores.count(0.5), "losses": scores.count(0.0),
+             "score": 0.0, "elo": 0.0, "error": 0.0}
+    if games:
+        score = sum(scores) / games
+        deviation = math.sqrt(max(sum(value * value for value in scores) / games - score * score, 0.0) / games)
+        stats["score"] = score
+        stats["elo"] = get_elo(score)
+        stats["error"] = (get_elo(score + 1.96 * deviation) - get_elo(score - 1.96 * deviation)) / 2
+    return stats
+
+
+def compute_ratings(results, names, iterations=200):
+    """
+    Returns {name: Elo} of the engines with the Bradley-Terry model fitted to the results, a draw counts as half
+    a win for both. Every pair that played gets one more virtual draw, so an engine that won or lost every game has
+    a finite rating. The ratings average 0.
+    """
+    scores = dict.fromkeys(names, 0.0)
+    pair_games = {}
+    for result in results:
+        black, white = result["black"], result["white"]
+        scores[black] += result["score"]
+        scores[white] += 1 - result["score"]
+        pair = (black, white) if black < white else (white, black)
+        pair_games[pair] = pair_games.get(pair, 0) + 1
+    opponents = {name: {} for name in names}
+    for (first, second), games in pair_games.items():
+        scores[first] += 0.5
+        scores[second] += 0.5
+        opponents[first][second] = games + 1
+        opponents[second][first] = games + 1
+
+    strengths = dict.fromkeys(names, 1.0)
+    for _ in range(iterations):
+        new_strengths = {}
+        for name in names:
+            denominator = sum(games / (strengths[name] + strengths[opponent])
+                              for opponent, games in opponents[name].items())
+            new_strengths[name] = scores[name] / denominator if denominator else strengths[name]
+        scale = math.exp(sum(math.log(strength) for strength in new_strengths.values()) / len(names))
+        strengths = {name: strength / scale for name, strength in new_strengths.items()}
+    return {name: 400 * math.log10(strength) for name, strength in strengths.items()}
+
+
+def get_sprt_llr(wins, draws, losses, elo0, elo1):
+    """
+    Returns the log-likelihood ratio of the hypotheses "the Elo difference is elo1" against "elo0" for the results,
+    with the normal approximation of the generalized SPRT
+    """
+    games = wins + draws + losses
+    if not games:
+        return 0.0
+    score = (wins + 0.5 * draws) / games
+    variance = (wins + 0.25 * draws) / games - score * score
+    if variance <= 0:
+        return 0.0
+    score0 = get_expected_score(elo0)
+    score1 = get_expected_score(elo1)
+    return games * (score1 - score0) * (2 * score - score0 - score1) / (2 * variance)
+
+
+def get_sprt_bounds(alpha, beta):
+    """Returns the lower and upper log-likelihood ratio bounds of an SPRT with the error rates"""
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+class Tournament:
+    """Represents a tournament of engines playing a schedule of games, resumable from a JSON checkpoint"""
+
+    def __init__(self, engines, schedule, seed=0, max_moves=DEFAULT_MAX_MOVES, checkpoint_path=None, sprt=None):
+        """
+        Takes as parameter the EngineSpecs, the (Black name, White name) games of the schedule, the seed of the
+        games, the move limit of a game, the path of the JSON checkpoint and an SprtTest of the first engine.
+        Loads the results of the checkpoint if the file exists.
+        :exception: TournamentError if an engine is unknown or the checkpoint is of another tournament
+        """
+        self._engines = {}
+        for spec in engines:
+            if spec.kind not in ENGINE_KINDS:
+                raise TournamentError("Unknown engine kind " + str(spec.kind))
+            if spec.name in self._engines:
+                raise TournamentError("Duplicate engine name " + spec.name)
+            self._engines[spec.name] = spec
+        for black, white in schedule:
+            if black not in self._engines or white not in self._engines:
+                raise TournamentError("Unknown engine in the schedule: " + black + " - " + white)
+        self._schedule = [tuple(game) for game in schedule]
+        self._seed = seed
+        self._max_moves = max_moves
+        self._checkpoint_path = checkpoint_path
+        self._sprt = sprt
+        self._results = {}  # game index -> result
+        if checkpoint_path is not None and os.path.exists(checkpoint_path):
+            self._load_checkpoint()
+
+    def get_config(self):
+        """Returns the configuration of the tournament as JSON values"""
+        return {"engines": [list(spec) for spec in self._engines.values()],
+                "schedule": [list(game) for game in self._schedule], "seed": self._seed,
+                "max_moves": self._max_moves, "sprt": None if self._sprt is None else list(self._sprt)}
+
+    def get_results(self):
+        """Returns the results of the games played, in schedule order"""
+        return [self._results[game_index] for game_index in sorted(self._results)]
+
+    def get_pending_games(self):
+        """Returns the indexes of the games of the schedule that are not played"""
+        return [game_index for game_index in range(len(self._schedule)) if game_index not in self._results]
+
+    def _load_checkpoint(self):
+        """Helper method that reads the results of the checkpoint file"""
+        try:
+            with open(self._checkpoint_path) as checkpoint_file:
+                data = json.load(checkpoint_file)
+        except ValueError:
+            raise TournamentError("Not a tournament checkpoint: " + self._checkpoint_path)
+        if not isinstance(data, dict) or data.get("version") != CHECKPOINT_VERSION:
+            raise TournamentError("Not a tournament checkpoint: " + self._checkpoint_path)
+        if data["config"] != json.loads(json.dumps(self.get_config())):
+            raise TournamentError("Checkpoint is of another tournament: " + self._checkpoint_path)
+        self._results = {result["game"]: result for result in data["results"]}
+
+    def save_checkpoint(self):
+        """Writes the configuration and the results to the checkpoint file, replacing it at once"""
+        if self._checkpoint_path is None:
+            return
+        temporary_path = self._checkpoint_path + ".tmp"
+        with open(temporary_path, "w") as checkpoint_file:
+            json.dump({"version": CHECKPOINT_VERSION, "config": self.get_config(), "results": self.get_results()},
+                      checkpoint_file)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temporary_path, self._checkpoint_path)
+
+    def _add_result(self, result, progress):
+        """Helper method that records a result, saves the checkpoint and reports the progress"""
+        self._results[result["game"]] = result
+        self.save_checkpoint()
+        if progress is not None:
+            progress(result)
+
+    def run(self, workers=0, progress=None):
+        """
+        Plays the games that are not played, across workers processes (0 plays them in this process, None uses
+        every core), and returns the results. progress is called with every result. Stops scheduling games
+        once the SPRT accepts a hypothesis, the games already running are finished.
+        """
+        pending = self.get_pending_games()
+        if workers == 0:
+            for game_index in pending:
+                if self.get_sprt_decision() is not None:
+                    break
+                black, white = self._schedule[game_index]
+                self._add_result(play_tournament_game(game_index, self._engines[black], self._engines[white],
+                                                      self._seed, self._max_moves), progress)
+            return self.get_results()
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        pending.reverse()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            running = set()
+            while True:
+                while pending and len(running) < workers and self.get_sprt_decision() is None:
+                    game_index = pending.pop()
+                    black, white = self._schedule[game_index]
+                    running.add(executor.submit(_play_scheduled_game, game_index, self._engines[black],
+                                                self._engines[white], self._seed, self._max_moves))
+                if not running:
+                    break
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._add_result(future.result(), progress)
+        return self.get_results()
+
+    def get_standings(self):
+        """
+        Returns the games, wins, draws, losses, score and Bradley-Terry Elo rating of every engine against the
+        others, the highest rated first
+        """
+        results = self.get_results()
+        ratings = compute_ratings(results, list(self._engines))
+        standings = []
+        for name in self._engines:
+            stats = get_match_stats(results, name)
+            standings.append({"name": name, "games": stats["games"], "wins": stats["wins"], "draws": stats["draws"],
+                              "losses": stats["losses"], "score": stats["score"], "rating": ratings[name]})
+        standings.sort(key=lambda standing: -standing["rating"])
+        return standings
+
+    def get_sprt(self):
+        """
+        Returns the log-likelihood ratio, bounds and decision ("H1" the first engine is elo1 stronger, "H0" it is
+        elo0, None to go on) of the SPRT of the first engine against the others, None without an SprtTest
+        """
+        if self._sprt is None:
+            return None
+        stats = get_match_stats(self.get_results(), next(iter(self._engines)))
+        llr = get_sprt_llr(stats["wins"], stats["draws"], stats["losses"], self._sprt.elo0, self._sprt.elo1)
+        lower, upper = get_sprt_bounds(self._sprt.alpha, self._sprt.beta)
+        decision = None
+        if llr >= upper:
+            decision = "H1"
+        elif llr <= lower:
+            decision = "H0"
+        return {"llr": llr, "lower": lower, "upper": upper, "decision": decision}
+
+    def get_sprt_decision(self):
+        """Returns the decision of the SPRT, None without an SprtTest or before a hypothesis is accepted"""
+        sprt = self.get_sprt()
+        return None if sprt is None else sprt["decision"]
+
+    def format_report(self):
+        """Returns the standings, and the SPRT of the first engine, as text"""
+        lines = ["%-16s %6s %6s %6s %6s %7s %8s" % ("engine", "games", "wins", "draws", "losses", "score", "elo")]
+        for standing in self.get_standings():
+            lines.append("%-16s %6d %6d %6d %6d %6.1f%% %+8.1f" % (
+                standing["name"], standing["games"], standing["wins"], standing["draws"], standing["losses"],
+                standing["score"] * 100, standing["rating"]))
+        sprt = self.get_sprt()
+        if sprt is not None:
+            lines.append("SPRT llr %.3f (%.3f, %.3f) %s" % (sprt["llr"], sprt["lower"], sprt["upper"],
+                                                             sprt["decision"] or "continue"))
+        return "\n".join(lines) + "\n"
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Tournament of Checkers engines")
+    parser.add_argument("engines", nargs="+", help="name=kind[:time_ms[+increment_ms]], kinds: "
+                                                   + ", ".join(ENGINE_KINDS))
+    parser.add_argument("--gauntlet", action="store_true", help="the first engine plays every other engine")
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=0, help="worker processes, 0 plays in this process")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-moves", type=int, default=DEFAULT_MAX_MOVES)
+    parser.add_argument("--checkpoint", help="JSON file of the results, the tournament resumes from it")
+    parser.add_argument("--sprt", type=float, nargs=2, metavar=("ELO0", "ELO1"),
+                        help="test the first engine against the others and stop at a decision")
+    options = parser.parse_args(arguments)
+
+    try:
+        engines = [parse_engine_spec(text) for text in options.engines]
+        names = [spec.name for spec in engines]
+        if options.gauntlet:
+            schedule = gauntlet_schedule(names[0], names[1:], options.rounds)
+        else:
+            schedule = round_robin_schedule(names, options.rounds)
+        tournament = Tournament(engines, schedule, options.seed, options.max_moves, options.checkpoint,
+                                SprtTest(*options.sprt) if options.sprt else None)
+    except TournamentError as error:
+        print(error, file=sys.stderr)
+        return 2
+    print("%d games, %d played" % (len(schedule), len(schedule) - len(tournament.get_pending_games())))
+    tournament.run(options.workers, lambda result: print("game %d %s - %s %s (%s)" % (
+        result["game"], result["black"], result["white"], {1.0: "1-0", 0.5: "1/2-1/2", 0.0: "0-1"}[result["score"]],
+        result["reason"])))
+    print(tournament.format_report(), end="")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
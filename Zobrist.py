@@ -0,0 +1,127 @@
+# Description: Zobrist hashing of Checkers positions and a transposition table.
+#              Every kind of piece (color and man, king or triple king) on every square index has a random 64-bit
+#              key, the key of a board is the XOR of the keys of its pieces, so it can be updated incrementally
+#              when a piece moves, is captured or is promoted. The key of a position also includes the color to move
+#              and the square of the piece that has just captured and may capture again.
+#              The TranspositionTable class stores search results in buckets of two entries: one kept for the
+#              deepest search and one always replaced.
+
+import random
+
+SQUARE_COUNT = 32
+KEY_SEED = 20230601
+
+# Piece ranks
+MAN = 0
+KING = 1
+TRIPLE_KING = 2
+
+_random = random.Random(KEY_SEED)
+
+# PIECE_KEYS[color_index * 3 + rank][square], color_index is 0 for Black and 1 for White
+PIECE_KEYS = tuple(tuple(_random.getrandbits(64) for _ in range(SQUARE_COUNT)) for _ in range(6))
+WHITE_TO_MOVE_KEY = _random.getrandbits(64)
+PENDING_KEYS = tuple(_random.getrandbits(64) for _ in range(SQUARE_COUNT))
+
+# Search result flags
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+def get_color_index(color):
+    """Returns 0 for Black and 1 for White"""
+    if color == "Black":
+        return 0
+    return 1
+
+
+def get_piece_key(color, is_king, is_triple_king, square):
+    """Returns the key of a piece on the square index"""
+    if is_triple_king:
+        rank = TRIPLE_KING
+    elif is_king:
+        rank = KING
+    else:
+        rank = MAN
+    return PIECE_KEYS[get_color_index(color) * 3 + rank][square]
+
+
+def get_board_key(black, white, kings, triple_kings):
+    """Returns the key of the board given as bitboards"""
+    key = 0
+    for color_index, pieces in ((0, black), (1, white)):
+        while pieces:
+            bit = pieces & -pieces
+            pieces ^= bit
+            if bit & triple_kings:
+                rank = TRIPLE_KING
+            elif bit & kings:
+                rank = KING
+            else:
+                rank = MAN
+            key ^= PIECE_KEYS[color_index * 3 + rank][bit.bit_length() - 1]
+    return key
+
+
+def get_position_key(board_key, color_to_move, pending_square=None):
+    """Returns the key of the position from the board key, color to move and square of the pending piece"""
+    if color_to_move == "White":
+        board_key ^= WHITE_TO_MOVE_KEY
+    if pending_square is not None:
+        board_key ^= PENDING_KEYS[pending_square]
+    return board_key
+
+
+class TranspositionTable:
+    """Represents a bounded table of search results indexed by position key"""
+
+    def __init__(self, bucket_count=1 << 16):
+        size = 1
+        while size < bucket_count:
+            size *= 2
+        self._mask = size - 1
+        self._deepest = [None] * size  # entry with the deepest search
+        self._recent = [None] * size  # entry that is always replaced
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+
+    def probe(self, key):
+        """Returns the (key, depth, score, flag, move) entry of the position key, or None if it's not stored"""
+        index = key & self._mask
+        entry = self._deepest[index]
+        if entry is not None and entry[0] == key:
+            self._hits += 1
+            return entry
+        entry = self._recent[index]
+        if entry is not None and entry[0] == key:
+            self._hits += 1
+            return entry
+        self._misses += 1
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        """Stores a search result, keeps the deepest result of the bucket and replaces the other one"""
+        index = key & self._mask
+        self._stores += 1
+        deepest = self._deepest[index]
+        if deepest is None or depth >= deepest[1] or deepest[0] == key:
+            self._deepest[index] = (key, depth, score, flag, move)
+        else:
+            self._recent[index] = (key, depth, score, flag, move)
+
+    def clear(self):
+        """Removes every entry and resets the counters"""
+        size = self._mask + 1
+        self._deepest = [None] * size
+        self._recent = [None] * size
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+
+    def get_stats(self):
+        """Returns the hits, misses, stores and hit rate of the table"""
+        probes = self._hits + self._misses
+        return {"hits": self._hits, "misses": self._misses, "stores": self._stores,
+                "hit_rate": self._hits / probes if probes else 0.0, "buckets": self._mask + 1}